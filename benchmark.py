@@ -0,0 +1,291 @@
+"""
+Benchmark suite for the formula parser, molar mass calculator and element table.
+
+Every benchmark case reports a throughput (operations per second, higher is better).
+Cases cover:
+    - Element table start-up: cold (building a new table from elements.json / elements.bin,
+      and a fresh interpreter importing molar_mass) and warm (the shared table)
+    - parse_formula() across formula size and parenthesis nesting depth
+    - calculate_molar_mass() on parse cache hits and misses
+    - calculate_molar_masses() batches (formulas/sec), for repeated and distinct formulas
+
+Results can be written as JSON and compared against a stored baseline (from an earlier
+run on the same machine); any case slower than the baseline by more than the tolerance
+is reported and the script exits with status 1, so it can gate CI.
+
+The previous RegEx + token list parser is kept (`parse_formula_regex`) purely as a
+reference point for the scanner comparison table.
+
+Usage:
+    python benchmark.py                                  # Run and print all cases
+    python benchmark.py --save-baseline                  # ... and store them as the baseline
+    python benchmark.py --compare --json results.json    # Fail if slower than the baseline
+
+Author: Jordan Rodger
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import timeit
+
+import molar_mass
+from molar_mass import (
+    ParseCache, calculate_molar_mass, calculate_molar_masses, get_element_masses, parse_formula,
+)
+from periodic_table import BINARY_FILE, ELEMENTS_FILE, PeriodicTable, _load_json, get_periodic_table
+
+
+# ====== CONSTANTS ======
+FORMULAS = {
+    "short": "CO2",
+    "medium": "Al2(SO4)3",
+    "long": "CH3(CH2)12((C6H4)2(NO2)3)2Fe(C5H5)2(Co(NH3)6)Cl3((CH3)3Si)4O2",
+}
+
+NESTING_DEPTHS = (1, 4, 16) # Parenthesis depths for the parse_formula nesting cases
+
+BATCH_SIZE = 10000 # Formulas per calculate_molar_masses() call
+
+REPEATS = 5 # Number of timing runs; the best (fastest) run is reported
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+DEFAULT_TOLERANCE = 0.25 # A case regresses if it is more than 25% slower than the baseline
+
+
+def parse_formula_regex(formula):
+    """
+    The previous RegEx + token list implementation of parse_formula(), kept for comparison.
+
+    Args:
+        formula (str): The formula to be parsed.
+    Returns:
+        stack[0] (dict): A flat dictionary with element symbols (key) and atom counts (value).
+    """
+    pattern = r"([A-Z][a-z]?|\d+|\(|\))"
+    matches = re.findall(pattern, formula)
+
+    stack = [{}]
+
+    i = 0
+    while i < len(matches):
+        token = matches[i]
+
+        if token == '(':
+            stack.append({})
+            i += 1
+        elif token == ')':
+            group = stack.pop()
+            i += 1
+
+            multiplier = 1
+            if i < len(matches) and matches[i].isdigit():
+                multiplier = int(matches[i])
+                i += 1
+
+            for element, count in group.items():
+                stack[-1][element] = stack[-1].get(element, 0) + count * multiplier
+
+        elif re.match('[A-Z][a-z]?', token):
+            elem = token
+            count = 1
+
+            if i + 1 < len(matches) and matches[i + 1].isdigit():
+                count = int(matches[i + 1])
+                i += 1
+
+            stack[-1][elem] = stack[-1].get(elem, 0) + count
+            i += 1
+        else:
+            i += 1
+
+    return stack[0]
+
+
+def nested_formula(depth):
+    """Builds a formula with `depth` levels of nested parentheses, e.g. depth 2: 'Fe(Fe(CN)2)2'."""
+    formula = "CN"
+    for _ in range(depth):
+        formula = f"Fe({formula})2"
+    return formula
+
+
+def distinct_formulas(count):
+    """Builds `count` different organic-style formulas (so every parse is a cache miss)."""
+    return [f"C{i % 97 + 1}H{i % 89 + 2}N{i % 7}O{i % 13 + 1}S{i % 3}" for i in range(count)]
+
+
+def measure(func, operations=1, repeats=REPEATS):
+    """
+    Measures the throughput of func.
+
+    Args:
+        func (callable): Function to time (no arguments).
+        operations (int): Operations performed by each func() call (e.g., formulas in a batch).
+        repeats (int): Number of timing runs (the fastest is used).
+    Returns:
+        (float): Operations per second for the fastest run.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange() # Calls per run, so that each run takes at least 0.2s
+    best = min(timer.repeat(repeat=repeats, number=number))
+    return number * operations / best
+
+
+def measure_cold_import(repeats=REPEATS):
+    """Returns fresh-interpreter runs per second of importing molar_mass and loading the table."""
+    code = "import molar_mass; molar_mass.get_element_masses()"
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    best = min(
+        timeit.timeit(lambda: subprocess.run([sys.executable, "-c", code], cwd=cwd, check=True), number=1)
+        for _ in range(repeats)
+    )
+    return 1 / best
+
+
+def run_suite():
+    """
+    Runs every benchmark case.
+
+    Returns:
+        results (dict): {case name: operations per second}.
+    """
+    results = {}
+
+    # ---- Element table start-up ----
+    results["startup.import_cold"] = measure_cold_import()
+    results["startup.table_from_json"] = measure(lambda: PeriodicTable(_load_json(ELEMENTS_FILE)))
+    results["startup.table_from_binary"] = measure(lambda: PeriodicTable.from_binary(BINARY_FILE))
+    get_periodic_table()
+    results["startup.table_warm"] = measure(get_element_masses)
+
+    # ---- parse_formula(): size and nesting depth ----
+    for size, formula in FORMULAS.items():
+        results[f"parse.{size}"] = measure(lambda: parse_formula(formula))
+    for depth in NESTING_DEPTHS:
+        formula = nested_formula(depth)
+        results[f"parse.depth_{depth}"] = measure(lambda: parse_formula(formula))
+
+    # ---- calculate_molar_mass(): parse cache hit vs miss ----
+    formula = FORMULAS["medium"]
+    calculate_molar_mass(formula) # Make sure it is cached
+    results["mass.single_cache_hit"] = measure(lambda: calculate_molar_mass(formula))
+    no_cache = ParseCache(maxsize=0) # Every lookup is a miss, so every call re-parses
+    results["mass.single_cache_miss"] = measure(lambda: calculate_molar_mass(no_cache.get(formula)))
+
+    # ---- calculate_molar_masses(): batches (formulas/sec) ----
+    repeated = [FORMULAS[size] for size in FORMULAS] * (BATCH_SIZE // len(FORMULAS))
+    distinct = distinct_formulas(BATCH_SIZE)
+    results["batch.repeated"] = measure(lambda: calculate_molar_masses(repeated), len(repeated))
+    molar_mass.configure_parse_cache(0) # Distinct formulas: measure the parse-every-row path
+    try:
+        results["batch.distinct"] = measure(lambda: calculate_molar_masses(distinct), len(distinct))
+    finally:
+        molar_mass.configure_parse_cache(molar_mass.DEFAULT_PARSE_CACHE_SIZE)
+
+    return results
+
+
+def find_regressions(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares results against a baseline.
+
+    Args:
+        results (dict): {case name: operations per second} from run_suite().
+        baseline (dict): The same, from an earlier run.
+        tolerance (float): Allowed slowdown as a fraction (0.25 = 25% slower).
+    Returns:
+        regressions (list of tuple): (case, baseline rate, current rate) for each regressed case.
+    """
+    regressions = []
+    for case, baseline_rate in baseline.items():
+        rate = results.get(case)
+        if rate is not None and rate < baseline_rate * (1 - tolerance):
+            regressions.append((case, baseline_rate, rate))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print(f"{'case':<30}{'ops/s':>16}{'vs baseline':>14}")
+    for case, rate in results.items():
+        change = ""
+        if baseline and case in baseline:
+            change = f"{(rate / baseline[case] - 1) * 100:+.1f}%"
+        print(f"{case:<30}{rate:>16,.0f}{change:>14}")
+
+
+def run_parser_comparison():
+    """Prints scanner vs RegEx parse_formula() throughput for each formula size."""
+    print(f"{'size':<8}{'regex (formulas/s)':>22}{'scanner (formulas/s)':>24}{'speedup':>10}")
+    for size, formula in FORMULAS.items():
+        # Both parsers must agree before their speed is worth comparing
+        assert parse_formula(formula) == parse_formula_regex(formula), formula
+
+        old_rate = measure(lambda: parse_formula_regex(formula))
+        new_rate = measure(lambda: parse_formula(formula))
+        print(f"{size:<8}{old_rate:>22,.0f}{new_rate:>24,.0f}{new_rate / old_rate:>9.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the molar mass benchmark suite.")
+    parser.add_argument("--json", metavar="PATH", help="Write results (and environment info) to this JSON file")
+    parser.add_argument("--save-baseline", nargs="?", const=BASELINE_FILE, metavar="PATH",
+                        help=f"Store the results as the baseline (default: {os.path.basename(BASELINE_FILE)})")
+    parser.add_argument("--compare", nargs="?", const=BASELINE_FILE, metavar="PATH",
+                        help="Compare against a stored baseline and exit with status 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed slowdown vs the baseline, as a fraction (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--parser-comparison", action="store_true",
+                        help="Also compare the scanner with the previous RegEx parser")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        # Baselines are machine-specific, so none is committed: each machine saves its own
+        if not os.path.exists(args.compare):
+            print(f"Error: no baseline at {args.compare}; run 'python benchmark.py --save-baseline' first",
+                  file=sys.stderr)
+            return 1
+        try:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                baseline = json.load(f)["results"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error: can't read the baseline {args.compare}: {e!r}", file=sys.stderr)
+            return 1
+
+    results = run_suite()
+    print_results(results, baseline)
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "numpy": molar_mass._numpy() is not None,
+        "results": results,
+    }
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=4)
+
+    if args.parser_comparison:
+        print()
+        run_parser_comparison()
+
+    if baseline is not None:
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nREGRESSION: {len(regressions)} case(s) more than {args.tolerance:.0%} slower than the baseline:")
+            for case, baseline_rate, rate in regressions:
+                print(f"  {case}: {baseline_rate:,.0f} -> {rate:,.0f} ops/s")
+            return 1
+        print(f"\nNo regressions (tolerance {args.tolerance:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
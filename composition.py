@@ -0,0 +1,239 @@
+"""
+Immutable, hashable chemical composition value type.
+
+A Composition stores the atoms of a formula as a sorted tuple of (atomic_number, count)
+pairs, e.g. water is ((1, 2), (8, 1)). Unlike the dict returned by parse_formula(), it can
+be hashed, compared, used as a dict/set key (e.g., for deduplication) and shared safely,
+as it can't be modified.
+
+Compositions are interned: creating a composition equal to one that already exists returns
+the existing object, so identical compositions share one object (and one tuple) in memory.
+
+Each composition has a canonical Hill-notation formula (C first, then H, then the other
+elements alphabetically; alphabetical throughout if there is no carbon) and a stable 64-bit
+hash of its counts, so differently written formulas of the same composition (CH3COOH,
+C2H4O2, HC2H3O2) can be recognised and deduplicated.
+
+Compositions support addition (combining formulas) and multiplication by an integer
+(e.g., 5 * water), and behave as a read-only {symbol: count} mapping for compatibility
+with code written against parse_formula().
+
+Author: Jordan Rodger
+"""
+
+import sys
+from array import array
+from collections.abc import Mapping
+from hashlib import blake2b
+from weakref import ref as weak_ref
+
+from periodic_table import get_periodic_table
+
+
+# Interned compositions: {(atomic_number, count) pairs: weak reference to the composition}.
+# Entries are removed automatically once nothing else refers to the composition.
+# (Plain dicts of weak references are used because WeakValueDictionary's pure-Python
+# methods are several times slower, and interning is on the hot path of every parse.)
+_interned = {}
+_keys = {} # {weak reference: pairs}, so the callback can find the entry to remove
+
+
+def _remove_dead(ref):
+    # Weak reference callback: drop the entry, unless it has already been replaced
+    pairs = _keys.pop(ref, None)
+    if pairs is not None and _interned.get(pairs) is ref:
+        del _interned[pairs]
+
+
+def hill_formula(counts):
+    """
+    Returns a {symbol: count} mapping as a Hill-notation formula (see Composition.hill_formula).
+    Unlike a Composition, the symbols don't have to be in the periodic table (e.g., D).
+
+    Args:
+        counts (Mapping): {symbol: count}, with no zero counts.
+    Returns:
+        (str): The formula, e.g. 'C2H4O2'.
+    """
+    if "C" in counts:
+        order = ["C"] + (["H"] if "H" in counts else []) + sorted(counts.keys() - {"C", "H"})
+    else:
+        order = sorted(counts)
+    return "".join(symbol if counts[symbol] == 1 else f"{symbol}{counts[symbol]}" for symbol in order)
+
+
+class Composition(Mapping):
+    """
+    Immutable, interned chemical composition.
+
+    Args:
+        counts (Mapping, optional): {symbol: count}, e.g. the dict from parse_formula().
+            Elements with a count of 0 are left out.
+    Raises:
+        ValueError: If a symbol is not a known element.
+    """
+
+    __slots__ = ("_pairs", "_hash", "_canonical_hash", "__weakref__")
+
+    def __new__(cls, counts=None):
+        if not counts:
+            return cls.from_pairs(())
+        atomic_numbers = get_periodic_table().atomic_numbers_by_symbol
+        try:
+            pairs = sorted([(atomic_numbers[symbol], count) for symbol, count in counts.items() if count])
+        except KeyError as e:
+            raise ValueError(f"Unknown element: {e.args[0]}") from None
+        return cls.from_pairs(tuple(pairs))
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """
+        Returns the interned composition for a tuple of (atomic_number, count) pairs.
+
+        Args:
+            pairs (tuple): Sorted by atomic number, with unique atomic numbers and non-zero counts.
+        Returns:
+            (Composition): The shared composition object for those pairs.
+        """
+        ref = _interned.get(pairs)
+        if ref is not None:
+            composition = ref()
+            if composition is not None:
+                return composition
+
+        composition = object.__new__(cls)
+        object.__setattr__(composition, "_pairs", pairs)
+        object.__setattr__(composition, "_hash", hash(pairs))
+        object.__setattr__(composition, "_canonical_hash", None) # Computed on first use
+        ref = weak_ref(composition, _remove_dead)
+        _keys[ref] = pairs
+        interned_ref = _interned.setdefault(pairs, ref)
+        return interned_ref() or composition # If another thread interned the same pairs first, use theirs
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Composition objects are immutable")
+
+    def __reduce__(self):
+        # Pickle as pairs, so unpickling (e.g., in worker processes) re-interns the composition
+        return (Composition.from_pairs, (self._pairs,))
+
+    @property
+    def pairs(self):
+        """The (atomic_number, count) pairs, sorted by atomic number."""
+        return self._pairs
+
+    # ---- Mapping interface: {symbol: count} ----
+    def __getitem__(self, symbol):
+        atomic_number = get_periodic_table().atomic_numbers_by_symbol.get(symbol)
+        for number, count in self._pairs:
+            if number == atomic_number:
+                return count
+        raise KeyError(symbol)
+
+    def __iter__(self):
+        symbols = get_periodic_table().symbols
+        return (symbols[atomic_number - 1] for atomic_number, _ in self._pairs)
+
+    def __len__(self):
+        return len(self._pairs)
+
+    def items(self):
+        """(symbol, count) pairs, in atomic number order."""
+        symbols = get_periodic_table().symbols
+        return [(symbols[atomic_number - 1], count) for atomic_number, count in self._pairs]
+
+    def to_dict(self):
+        """Returns a new, mutable {symbol: count} dict."""
+        return dict(self.items())
+
+    # ---- Value semantics ----
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True # Interned, so equal compositions are usually the same object
+        if isinstance(other, Composition):
+            return self._pairs == other._pairs
+        if isinstance(other, Mapping):
+            return self.to_dict() == {symbol: count for symbol, count in other.items() if count}
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Composition({self.to_dict()!r})"
+
+    # ---- Canonical form ----
+    def hill_formula(self):
+        """
+        Returns the formula in Hill notation, e.g. 'C2H4O2' for acetic acid.
+
+        With carbon present: C first, then H, then the other elements alphabetically.
+        Without carbon, every element (including H) is listed alphabetically.
+        """
+        symbols = get_periodic_table().symbols
+        return hill_formula({symbols[atomic_number - 1]: count for atomic_number, count in self._pairs})
+
+    def canonical_hash(self):
+        """
+        Returns a stable 64-bit hash of the composition.
+
+        Unlike hash(), the value is the same in every process, Python version and platform,
+        so it can be stored (e.g., in dedup indexes). It is a BLAKE2b digest of the
+        (atomic_number, count) pairs as little-endian 64-bit integers.
+
+        Returns:
+            (int): Unsigned 64-bit hash.
+        """
+        if self._canonical_hash is None:
+            values = array('q', (value for pair in self._pairs for value in pair))
+            if sys.byteorder == "big":
+                values.byteswap() # Hash the same (little-endian) bytes on every machine
+            digest = blake2b(values.tobytes(), digest_size=8).digest()
+            object.__setattr__(self, "_canonical_hash", int.from_bytes(digest, "little"))
+        return self._canonical_hash
+
+    # ---- Arithmetic ----
+    def __add__(self, other):
+        if not isinstance(other, Composition):
+            return NotImplemented
+        if not other._pairs:
+            return self
+        if not self._pairs:
+            return other
+        totals = dict(self._pairs)
+        for atomic_number, count in other._pairs:
+            totals[atomic_number] = totals.get(atomic_number, 0) + count
+        return Composition.from_pairs(tuple(sorted(pair for pair in totals.items() if pair[1])))
+
+    def __mul__(self, factor):
+        if not isinstance(factor, int):
+            return NotImplemented
+        if factor == 1:
+            return self
+        if factor == 0:
+            return Composition.from_pairs(())
+        return Composition.from_pairs(tuple((atomic_number, count * factor) for atomic_number, count in self._pairs))
+
+    __rmul__ = __mul__
+
+    # ---- Chemistry ----
+    def atom_count(self):
+        """Returns the total number of atoms."""
+        return sum(count for _, count in self._pairs)
+
+    def mass(self, masses=None):
+        """
+        Calculates the molar mass of the composition.
+
+        Args:
+            masses (sequence of float, optional): Atomic masses indexed by atomic number - 1.
+                Defaults to the shared PeriodicTable's atomic masses.
+        Returns:
+            total_mass (float): The molar mass (in g/mol)
+        """
+        if masses is None:
+            masses = get_periodic_table().atomic_masses
+        total_mass = 0
+        for atomic_number, count in self._pairs:
+            total_mass += masses[atomic_number - 1] * count
+        return total_mass
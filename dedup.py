@@ -0,0 +1,191 @@
+"""
+Streaming, memory-bounded deduplication of chemical formulas by composition.
+
+Formulas that are written differently but have the same composition (e.g., CH3COOH,
+C2H4O2 and HC2H3O2) are grouped together using each composition's stable 64-bit
+canonical hash (see Composition.canonical_hash). Each group is reported once, with its
+Hill-notation formula, hash, number of occurrences and the first formula seen for it.
+
+Memory use is bounded: groups are counted in memory until there are `max_groups` of them,
+after which the groups so far, and every later formula, are spilled to temporary partition
+files by hash. Each partition is then counted on its own, so only about
+1 / `partitions` of the distinct compositions are ever in memory at once.
+
+Usage:
+    python dedup.py catalogue.txt > groups.csv
+    python dedup.py catalogue.csv --csv-column formula --max-groups 5000000
+
+Output columns (CSV):
+    - hill_formula - Canonical formula in Hill notation
+    - composition_hash - Canonical 64-bit hash (16 hex digits)
+    - count - Number of input formulas with this composition
+    - first_formula - The first input formula seen with this composition
+
+Author: Jordan Rodger
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+from collections import namedtuple
+from itertools import chain
+
+from molar_mass import parse_formula_cached
+from molar_mass_cli import DEFAULT_BUFFER_SIZE, iter_formulas
+
+
+# ====== CONSTANTS ======
+# Number of distinct compositions counted in memory before spilling to partition files
+DEFAULT_MAX_GROUPS = 1_000_000
+
+# Number of partition files used once spilling (each holds 1 / partitions of the hashes)
+DEFAULT_PARTITIONS = 64
+
+OUTPUT_FIELDS = ("hill_formula", "composition_hash", "count", "first_formula")
+
+DedupGroup = namedtuple("DedupGroup", OUTPUT_FIELDS)
+
+
+def _count_groups(records):
+    """
+    Counts (formula, count) records by composition (the formulas must all be valid).
+
+    Args:
+        records (iterable of tuple): (formula, count) pairs.
+    Returns:
+        groups (dict): {(canonical hash, Composition): [count, first formula]}, in first-seen order.
+    """
+    groups = {}
+    for formula, count in records:
+        composition = parse_formula_cached(formula)
+        # Keyed on the hash and the composition itself, so a 64-bit hash collision
+        # can never merge two different compositions
+        key = (composition.canonical_hash(), composition)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [count, formula]
+        else:
+            group[0] += count
+    return groups
+
+
+def _to_groups(groups):
+    for (composition_hash, composition), (count, first_formula) in groups.items():
+        yield DedupGroup(composition.hill_formula(), composition_hash, count, first_formula)
+
+
+def dedup_formulas(formulas, max_groups=DEFAULT_MAX_GROUPS, partitions=DEFAULT_PARTITIONS,
+                   on_error=None, tmpdir=None):
+    """
+    Groups formulas by composition, with bounded memory.
+
+    Args:
+        formulas (iterable of str): The formulas; read once, as a stream.
+        max_groups (int): Distinct compositions kept in memory before spilling to disk.
+        partitions (int): Number of temporary partition files used when spilling.
+        on_error (callable, optional): Called with (formula, error) for invalid formulas,
+            which are otherwise skipped.
+        tmpdir (str, optional): Directory for the temporary partition files.
+    Yields:
+        (DedupGroup): One per distinct composition: hill_formula, composition_hash, count, first_formula.
+        Groups come in first-seen order unless spilling happened, in which case they come
+        partition by partition (first_formula is still the first one seen).
+    """
+    formulas = iter(formulas)
+    groups = {}
+    for formula in formulas:
+        try:
+            composition = parse_formula_cached(formula)
+        except ValueError as e:
+            if on_error is not None:
+                on_error(formula, e)
+            continue
+        key = (composition.canonical_hash(), composition)
+        group = groups.get(key)
+        if group is None:
+            if len(groups) >= max_groups:
+                # Too many distinct compositions to keep in memory: partition the rest by hash
+                yield from _dedup_spilled(groups, formula, formulas, partitions, on_error, tmpdir)
+                return
+            groups[key] = [1, formula]
+        else:
+            group[0] += 1
+
+    yield from _to_groups(groups)
+
+
+def _dedup_spilled(groups, formula, formulas, partitions, on_error, tmpdir):
+    with tempfile.TemporaryDirectory(dir=tmpdir, prefix="formula-dedup-") as spill_dir:
+        paths = [os.path.join(spill_dir, f"part-{i:04d}.csv") for i in range(partitions)]
+        files = [open(path, "w", encoding="utf-8", newline="", buffering=DEFAULT_BUFFER_SIZE // partitions or 1)
+                 for path in paths]
+        try:
+            # CSV rather than plain lines: formulas from a quoted CSV column can contain
+            # tabs, newlines and commas, which the csv module quotes and reads back intact
+            writers = [csv.writer(f, lineterminator="\n") for f in files]
+
+            def spill(composition_hash, count, formula):
+                writers[composition_hash % partitions].writerow((count, formula))
+
+            # Spill the groups counted so far, then every remaining formula (count 1 each)
+            for (composition_hash, _), (count, first_formula) in groups.items():
+                spill(composition_hash, count, first_formula)
+            groups.clear()
+
+            for formula in chain([formula], formulas):
+                try:
+                    composition = parse_formula_cached(formula)
+                except ValueError as e:
+                    if on_error is not None:
+                        on_error(formula, e)
+                    continue
+                spill(composition.canonical_hash(), 1, formula)
+        finally:
+            for f in files:
+                f.close()
+
+        # Every composition is in exactly one partition, so partitions are counted independently
+        for path in paths:
+            with open(path, "r", encoding="utf-8", newline="", buffering=DEFAULT_BUFFER_SIZE) as f:
+                records = csv.reader(f)
+                yield from _to_groups(_count_groups((formula, int(count)) for count, formula in records))
+            os.remove(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Group formulas by composition (Hill formula + canonical hash).")
+    parser.add_argument("inputs", nargs="*", default=["-"],
+                        help="Input files, one formula per line ('-' or none for stdin)")
+    parser.add_argument("--csv-column", metavar="COLUMN",
+                        help="Read formulas from this CSV column (header name, or 0-based index)")
+    parser.add_argument("--max-groups", type=int, default=DEFAULT_MAX_GROUPS,
+                        help=f"Distinct compositions kept in memory before spilling (default: {DEFAULT_MAX_GROUPS})")
+    parser.add_argument("--partitions", type=int, default=DEFAULT_PARTITIONS,
+                        help=f"Partition files used when spilling (default: {DEFAULT_PARTITIONS})")
+    parser.add_argument("--tmpdir", help="Directory for partition files (default: system temp directory)")
+    args = parser.parse_args(argv)
+    if args.max_groups < 1 or args.partitions < 1:
+        raise SystemExit("--max-groups and --partitions must be at least 1")
+
+    def report_error(formula, error):
+        print(f"Skipped {formula!r}: {error}", file=sys.stderr)
+
+    formulas = iter_formulas(args.inputs, args.csv_column)
+    writer = csv.writer(sys.stdout, lineterminator="\n")
+    writer.writerow(OUTPUT_FIELDS)
+    try:
+        for group in dedup_formulas(formulas, args.max_groups, args.partitions, report_error, args.tmpdir):
+            writer.writerow((group.hill_formula, f"{group.composition_hash:016x}", group.count, group.first_formula))
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
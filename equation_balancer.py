@@ -0,0 +1,298 @@
+"""
+Chemical equation balancer.
+
+Balances reactions such as 'Fe + O2 -> Fe2O3' (giving '4Fe + 3O2 -> 2Fe2O3') by building
+the element x species matrix (plus a charge row for ionic reactions) and finding its
+integer nullspace with fraction-free Gaussian elimination: all arithmetic is on Python
+ints, so results are exact (no floating-point rounding) for reactions of any size.
+
+Species are parsed with parse_species(), so anything it accepts works here, including
+hydrates and charged species written with superscripts (Fe³⁺, MnO₄⁻) or with '^'
+(Fe^3+, MnO4^-). Electrons are written e⁻ or e-, and state symbols such as (aq) or (s)
+are ignored. Coefficients already in the equation are ignored and recalculated.
+
+Usage:
+    python equation_balancer.py reactions.txt > balanced.csv
+    python equation_balancer.py reactions.txt --jobs 0 > balanced.csv    # one worker process per CPU
+
+Example:
+    >>> print(balance("MnO4^- + Fe^2+ + H^+ -> Mn^2+ + Fe^3+ + H2O"))
+    MnO4^- + 5Fe^2+ + 8H^+ -> Mn^2+ + 5Fe^3+ + 4H2O
+
+Author: Jordan Rodger
+"""
+
+import argparse
+import csv
+import os
+import sys
+from collections import namedtuple
+from functools import lru_cache
+from math import gcd, lcm
+
+from molar_mass import DEFAULT_PARSE_CACHE_SIZE, get_atomic_numbers, parse_species
+from molar_mass_cli import DEFAULT_BUFFER_SIZE, DEFAULT_CHUNK_SIZE, _open_output, iter_formulas
+from parallel_batch import _iter_chunks, imap_chunks
+
+
+# ====== CONSTANTS ======
+# Reaction arrows, longest first so '<=>' isn't read as '='
+ARROWS = ("<=>", "<->", "->", "=>", "→", "⇌", "⟶", "=")
+ELECTRONS = frozenset(("e", "e-", "e⁻", "e^-"))
+_LEADING = frozenset("0123456789 ") # Leading coefficients (and spaces) are stripped from each species
+
+OUTPUT_FIELDS = ("equation", "balanced", "error")
+
+
+class BalancedEquation(namedtuple("BalancedEquation", ("reactants", "products"))):
+    """
+    A balanced equation: reactants and products are tuples of (coefficient, species) pairs.
+    str() gives the equation, e.g. '4Fe + 3O2 -> 2Fe2O3'.
+    """
+
+    __slots__ = ()
+
+    @property
+    def coefficients(self):
+        """The coefficients, reactants first, in the order the species were given."""
+        return tuple(coefficient for coefficient, _ in self.reactants + self.products)
+
+    def __str__(self):
+        def side(terms):
+            return " + ".join(species if coefficient == 1 else f"{coefficient}{species}"
+                              for coefficient, species in terms)
+        return f"{side(self.reactants)} -> {side(self.products)}"
+
+
+def _split_species(side):
+    """
+    Splits one side of an equation into its species. A '+' separates species unless it is
+    the sign of a '^' charge (e.g., the first '+' in 'Fe^3+ + e-').
+    """
+    species, term = [], []
+    in_charge = False # Inside a '^' charge whose sign hasn't been read yet
+    for char in side:
+        if char == "+" and not in_charge:
+            species.append("".join(term).strip())
+            term = []
+            continue
+        if char == "^":
+            in_charge = True
+        elif char in "+-":
+            in_charge = False
+        term.append(char)
+    species.append("".join(term).strip())
+    if not all(species):
+        raise ValueError(f"Empty species in: {side.strip()!r}")
+    return species
+
+
+@lru_cache(maxsize=DEFAULT_PARSE_CACHE_SIZE)
+def _parse_term(term):
+    """
+    Parses one species (without coefficient) into ((atomic_number, count) pairs, charge).
+    Cached, as reaction databases repeat the same species many times.
+    """
+    if term in ELECTRONS:
+        return (), -1
+
+    formula, charge = term, 0
+    if "^" in term:
+        formula, _, charge_text = term.rpartition("^")
+        sign = charge_text.strip("0123456789")
+        digits = charge_text.strip("+-")
+        if sign not in ("+", "-") or (digits and not digits.isdigit()):
+            raise ValueError(f"Invalid charge in species: {term!r}")
+        charge = (int(digits) if digits else 1) * (1 if sign == "+" else -1)
+
+    counts, superscript_charge = parse_species(formula)
+    atomic_numbers = get_atomic_numbers()
+    try:
+        atoms = tuple((atomic_numbers[symbol], count) for symbol, count in counts.items() if count)
+    except KeyError as e:
+        raise ValueError(f"Unknown element: {e.args[0]}") from None
+    if not atoms:
+        raise ValueError(f"No elements in species: {term!r}")
+    return atoms, charge + superscript_charge
+
+
+def parse_equation(equation):
+    """
+    Splits an equation into its reactants and products.
+
+    Args:
+        equation (str): e.g. 'Fe + O2 -> Fe2O3'.
+    Returns:
+        (reactants, products) (tuple): Lists of species (leading coefficients removed).
+    Raises:
+        ValueError: If the equation has no arrow or an empty side.
+    """
+    for arrow in ARROWS:
+        if arrow in equation:
+            left, _, right = equation.partition(arrow)
+            break
+    else:
+        raise ValueError(f"No reaction arrow ({', '.join(ARROWS)}) in equation: {equation!r}")
+
+    sides = []
+    for side in (left, right):
+        species = _split_species(side)
+        for i, term in enumerate(species):
+            start = 0
+            while start < len(term) and term[start] in _LEADING:
+                start += 1
+            species[i] = term[start:]
+        sides.append(species)
+    return tuple(sides)
+
+
+def integer_nullspace(matrix, columns):
+    """
+    Calculates a basis of the integer nullspace of a matrix with fraction-free Gaussian
+    elimination (every row operation is row_i * pivot - row_r * entry, divided by the
+    row's gcd, so entries stay small and exact).
+
+    Args:
+        matrix (list of list of int): The matrix rows.
+        columns (int): Number of columns.
+    Returns:
+        basis (list of list of int): Primitive (gcd 1) integer vectors x with matrix @ x = 0.
+    """
+    rows = [list(row) for row in matrix if any(row)]
+    pivots = [] # (row, column) of each pivot
+    r = 0
+    for c in range(columns):
+        if r == len(rows):
+            break
+        pivot = next((i for i in range(r, len(rows)) if rows[i][c]), None)
+        if pivot is None:
+            continue # Free column
+        rows[r], rows[pivot] = rows[pivot], rows[r]
+        pivot_row = rows[r]
+        p = pivot_row[c]
+        for i, row in enumerate(rows):
+            if i != r and row[c]:
+                f = row[c]
+                reduced = [p * x - f * y for x, y in zip(row, pivot_row)]
+                divisor = gcd(*reduced)
+                rows[i] = [x // divisor for x in reduced] if divisor > 1 else reduced
+        pivots.append((r, c))
+        r += 1
+
+    pivot_columns = {c for _, c in pivots}
+    basis = []
+    for free in range(columns):
+        if free in pivot_columns:
+            continue
+        # Set the free variable to a multiple of every pivot it depends on, so each
+        # pivot variable (-row[free] * scale / pivot) is a whole number
+        scale = lcm(*(rows[r][c] for r, c in pivots if rows[r][free]))
+        vector = [0] * columns
+        vector[free] = scale
+        for r, c in pivots:
+            vector[c] = -rows[r][free] * scale // rows[r][c]
+        divisor = gcd(*vector)
+        basis.append([x // divisor for x in vector])
+    return basis
+
+
+def balance(equation):
+    """
+    Balances a chemical equation with the smallest whole-number coefficients.
+
+    Args:
+        equation (str): e.g. 'Fe + O2 -> Fe2O3' or 'Cu + Ag⁺ -> Cu²⁺ + Ag'.
+    Returns:
+        (BalancedEquation): str() of which is the balanced equation, e.g. '4Fe + 3O2 -> 2Fe2O3'.
+    Raises:
+        ValueError: If a species can't be parsed, or the equation can't be balanced, or can be
+            balanced in more than one independent way (e.g., two reactions written as one).
+    """
+    reactants, products = parse_equation(equation)
+    species = reactants + products
+    parsed = [_parse_term(term) for term in species]
+
+    # Element x species matrix, products negated (so balanced means matrix @ coefficients = 0),
+    # with a final row for charge
+    elements = sorted({atomic_number for atoms, _ in parsed for atomic_number, _ in atoms})
+    row_of = {atomic_number: i for i, atomic_number in enumerate(elements)}
+    matrix = [[0] * len(species) for _ in range(len(elements) + 1)]
+    for column, (atoms, charge) in enumerate(parsed):
+        sign = 1 if column < len(reactants) else -1
+        for atomic_number, count in atoms:
+            matrix[row_of[atomic_number]][column] = sign * count
+        matrix[-1][column] = sign * charge
+
+    basis = integer_nullspace(matrix, len(species))
+    if not basis:
+        raise ValueError(f"Equation can't be balanced: {equation!r}")
+    if len(basis) > 1:
+        raise ValueError(f"Equation can be balanced in {len(basis)} independent ways "
+                         f"(split it into separate reactions): {equation!r}")
+
+    coefficients = basis[0]
+    if coefficients[0] < 0:
+        coefficients = [-x for x in coefficients]
+    if any(x <= 0 for x in coefficients):
+        raise ValueError(f"Equation can't be balanced with every species taking part: {equation!r}")
+
+    terms = list(zip(coefficients, species))
+    return BalancedEquation(tuple(terms[:len(reactants)]), tuple(terms[len(reactants):]))
+
+
+def balance_rows(equations):
+    """
+    Balances a batch of equations, capturing errors per equation instead of stopping.
+
+    Args:
+        equations (list of str): The equations.
+    Returns:
+        rows (list of tuple): (equation, balanced equation string, error) for each equation,
+        in order; the balanced equation is None when error is set, and vice versa.
+    """
+    rows = []
+    for equation in equations:
+        try:
+            rows.append((equation, str(balance(equation)), None))
+        except ValueError as e:
+            rows.append((equation, None, str(e)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Balance chemical equations read from files or stdin.")
+    parser.add_argument("inputs", nargs="*", default=["-"],
+                        help="Input files, one equation per line ('-' or none for stdin)")
+    parser.add_argument("--output", "-o", default="-", help="Output CSV file (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Equations balanced at a time (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes to balance with (0 = one per CPU; default: 1)")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        raise SystemExit("--chunk-size must be at least 1")
+    if args.jobs < 0:
+        raise SystemExit("--jobs must be 0 or more")
+
+    equations = iter_formulas(args.inputs) # One equation per (non-blank) line
+    try:
+        with _open_output(args.output, DEFAULT_BUFFER_SIZE) as out:
+            writer = csv.writer(out, lineterminator="\n")
+            writer.writerow(OUTPUT_FIELDS)
+            if args.jobs == 1:
+                chunks = map(balance_rows, _iter_chunks(equations, args.chunk_size))
+            else:
+                chunks = imap_chunks(balance_rows, equations, args.jobs or None, args.chunk_size)
+            for rows in chunks:
+                writer.writerows((equation, balanced or "", error or "") for equation, balanced, error in rows)
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Theoretical isotope pattern (mass spectrum) generator.
+
+Calculates the isotopic distribution of a chemical formula: the masses at which its
+molecules appear in a mass spectrum and their relative intensities, using the natural
+isotopic compositions in 'isotopes.json' (written by elements_json_creation.py).
+
+Rather than expanding every combination of isotopes (which grows combinatorially with
+the number of atoms), each element's distribution is raised to the power of its atom
+count by repeated squaring, and the element distributions are then convolved together.
+After every convolution:
+    - Peaks closer together than `resolution` (in Da) are merged into one peak at their
+      abundance-weighted mean mass (centroid), so the peak count stays small
+    - Peaks with an abundance below `threshold` are pruned
+
+With NumPy installed, each convolution is a vectorised outer product; otherwise a
+pure-Python version is used.
+
+Example:
+    >>> for peak in isotope_pattern("C6H12O6"):
+    ...     print(f"{peak.mass:.4f} {peak.intensity:.2f}%")
+
+Author: Jordan Rodger
+"""
+
+from collections import namedtuple
+
+from composition import Composition
+from molar_mass import _numpy, parse_formula_cached
+from periodic_table import ISOTOPES_FILE, get_isotopes, load_isotopes # noqa: F401 (re-exported)
+
+
+# ====== CONSTANTS ======
+DEFAULT_RESOLUTION = 0.01 # Da; peaks closer than this are merged
+DEFAULT_THRESHOLD = 1e-9 # Peaks with a lower abundance (probability) are pruned during convolution
+DEFAULT_MIN_INTENSITY = 0.01 # % of the base peak; weaker peaks are left out of the result
+
+IsotopePeak = namedtuple("IsotopePeak", ("mass", "abundance", "intensity"))
+
+
+def _convolve_python(a, b, resolution, threshold):
+    """
+    Convolves two distributions, each a list of (mass, abundance) sorted by abundance (highest first).
+    """
+    bins = {} # {bin index: [abundance, abundance-weighted mass sum]}
+    for mass_a, abundance_a in a:
+        if abundance_a * b[0][1] < threshold:
+            break # Sorted by abundance, so no later peak of `a` can pass the threshold either
+        for mass_b, abundance_b in b:
+            abundance = abundance_a * abundance_b
+            if abundance < threshold:
+                break
+            mass = mass_a + mass_b
+            key = round(mass / resolution)
+            entry = bins.get(key)
+            if entry is None:
+                bins[key] = [abundance, mass * abundance]
+            else:
+                entry[0] += abundance
+                entry[1] += mass * abundance
+
+    peaks = [(weighted_mass / abundance, abundance) for abundance, weighted_mass in bins.values()]
+    peaks.sort(key=lambda peak: -peak[1])
+    return peaks
+
+
+def _convolve_numpy(a, b, resolution, threshold):
+    """
+    Convolves two distributions, each a (masses, abundances) pair of NumPy arrays.
+    """
+    np = _numpy()
+    masses_a, abundances_a = a
+    masses_b, abundances_b = b
+    abundances = np.multiply.outer(abundances_a, abundances_b).ravel()
+    keep = abundances >= threshold
+    abundances = abundances[keep]
+    masses = np.add.outer(masses_a, masses_b).ravel()[keep]
+
+    # Merge peaks that fall into the same `resolution`-wide bin, at their centroid mass
+    _, bin_of_peak = np.unique(np.rint(masses / resolution).astype(np.int64), return_inverse=True)
+    merged_abundances = np.bincount(bin_of_peak, weights=abundances)
+    merged_masses = np.bincount(bin_of_peak, weights=masses * abundances) / merged_abundances
+    return merged_masses, merged_abundances
+
+
+def _power(distribution, count, convolve, resolution, threshold):
+    """Raises a distribution to the power `count` (count atoms of one element) by repeated squaring."""
+    result = None
+    while count:
+        if count & 1:
+            result = distribution if result is None else convolve(result, distribution, resolution, threshold)
+        count >>= 1
+        if count:
+            distribution = convolve(distribution, distribution, resolution, threshold)
+    return result
+
+
+def isotope_pattern(formula, resolution=DEFAULT_RESOLUTION, threshold=DEFAULT_THRESHOLD,
+                    min_intensity=DEFAULT_MIN_INTENSITY):
+    """
+    Calculates the isotope pattern of a formula.
+
+    Args:
+        formula (str or Composition): The chemical formula, e.g. 'C6H12O6'.
+        resolution (float): Peaks closer than this (in Da) are merged into one, at their
+            centroid mass. Use ~1 for nominal-mass patterns, or smaller to keep fine structure.
+        threshold (float): Partial peaks with an abundance (probability) below this are
+            pruned during the calculation; lower is more accurate but slower.
+        min_intensity (float): Leave out peaks weaker than this % of the base (largest) peak.
+    Returns:
+        peaks (list of IsotopePeak): (mass, abundance, intensity) sorted by mass, where
+        abundance is the peak's probability and intensity is its % of the base peak.
+    Raises:
+        ValueError: If the formula is invalid, or an element has no isotope data
+            (e.g., synthetic elements).
+    """
+    composition = formula if isinstance(formula, Composition) else parse_formula_cached(formula)
+    isotopes = get_isotopes()
+
+    np = _numpy()
+    if np is not None:
+        convolve = _convolve_numpy
+        as_distribution = lambda peaks: (np.array([m for m, _ in peaks]), np.array([a for _, a in peaks]))
+    else:
+        convolve = _convolve_python
+        as_distribution = list
+
+    result = None
+    for symbol, count in composition.items():
+        if symbol not in isotopes:
+            raise ValueError(f"No isotope data for element: {symbol}")
+        element = _power(as_distribution(isotopes[symbol]), count, convolve, resolution, threshold)
+        result = element if result is None else convolve(result, element, resolution, threshold)
+
+    if result is None:
+        return []
+    if np is not None:
+        result = list(zip(result[0].tolist(), result[1].tolist()))
+
+    base = max(abundance for _, abundance in result)
+    return sorted(
+        IsotopePeak(mass, abundance, abundance / base * 100)
+        for mass, abundance in result
+        if abundance / base * 100 >= min_intensity
+    )
@@ -0,0 +1,177 @@
+"""
+Load test for the HTTP service (molar_mass_service.py).
+
+Opens many keep-alive connections at once and sends requests over each of them, with
+several requests pipelined per connection, then reports throughput and latency
+percentiles. Uses asyncio and raw HTTP/1.1 (standard library only), so the client
+itself is cheap enough not to be the bottleneck.
+
+Two kinds of load:
+    - Single lookups: GET /mass (or /composition) with formulas drawn from a mix of common
+      formulas and random CHNOPS formulas (so the parse cache doesn't answer everything)
+    - Batches (--batch N): POST /batch/mass with N formulas per request, streamed back as
+      JSON Lines; reports formulas per second as well
+
+Usage:
+    python molar_mass_service.py --port 8080 &
+    python load_test.py --url http://127.0.0.1:8080 --connections 32 --requests 20000 --pipeline 8
+    python load_test.py --url http://127.0.0.1:8080 --connections 4 --requests 20 --batch 100000
+
+Exits with status 1 if any request failed (non-200 status or connection error).
+
+Author: Jordan Rodger
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from urllib.parse import quote, urlsplit
+
+
+# ====== CONSTANTS ======
+DEFAULT_URL = "http://127.0.0.1:8080"
+DEFAULT_CONNECTIONS = 16
+DEFAULT_REQUESTS = 10000 # In total, across every connection
+DEFAULT_PIPELINE = 4 # Requests sent per connection before waiting for the responses
+
+COMMON_FORMULAS = (
+    "H2O", "CO2", "NaCl", "C6H12O6", "CH3COOH", "Al2(SO4)3", "CuSO4·5H2O", "C8H10N4O2",
+    "Fe2O3", "Ca3(PO4)2", "K4[Fe(CN)6]", "C27H46O", "(NH4)2SO4", "Mg(OH)2",
+)
+
+
+def random_formula(rng):
+    """Returns a random formula: 80% common ones, 20% random CHNOPS compositions."""
+    if rng.random() < 0.8:
+        return rng.choice(COMMON_FORMULAS)
+    counts = {"C": rng.randint(1, 60), "H": rng.randint(1, 120), "N": rng.randint(0, 10),
+              "O": rng.randint(0, 20), "P": rng.randint(0, 2), "S": rng.randint(0, 3)}
+    return "".join(f"{symbol}{count}" for symbol, count in counts.items() if count)
+
+
+async def read_response(reader):
+    """
+    Reads one HTTP/1.1 response (Content-Length or chunked body).
+
+    Returns:
+        (status, body) (tuple): The status code (int) and the body (bytes).
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+    status = int(status_line.split(" ", 2)[1])
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding") == "chunked":
+        parts = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+            data = await reader.readexactly(size + 2) # Chunk + CRLF
+            if not size:
+                break
+            parts.append(data[:-2])
+        return status, b"".join(parts)
+    return status, await reader.readexactly(int(headers.get("content-length", 0)))
+
+
+def _get_request(host, path, formula):
+    return f"GET {path}?formula={quote(formula)} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1")
+
+
+def _batch_request(host, formulas):
+    body = json.dumps({"formulas": formulas}).encode("utf-8")
+    head = (f"POST /batch/mass HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def _connection(url, requests, pipeline, make_request, latencies, failures):
+    """Sends `requests` requests over one connection, `pipeline` at a time."""
+    try:
+        reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    except OSError:
+        failures.append("connect")
+        return
+    try:
+        sent = 0
+        while sent < requests:
+            batch = min(pipeline, requests - sent)
+            started = time.perf_counter()
+            writer.write(b"".join(make_request() for _ in range(batch)))
+            await writer.drain()
+            for _ in range(batch):
+                status, _ = await read_response(reader)
+                latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    failures.append(status)
+            sent += batch
+    except (OSError, asyncio.IncompleteReadError) as e:
+        failures.append(type(e).__name__)
+    finally:
+        writer.close()
+
+
+async def run(url, connections, requests, pipeline, batch_size, path, seed):
+    """Runs the load test, returning (elapsed seconds, latencies, failures)."""
+    rng = random.Random(seed)
+    host = url.netloc
+    if batch_size:
+        formulas = [random_formula(rng) for _ in range(batch_size)]
+        make_request = lambda: _batch_request(host, formulas)
+        pipeline = 1 # Batch responses are large; send the next once this one has arrived
+    else:
+        make_request = lambda: _get_request(host, path, random_formula(rng))
+
+    latencies, failures = [], []
+    per_connection = [requests // connections + (i < requests % connections) for i in range(connections)]
+    started = time.perf_counter()
+    await asyncio.gather(*(_connection(url, count, pipeline, make_request, latencies, failures)
+                           for count in per_connection if count))
+    return time.perf_counter() - started, latencies, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the molar mass HTTP service.")
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"Service URL (default: {DEFAULT_URL})")
+    parser.add_argument("--connections", "-c", type=int, default=DEFAULT_CONNECTIONS,
+                        help=f"Concurrent connections (default: {DEFAULT_CONNECTIONS})")
+    parser.add_argument("--requests", "-n", type=int, default=DEFAULT_REQUESTS,
+                        help=f"Total requests (default: {DEFAULT_REQUESTS})")
+    parser.add_argument("--pipeline", "-p", type=int, default=DEFAULT_PIPELINE,
+                        help=f"Requests pipelined per connection (default: {DEFAULT_PIPELINE})")
+    parser.add_argument("--batch", type=int, metavar="N", help="Send POST /batch/mass requests of N formulas")
+    parser.add_argument("--endpoint", choices=("/mass", "/composition"), default="/mass",
+                        help="Endpoint for single lookups (default: /mass)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the formulas (default: 0)")
+    args = parser.parse_args(argv)
+    if min(args.connections, args.requests, args.pipeline) < 1:
+        raise SystemExit("--connections, --requests and --pipeline must be at least 1")
+
+    url = urlsplit(args.url)
+    elapsed, latencies, failures = asyncio.run(
+        run(url, args.connections, args.requests, args.pipeline, args.batch, args.endpoint, args.seed)
+    )
+
+    completed = len(latencies)
+    print(f"{completed} requests in {elapsed:.2f} s: {completed / elapsed:,.0f} requests/s")
+    if args.batch:
+        print(f"{completed * args.batch / elapsed:,.0f} formulas/s ({args.batch} formulas per request)")
+    if latencies:
+        latencies.sort()
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+        print(f"Latency (ms): mean {statistics.fmean(latencies) * 1000:.2f}, p50 {percentile(50):.2f}, "
+              f"p90 {percentile(90):.2f}, p99 {percentile(99):.2f}, max {latencies[-1] * 1000:.2f}")
+    if failures:
+        print(f"{len(failures)} failed requests, e.g. {failures[:5]}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Persistent, on-disk cache of molar mass results, shared across runs and processes.
+
+Jobs that calculate the same catalogue every night can keep their results in a local
+SQLite file and only calculate formulas they haven't seen before:
+    - Results are keyed by canonical formula (Hill notation, so 'CH3COOH' and 'C2H4O2'
+      share one entry) and by dataset version: a fingerprint of the atomic masses used
+      (see dataset_version). When elements.json changes, so does the version, and results
+      calculated from the old masses are simply never looked up again (prune() deletes them).
+    - The database is in WAL (write-ahead log) mode, so any number of worker processes can
+      read it while one writes, and each process uses its own connection.
+    - Lookups are batched (one SELECT per few hundred formulas) and new results are
+      written with a single executemany per chunk, in one transaction.
+
+Usage:
+    python molar_mass_cli.py catalogue.txt --cache masses.sqlite > masses.csv
+    python mass_cache.py masses.sqlite --prune    # delete results from old datasets
+
+Example:
+    >>> with MassCache("masses.sqlite") as cache:
+    ...     rows = cache.molar_mass_rows(["H2O", "CH3COOH"])
+
+Author: Jordan Rodger
+"""
+
+import argparse
+import sqlite3
+import sys
+from decimal import Decimal
+
+from molar_mass import MASS_MODES, calculate_molar_mass_rows, mass_column_hash, parse_formula_cached
+
+
+# ====== CONSTANTS ======
+# Seconds to wait for another process's write to finish before giving up
+DEFAULT_TIMEOUT = 30.0
+
+# Formulas looked up per SELECT (each is one bound parameter; SQLite allows at least 999)
+LOOKUP_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS masses (
+    version TEXT NOT NULL,  -- dataset_version(mode, exact)
+    formula TEXT NOT NULL,  -- Hill formula
+    mass NOT NULL,          -- REAL, or TEXT (a decimal string) for exact masses
+    PRIMARY KEY (version, formula)
+) WITHOUT ROWID
+"""
+
+# Per-process caches opened by cached_molar_mass_rows(), {filename: MassCache}
+_caches = {}
+
+
+def dataset_version(mode="average", exact=False):
+    """
+    Returns the version of the masses that results are calculated from.
+
+    Args:
+        mode (str): "average" or "monoisotopic" (see molar_mass.MASS_MODES).
+        exact (bool): Exact Decimal results rather than floats.
+    Returns:
+        (str): e.g. 'average:3f9a1c0d2b7e4a65', where the hex part is a hash of the
+            mass column for the mode, so it changes whenever any atomic mass does.
+    """
+    fingerprint = mass_column_hash(mode, digest_size=8).hex()
+    return f"{mode}{'-exact' if exact else ''}:{fingerprint}"
+
+
+class MassCache:
+    """
+    SQLite-backed cache of molar masses (see the module docstring).
+
+    Args:
+        filename (str): Path to the SQLite database; created if it doesn't exist.
+        timeout (float): Seconds to wait for another process's write lock.
+    """
+
+    def __init__(self, filename, timeout=DEFAULT_TIMEOUT):
+        self.filename = filename
+        self._connection = sqlite3.connect(filename, timeout=timeout)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL") # Safe in WAL mode; only the last commits can be lost on power failure
+        with self._connection:
+            self._connection.execute(_SCHEMA)
+
+    def close(self):
+        """Closes the database connection."""
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_many(self, formulas, mode="average", exact=False):
+        """
+        Looks up cached masses.
+
+        Args:
+            formulas (iterable of str): Hill formulas (see Composition.hill_formula).
+            mode (str): "average" or "monoisotopic".
+            exact (bool): Look up exact Decimal masses rather than floats.
+        Returns:
+            (dict): {formula: mass} for the formulas found; missing formulas are left out.
+        """
+        version = dataset_version(mode, exact)
+        formulas = list(formulas)
+        found = {}
+        for start in range(0, len(formulas), LOOKUP_BATCH_SIZE):
+            batch = formulas[start:start + LOOKUP_BATCH_SIZE]
+            query = (f"SELECT formula, mass FROM masses WHERE version = ? "
+                     f"AND formula IN ({', '.join('?' * len(batch))})")
+            found.update(self._connection.execute(query, [version, *batch]))
+        if exact:
+            found = {formula: Decimal(mass) for formula, mass in found.items()}
+        return found
+
+    def put_many(self, masses, mode="average", exact=False):
+        """
+        Stores masses, in one transaction.
+
+        Args:
+            masses (iterable of tuple): (Hill formula, mass) pairs.
+            mode (str): "average" or "monoisotopic".
+            exact (bool): The masses are exact Decimals (stored as decimal strings).
+        """
+        version = dataset_version(mode, exact)
+        convert = str if exact else float
+        with self._connection:
+            # OR IGNORE: another process may have stored the same (identical) result already
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO masses (version, formula, mass) VALUES (?, ?, ?)",
+                ((version, formula, convert(mass)) for formula, mass in masses),
+            )
+
+    def molar_mass_rows(self, formulas, mode="average", exact=False):
+        """
+        Cached version of molar_mass.calculate_molar_mass_rows(): formulas found in the
+        cache aren't calculated again, and new results are added to it.
+
+        Args:
+            formulas (list of str): The chemical formulas.
+            mode (str): "average" or "monoisotopic".
+            exact (bool): Calculate exact Decimal masses (see molar_mass.calculate_molar_mass).
+        Returns:
+            rows (list of tuple): (formula, molar_mass, error) for each formula, in order.
+        """
+        if mode not in MASS_MODES:
+            raise ValueError(f"Unknown mass mode: {mode!r} (expected one of {MASS_MODES})")
+
+        keys = [] # Hill formula of each formula, or the parse error
+        compositions = {} # {Hill formula: Composition}, distinct
+        for formula in formulas:
+            try:
+                composition = parse_formula_cached(formula)
+            except ValueError as e:
+                keys.append(e)
+                continue
+            key = composition.hill_formula()
+            compositions.setdefault(key, composition)
+            keys.append(key)
+
+        results = {key: (mass, None) for key, mass in self.get_many(compositions, mode, exact).items()}
+        missing = [key for key in compositions if key not in results]
+        if missing:
+            calculated = calculate_molar_mass_rows([compositions[key] for key in missing], mode=mode, exact=exact)
+            new = []
+            for key, (_, mass, error) in zip(missing, calculated):
+                results[key] = (mass, error)
+                if error is None:
+                    new.append((key, mass))
+            if new:
+                self.put_many(new, mode, exact)
+
+        rows = []
+        for formula, key in zip(formulas, keys):
+            if isinstance(key, ValueError):
+                rows.append((formula, None, str(key)))
+            else:
+                rows.append((formula, *results[key]))
+        return rows
+
+    def prune(self):
+        """
+        Deletes results calculated from masses other than the current ones.
+
+        Returns:
+            (int): The number of results deleted.
+        """
+        current = [dataset_version(mode, exact) for mode in MASS_MODES for exact in (False, True)]
+        with self._connection:
+            cursor = self._connection.execute(
+                f"DELETE FROM masses WHERE version NOT IN ({', '.join('?' * len(current))})", current
+            )
+        return cursor.rowcount
+
+    def stats(self):
+        """Returns {version: number of results} for every dataset version in the cache."""
+        return dict(self._connection.execute("SELECT version, COUNT(*) FROM masses GROUP BY version"))
+
+
+def cached_molar_mass_rows(formulas, filename, mode="average", exact=False):
+    """
+    MassCache.molar_mass_rows() on a cache file opened once per process, so it can be
+    used from worker processes (e.g., with functools.partial and parallel_batch.imap_chunks).
+
+    Args:
+        formulas (list of str): The chemical formulas.
+        filename (str): Path to the SQLite cache.
+        mode (str): "average" or "monoisotopic".
+        exact (bool): Calculate exact Decimal masses.
+    Returns:
+        rows (list of tuple): (formula, molar_mass, error) for each formula, in order.
+    """
+    cache = _caches.get(filename)
+    if cache is None:
+        cache = _caches[filename] = MassCache(filename)
+    return cache.molar_mass_rows(formulas, mode, exact)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or prune a molar mass cache.")
+    parser.add_argument("cache", help="SQLite cache file")
+    parser.add_argument("--prune", action="store_true", help="Delete results calculated from old datasets")
+    args = parser.parse_args(argv)
+
+    try:
+        with MassCache(args.cache) as cache:
+            if args.prune:
+                print(f"Deleted {cache.prune()} results from old datasets", file=sys.stderr)
+            for version, count in sorted(cache.stats().items()):
+                print(f"{version}\t{count}")
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
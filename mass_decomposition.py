@@ -0,0 +1,284 @@
+"""
+Inverse mass search: finds the chemical formulas whose mass matches a measured mass.
+
+Given a target mass and tolerance, enumerates every composition over a chosen set of
+elements (e.g., CHNOPS) whose mass falls within target ± tolerance, using branch-and-bound:
+    - Elements are branched on heaviest first; the lightest (usually H) is never branched
+      on, as its count range is solved directly from the remaining mass.
+    - Each element's count range is worked out in closed form from the remaining mass
+      window and, when RDBE limits are set, from the valences still achievable by the
+      lighter elements (a linear relaxation), so hopeless branches are never entered.
+    - Candidates are filtered with heuristic chemistry rules: RDBE (rings plus double bonds)
+      limits, element/carbon ratios (the "common range" of Kind & Fiehn's Seven Golden
+      Rules, also used as bounds while branching) and, optionally, the even-electron
+      (integer RDBE) rule.
+
+Masses come from the same tables as calculate_molar_mass(): average atomic masses by
+default, or monoisotopic masses (mode="monoisotopic", usual for mass spectrometry).
+
+Usage:
+    python mass_decomposition.py 180.0634 --mode monoisotopic --ppm 5
+    python mass_decomposition.py 342.15 --elements C H N O S Al --tolerance 0.01 --max-count S=5
+    python molar_mass_cli.py decompose 180.0634 --mode monoisotopic --ppm 5   # the same, as a subcommand
+
+Example:
+    >>> for candidate in decompose_mass(180.0634, ppm=5, mode="monoisotopic"):
+    ...     print(candidate.formula, candidate.error)
+
+Author: Jordan Rodger
+"""
+
+import argparse
+import math
+import sys
+from collections import namedtuple
+
+from composition import Composition, hill_formula
+from molar_mass import MASS_MODES, calculate_molar_mass, get_atomic_numbers
+
+
+# ====== CONSTANTS ======
+DEFAULT_ELEMENTS = ("C", "H", "N", "O", "P", "S")
+DEFAULT_TOLERANCE = 0.005 # Da
+DEFAULT_MIN_RDBE = 0
+DEFAULT_MAX_RDBE = 40
+
+# Common valences used by the RDBE filter; others can be passed with `valences`
+DEFAULT_VALENCES = {
+    "H": 1, "D": 1, "Li": 1, "Na": 1, "K": 1, "F": 1, "Cl": 1, "Br": 1, "I": 1,
+    "O": 2, "S": 2, "Se": 2, "Mg": 2, "Ca": 2,
+    "B": 3, "N": 3, "P": 3, "Al": 3, "As": 3,
+    "C": 4, "Si": 4,
+}
+
+# Maximum element/carbon count ratios (Seven Golden Rules, common range: covers ~99.7% of
+# known organic compounds). Only used when carbon is one of the elements.
+DEFAULT_ELEMENT_RATIOS = {"H": 3.1, "N": 1.3, "O": 1.2, "P": 0.3, "S": 0.8, "F": 1.5, "Cl": 0.8, "Br": 0.8, "Si": 0.5}
+
+# Slack for floating-point rounding when turning bounds into whole counts
+_EPSILON = 1e-9
+
+Decomposition = namedtuple("Decomposition", ("formula", "composition", "mass", "error", "rdbe"))
+
+
+def _count_bounds(a, b, low, high):
+    """Narrows [low, high] to the whole counts n satisfying a * n >= b."""
+    if a > 0:
+        return max(low, math.ceil(b / a - _EPSILON)), high
+    if a < 0:
+        return low, min(high, math.floor(b / a + _EPSILON))
+    return (low, high) if b <= _EPSILON else (low, low - 1) # a == 0: all or nothing
+
+
+def decompose_mass(target, tolerance=DEFAULT_TOLERANCE, elements=DEFAULT_ELEMENTS, ppm=None,
+                   min_counts=None, max_counts=None, min_rdbe=DEFAULT_MIN_RDBE, max_rdbe=DEFAULT_MAX_RDBE,
+                   even_electron=False, element_ratios=DEFAULT_ELEMENT_RATIOS, valences=None,
+                   element_masses=None, mode="average"):
+    """
+    Finds every composition over `elements` whose mass is within tolerance of the target.
+
+    Args:
+        target (float): The measured mass.
+        tolerance (float): Maximum absolute mass error (in Da). Ignored if ppm is given.
+        elements (iterable of str): Element symbols the compositions are built from.
+        ppm (float, optional): Maximum relative mass error, in parts per million of the target.
+        min_counts (dict, optional): {symbol: minimum count} (default 0).
+        max_counts (dict, optional): {symbol: maximum count} (default: as many as fit).
+        min_rdbe (float, optional): Minimum rings plus double bonds (None to disable).
+        max_rdbe (float, optional): Maximum rings plus double bonds (None to disable).
+        even_electron (bool): Only keep compositions with a whole-number RDBE
+            (even-electron, e.g. neutral molecules).
+        element_ratios (dict, optional): {symbol: maximum count per carbon atom}, applied when
+            carbon is one of the elements (None to disable, e.g. for inorganic compounds).
+        valences (dict, optional): {symbol: valence}, overriding DEFAULT_VALENCES for the RDBE filter.
+        element_masses (dict, optional): {symbol: mass}; overrides mode (see calculate_molar_mass).
+        mode (str): "average" or "monoisotopic" masses (see molar_mass.MASS_MODES).
+    Returns:
+        candidates (list of Decomposition): (formula, composition, mass, error, rdbe),
+        closest match first; formula is in Hill notation and error is mass - target.
+        composition is a Composition, or a {symbol: count} dict if element_masses has
+        symbols outside the periodic table.
+        rdbe is None when no RDBE rule is used.
+    Raises:
+        ValueError: If an element is unknown, has no mass, or has no valence while an RDBE rule is used.
+    """
+    if ppm is not None:
+        tolerance = target * ppm / 1e6
+    low_mass, high_mass = target - tolerance, target + tolerance
+    min_counts = min_counts or {}
+    max_counts = max_counts or {}
+    use_rdbe = min_rdbe is not None or max_rdbe is not None or even_electron
+    valences = {**DEFAULT_VALENCES, **(valences or {})}
+
+    # Element data, heaviest first: (symbol, mass, valence - 2, min count, max count, max count per C)
+    symbols = list(dict.fromkeys(elements))
+    if not symbols:
+        return []
+    element_ratios = element_ratios if element_ratios and "C" in symbols else {}
+    levels = []
+    for symbol in symbols:
+        mass = calculate_molar_mass(symbol, element_masses, mode) # Raises for unknown elements
+        if mass <= 0:
+            raise ValueError(f"Element mass must be positive: {symbol}")
+        if use_rdbe and symbol not in valences:
+            raise ValueError(f"No valence for element: {symbol} (pass it in valences)")
+        levels.append((symbol, mass, valences.get(symbol, 2) - 2, min_counts.get(symbol, 0),
+                       max_counts.get(symbol, math.inf), element_ratios.get(symbol) if symbol != "C" else None))
+    levels.sort(key=lambda level: -level[1])
+    carbon_level = next((k for k, level in enumerate(levels) if level[0] == "C"), None)
+    carbon_mass = levels[carbon_level][1] if carbon_level is not None else 0.0
+
+    # RDBE = 1 + S / 2, where S is the sum of count * (valence - 2) over the elements, so
+    # the RDBE limits become limits on S
+    min_s = -math.inf if min_rdbe is None else 2 * (min_rdbe - 1)
+    max_s = math.inf if max_rdbe is None else 2 * (max_rdbe - 1)
+
+    # For each level, the largest and smallest S per Da of mass that the lighter elements
+    # (the levels after it) can reach: bounds on the S they can add to a given remaining mass
+    suffix_max_ratio, suffix_min_ratio = [0.0] * len(levels), [0.0] * len(levels)
+    for k in range(len(levels) - 1):
+        ratios = [level[2] / level[1] for level in levels[k + 1:]]
+        suffix_max_ratio[k], suffix_min_ratio[k] = max(ratios), min(ratios)
+
+    # Mass of the minimum counts of the lighter elements, which must still fit after each level
+    suffix_min_mass = [sum(level[1] * level[3] for level in levels[k + 1:]) for k in range(len(levels))]
+
+    last = len(levels) - 1
+    last_mass = levels[last][1]
+    window = high_mass - low_mass + _EPSILON
+    counts = [0] * len(levels)
+    found = []
+
+    def search(k, mass, s, min_carbon, carbon):
+        # min_carbon: carbon atoms needed by the element ratios of the heavier elements so far.
+        # carbon: the carbon count, once it has been branched on (None before then)
+        _, element_mass, d, low, high, ratio = levels[k]
+        remaining_low, remaining_high = low_mass - mass, high_mass - mass
+        if k == carbon_level:
+            low = max(low, math.ceil(min_carbon - _EPSILON))
+        elif ratio is not None and carbon is not None:
+            high = min(high, math.floor(ratio * carbon + _EPSILON))
+
+        if k == last:
+            # Lightest element: solve for its count directly
+            low = max(low, math.ceil(remaining_low / element_mass - _EPSILON))
+            high = min(high, math.floor(remaining_high / element_mass + _EPSILON))
+            if min_s > -math.inf:
+                low, high = _count_bounds(d, min_s - s, low, high)
+            if max_s < math.inf:
+                low, high = _count_bounds(-d, s - max_s, low, high)
+            for n in range(low, high + 1):
+                counts[k] = n
+                total = mass + n * element_mass
+                if low_mass <= total <= high_mass and min_s <= s + n * d <= max_s:
+                    if not (even_electron and (s + n * d) % 2):
+                        found.append((tuple(counts), total, s + n * d))
+            return
+
+        # The lighter elements need room for their minimum counts
+        high = min(high, math.floor((remaining_high - suffix_min_mass[k]) / element_mass + _EPSILON))
+        if use_rdbe:
+            # With n of this element, the lighter elements fill remaining_high - n * mass at most,
+            # adding at most max_ratio (at least min_ratio) S per Da. Both bounds are linear in n.
+            max_ratio, min_ratio = suffix_max_ratio[k], suffix_min_ratio[k]
+            if min_s > -math.inf and max_ratio > 0:
+                low, high = _count_bounds(d - element_mass * max_ratio,
+                                          min_s - s - remaining_high * max_ratio, low, high)
+            if max_s < math.inf and min_ratio < 0:
+                low, high = _count_bounds(element_mass * min_ratio - d,
+                                          s + remaining_high * min_ratio - max_s, low, high)
+
+        needs_carbon = ratio is not None and carbon is None
+        before_last = k == last - 1
+        for n in range(low, high + 1):
+            if before_last and (remaining_high - n * element_mass) % last_mass > window:
+                continue # No whole number of the last element lands in the mass window
+            counts[k] = n
+            if needs_carbon:
+                # The carbon these atoms need must still fit (and more atoms need more carbon)
+                min_carbon_n = max(min_carbon, n / ratio)
+                if math.ceil(min_carbon_n - _EPSILON) * carbon_mass > remaining_high - n * element_mass:
+                    break
+                search(k + 1, mass + n * element_mass, s + n * d, min_carbon_n, carbon)
+            else:
+                search(k + 1, mass + n * element_mass, s + n * d, min_carbon, n if k == carbon_level else carbon)
+        counts[k] = 0
+
+    search(0, 0.0, 0, 0, None)
+
+    atomic_numbers = get_atomic_numbers()
+    # Custom element_masses can have symbols outside the periodic table (e.g., D), which a
+    # Composition can't hold; their candidates get plain {symbol: count} dicts instead
+    in_table = all(level[0] in atomic_numbers for level in levels)
+    order = [atomic_numbers[level[0]] for level in levels] if in_table else None
+    candidates = []
+    for level_counts, mass, s in found:
+        if in_table:
+            composition = Composition.from_pairs(tuple(sorted(
+                (atomic_number, count) for atomic_number, count in zip(order, level_counts) if count
+            )))
+        else:
+            composition = {level[0]: count for level, count in zip(levels, level_counts) if count}
+        if not composition:
+            continue
+        rdbe = 1 + s / 2 if use_rdbe else None
+        candidates.append(Decomposition(hill_formula(composition), composition, mass, mass - target, rdbe))
+    candidates.sort(key=lambda candidate: abs(candidate.error))
+    return candidates
+
+
+def _parse_counts(values):
+    counts = {}
+    for value in values or ():
+        symbol, _, count = value.partition("=")
+        if not count.isdigit():
+            raise SystemExit(f"Expected SYMBOL=COUNT, got {value!r}")
+        counts[symbol] = int(count)
+    return counts
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Find the chemical formulas matching a measured mass.")
+    parser.add_argument("mass", type=float, help="Target mass")
+    parser.add_argument("--elements", nargs="+", default=list(DEFAULT_ELEMENTS),
+                        help=f"Element symbols to build formulas from (default: {' '.join(DEFAULT_ELEMENTS)})")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Mass tolerance in Da (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--ppm", type=float, help="Mass tolerance in ppm (overrides --tolerance)")
+    parser.add_argument("--mode", choices=MASS_MODES, default="average",
+                        help="Average atomic masses, or monoisotopic (exact) masses (default: average)")
+    parser.add_argument("--min-count", action="append", metavar="SYMBOL=COUNT", help="Minimum count of an element")
+    parser.add_argument("--max-count", action="append", metavar="SYMBOL=COUNT", help="Maximum count of an element")
+    parser.add_argument("--min-rdbe", type=float, default=DEFAULT_MIN_RDBE,
+                        help=f"Minimum rings plus double bonds (default: {DEFAULT_MIN_RDBE})")
+    parser.add_argument("--max-rdbe", type=float, default=DEFAULT_MAX_RDBE,
+                        help=f"Maximum rings plus double bonds (default: {DEFAULT_MAX_RDBE})")
+    parser.add_argument("--no-rdbe", action="store_true", help="Don't filter by RDBE")
+    parser.add_argument("--no-ratios", action="store_true",
+                        help="Don't limit element/carbon ratios (e.g., for inorganic compounds)")
+    parser.add_argument("--even-electron", action="store_true", help="Only whole-number RDBE (even-electron)")
+    parser.add_argument("--limit", type=int, help="Print at most this many candidates")
+    args = parser.parse_args(argv)
+
+    try:
+        candidates = decompose_mass(
+            args.mass, args.tolerance, args.elements, ppm=args.ppm,
+            min_counts=_parse_counts(args.min_count), max_counts=_parse_counts(args.max_count),
+            min_rdbe=None if args.no_rdbe else args.min_rdbe, max_rdbe=None if args.no_rdbe else args.max_rdbe,
+            even_electron=args.even_electron, element_ratios=None if args.no_ratios else DEFAULT_ELEMENT_RATIOS,
+            mode=args.mode,
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print("formula,mass,error,error_ppm,rdbe")
+    for candidate in candidates[:args.limit]:
+        error_ppm = candidate.error / args.mass * 1e6
+        rdbe = "" if candidate.rdbe is None else f"{candidate.rdbe:g}"
+        print(f"{candidate.formula},{candidate.mass:.6f},{candidate.error:.6f},{error_ppm:.2f},{rdbe}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
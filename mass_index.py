@@ -0,0 +1,296 @@
+"""
+Persistent, sorted mass index over a formula catalogue, for mass range queries.
+
+Answering "which formulas in the catalogue have a mass between X and Y" by calculating
+every formula's mass each time is slow for catalogues of millions of formulas. Instead,
+build_mass_index() calculates every mass once (with the vectorised batch path, see
+calculate_molar_masses) and writes a binary index file:
+    - One entry per distinct composition, stored as its canonical (Hill notation) formula
+    - Masses sorted ascending, as a float64 column that is memory-mapped and searched in place
+    - The formulas, as a UTF-8 string block with a uint64 offset column
+
+MassIndex opens the file with mmap (nothing is parsed or loaded up front) and answers
+range and nearest-mass queries by binary search, in O(log n). The index records a hash
+of the atomic masses it was built from (for its mass mode), so is_stale() can tell whether
+they have changed since (in elements.json or isotopes.json), without recalculating anything.
+
+Usage:
+    python mass_index.py build catalogue.txt --output catalogue.midx --mode monoisotopic
+    python mass_index.py query catalogue.midx --range 180.0 180.1
+    python mass_index.py query catalogue.midx --nearest 180.0634 -k 5
+
+Example:
+    >>> with MassIndex("catalogue.midx") as index:
+    ...     for entry in index.range(180.0, 180.1):
+    ...         print(entry.formula, entry.mass)
+
+Author: Jordan Rodger
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from itertools import islice
+
+from molar_mass import BATCH_CHUNK_SIZE, MASS_MODES, _numpy, calculate_molar_mass_rows, mass_column_hash, parse_formula_cached
+from molar_mass_cli import iter_formulas
+
+
+# ====== CONSTANTS ======
+# Index file layout (all little-endian):
+#   header  - magic, format version, mass mode (index into MASS_MODES), entry count,
+#             the byte offset of each column, the length of the string block, then the
+#             hash of the mode's atomic masses (16 raw bytes, see molar_mass.mass_column_hash)
+#   masses  - count x float64, sorted ascending (8-byte aligned)
+#   offsets - (count + 1) x uint64: entry i's formula is strings[offsets[i]:offsets[i + 1]]
+#   strings - the UTF-8 Hill formulas, concatenated
+INDEX_MAGIC = b"MIDX"
+INDEX_FORMAT_VERSION = 3
+_HEADER = struct.Struct("<4sHBxQQQQQ16s")
+
+IndexEntry = namedtuple("IndexEntry", ("formula", "mass"))
+
+
+def build_mass_index(formulas, filename, mode="average", on_error=None, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Builds a mass index file from a catalogue of formulas.
+
+    Formulas are grouped by composition first, so each distinct composition is stored
+    once, as its Hill formula.
+
+    Args:
+        formulas (iterable of str): The catalogue; read once, as a stream.
+        filename (str): Path of the index file to write (replaced atomically if it exists).
+        mode (str): "average" or "monoisotopic" masses (see molar_mass.MASS_MODES).
+        on_error (callable, optional): Called with (formula, error) for formulas that can't
+            be calculated, which are otherwise skipped.
+        chunk_size (int): Number of formulas calculated at a time.
+    Returns:
+        count (int): The number of entries in the index.
+    """
+    if mode not in MASS_MODES:
+        raise ValueError(f"Unknown mass mode: {mode!r} (expected one of {MASS_MODES})")
+
+    compositions = {} # Distinct compositions, in first-seen order (a dict as an ordered set)
+    for formula in formulas:
+        try:
+            compositions[parse_formula_cached(formula)] = None
+        except ValueError as e:
+            if on_error is not None:
+                on_error(formula, e)
+
+    # Masses of the (already parsed) compositions, a chunk at a time with the batch path
+    compositions = iter(compositions)
+    index_formulas, masses = [], array('d')
+    while True:
+        chunk = list(islice(compositions, chunk_size))
+        if not chunk:
+            break
+        for composition, mass, error in calculate_molar_mass_rows(chunk, mode=mode):
+            if error is not None:
+                if on_error is not None:
+                    on_error(composition.hill_formula(), ValueError(error))
+                continue
+            index_formulas.append(composition.hill_formula())
+            masses.append(mass)
+
+    np = _numpy()
+    if np is not None:
+        order = np.argsort(np.frombuffer(masses, dtype=np.float64), kind="stable").tolist()
+    else:
+        order = sorted(range(len(masses)), key=masses.__getitem__)
+    sorted_masses = array('d', [masses[i] for i in order])
+
+    encoded = [index_formulas[i].encode("utf-8") for i in order]
+    offsets = array('Q', [0])
+    position = 0
+    for formula in encoded:
+        position += len(formula)
+        offsets.append(position)
+    strings = b"".join(encoded)
+
+    if sys.byteorder == "big":
+        sorted_masses.byteswap() # The file is little-endian on every machine
+        offsets.byteswap()
+
+    count = len(sorted_masses)
+    masses_at = (_HEADER.size + 7) // 8 * 8
+    offsets_at = masses_at + 8 * count
+    strings_at = offsets_at + 8 * (count + 1)
+    header = _HEADER.pack(INDEX_MAGIC, INDEX_FORMAT_VERSION, MASS_MODES.index(mode), count,
+                          masses_at, offsets_at, strings_at, len(strings),
+                          mass_column_hash(mode))
+
+    # Write to a temporary file first, so readers never see a half-written index
+    temporary = f"{filename}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(header.ljust(masses_at, b"\0"))
+        f.write(sorted_masses.tobytes())
+        f.write(offsets.tobytes())
+        f.write(strings)
+    os.replace(temporary, filename)
+    return count
+
+
+class MassIndex:
+    """
+    Read-only, memory-mapped mass index written by build_mass_index().
+
+    Args:
+        filename (str): Path to the index file.
+    Raises:
+        ValueError: If the file is not a mass index in a supported format.
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            self._mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) # Stays mapped after close
+        data = memoryview(self._mapped)
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{filename} is not a mass index file")
+
+        (magic, version, mode, count, masses_at, offsets_at, strings_at, strings_length,
+         masses_hash) = _HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or version != INDEX_FORMAT_VERSION:
+            raise ValueError(f"{filename} is not a version {INDEX_FORMAT_VERSION} mass index file")
+
+        self.mode = MASS_MODES[mode]
+        self.masses_hash = masses_hash.hex() # Of the atomic masses the index was built from
+        self._masses = data[masses_at:masses_at + 8 * count].cast('d')
+        self._offsets = data[offsets_at:offsets_at + 8 * (count + 1)].cast('Q')
+        self._strings = data[strings_at:strings_at + strings_length]
+        if sys.byteorder == "big":
+            # Columns are little-endian: use byte-swapped copies instead of the mapped file
+            self._masses, self._offsets = array('d', self._masses), array('Q', self._offsets)
+            self._masses.byteswap()
+            self._offsets.byteswap()
+
+    def close(self):
+        """Unmaps the index file; the index can't be used afterwards."""
+        for view in (self._masses, self._offsets, self._strings):
+            if isinstance(view, memoryview):
+                view.release()
+        self._mapped.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._masses)
+
+    def is_stale(self):
+        """
+        Returns True if the index was built from different atomic masses (for its mode) than
+        the ones in use now (the masses would be calculated differently), so it should be rebuilt.
+        """
+        return self.masses_hash != mass_column_hash(self.mode).hex()
+
+    @property
+    def masses(self):
+        """The sorted masses, as a read-only float64 memoryview (np.frombuffer-compatible)."""
+        return self._masses
+
+    def formula(self, i):
+        """Returns the Hill formula of entry i (entries are in mass order)."""
+        return str(self._strings[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def entry(self, i):
+        """Returns entry i as an IndexEntry (formula, mass)."""
+        return IndexEntry(self.formula(i), self._masses[i])
+
+    def range(self, low, high):
+        """
+        Returns every entry with low <= mass <= high.
+
+        Args:
+            low (float): Lowest mass.
+            high (float): Highest mass.
+        Returns:
+            entries (list of IndexEntry): (formula, mass), in mass order.
+        """
+        start = bisect_left(self._masses, low)
+        end = bisect_right(self._masses, high, lo=start)
+        return [self.entry(i) for i in range(start, end)]
+
+    def nearest(self, mass, k=1):
+        """
+        Returns the k entries with masses closest to `mass`.
+
+        Args:
+            mass (float): The target mass.
+            k (int): Number of entries to return.
+        Returns:
+            entries (list of IndexEntry): (formula, mass), closest first.
+        """
+        masses = self._masses
+        right = bisect_left(masses, mass) # Entries [left + 1, right) have been taken
+        left = right - 1
+        nearest = []
+        while len(nearest) < k and (left >= 0 or right < len(masses)):
+            # Take whichever neighbour is closer to the target
+            if right >= len(masses) or (left >= 0 and mass - masses[left] <= masses[right] - mass):
+                nearest.append(left)
+                left -= 1
+            else:
+                nearest.append(right)
+                right += 1
+        return [self.entry(i) for i in nearest]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query sorted mass indexes of formula catalogues.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Build an index from formulas read from files or stdin")
+    build.add_argument("inputs", nargs="*", default=["-"],
+                       help="Input files, one formula per line ('-' or none for stdin)")
+    build.add_argument("--csv-column", metavar="COLUMN",
+                       help="Read formulas from this CSV column (header name, or 0-based index)")
+    build.add_argument("--output", "-o", required=True, help="Index file to write")
+    build.add_argument("--mode", choices=MASS_MODES, default="average",
+                       help="Average atomic masses, or monoisotopic (exact) masses (default: average)")
+
+    query = commands.add_parser("query", help="Query an index")
+    query.add_argument("index", help="Index file")
+    search = query.add_mutually_exclusive_group(required=True)
+    search.add_argument("--range", nargs=2, type=float, metavar=("LOW", "HIGH"), help="Formulas with LOW <= mass <= HIGH")
+    search.add_argument("--nearest", type=float, metavar="MASS", help="Formulas with the closest masses")
+    query.add_argument("-k", type=int, default=1, help="Number of nearest formulas (default: 1)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "build":
+            def report_error(formula, error):
+                print(f"Skipped {formula!r}: {error}", file=sys.stderr)
+
+            formulas = iter_formulas(args.inputs, args.csv_column)
+            count = build_mass_index(formulas, args.output, args.mode, report_error)
+            print(f"Indexed {count} formulas ({args.mode} masses) in {args.output}", file=sys.stderr)
+            return 0
+
+        with MassIndex(args.index) as index:
+            if index.is_stale():
+                print(f"Warning: {args.index} was built from a different elements.json; rebuild it", file=sys.stderr)
+            entries = index.range(*args.range) if args.range else index.nearest(args.nearest, args.k)
+            print("formula,mass")
+            for entry in entries:
+                print(f"{entry.formula},{entry.mass!r}")
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,112 +8,596 @@ atomic masses retrieved from a JSON-based periodic table dataset ('elements.json
 Features:
     - Parses chemical formulas with support for nested groups, multipliers, and repeated elements.
       Examples: 'CH₃COOH' (Acetic Acid) and 'Al₂(SO₄)₃' (Aluminium Sulfate).
+    - Parses hydrates and adducts with leading multipliers, e.g. 'CuSO₄·5H₂O'.
+    - Accepts Unicode subscript counts and superscript charges, e.g. 'H₂O' and 'SO₄²⁻'.
     - Calculates molar mass using atomic masses from a local 'elements.json' file.
-    - Raises ValueError for unrecognised element symbols.
-    - Includes test cases and user input prompt for interactivity.
+    - Monoisotopic (exact) mass mode for mass spectrometry, using the most abundant isotope
+      of each element from 'isotopes.json' (mode="monoisotopic").
+    - Exact decimal results (exact=True): masses are summed as integers (picodaltons), so
+      results are reproducible Decimals with no floating-point noise.
+    - Uncertainty propagation (uncertainty=True): mass ± standard uncertainty, from the
+      IUPAC/CIAAW standard atomic weight uncertainties in 'elements.json' (see UncertainMass).
+    - Batch molar masses via a composition matrix and one NumPy matrix-vector product.
+    - Bounded LRU cache of parsed formulas, with hit/miss/eviction counters (see ParseCache).
+    - Cached formulas are immutable, hashable Composition objects (see composition.py).
+    - Raises ValueError for unrecognised element symbols and unbalanced parentheses.
+    - Safe to import: elements.json is only read on first use, into the shared
+      PeriodicTable (see periodic_table.py and get_element_masses()).
+    - Follows reloads of the shared table (periodic_table.reload): cached mass vectors are
+      rebuilt once the table's generation changes.
+    - Includes test cases and user input prompt for interactivity (run as a script, see main()).
 
 Dependencies:
-    - Python standard library: `json` and `re` modules.
-    - Requires 'elements.json' file with chemical element data in the following format:
-        [
-            {"symbol": "H", "atomic_mass": 1.008},
-            ...
-            {"symbol": "O", "atomic_mass": 15.999},
-            ...   
-        ]
+    - Python standard library: `threading`, `collections` and `itertools` modules.
+    - Optional: NumPy, for the batch functions (calculate_molar_masses falls back to pure Python);
+      only imported on first use, so importing this module stays cheap.
+    - Requires 'elements.json' file with chemical element data in the following format
+      (see periodic_table.py for the schema version and content hash):
+        {
+            "schema_version": 2,
+            "content_hash": "...",
+            "elements": [
+                {"symbol": "H", "atomic_mass": 1.008},
+                ...
+                {"symbol": "O", "atomic_mass": 15.999},
+                ...
+            ]
+        }
     
 Author: Jordan Rodger
 Last edited: 08/06/2025
 """
 
-import json
-import re # Regular Expression (used for parsing chemical formulas)
+import math
+import sys
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+from hashlib import blake2b
+from itertools import islice
 
-# Loads element data from local JSON file
-def load_elements(filename="elements.json"):
-    try:
-        with open(filename, "r") as f: # Opens file in read-only mode, f = file obj
-            return json.load(f) # Parses JSON into Python list of dicts
-    except (FileNotFoundError, json.JSONDecodeError) as e: # Handles json load errors and decoding errors
-        print(f"Error loading elements.json: {e}")
-        return []
+from composition import Composition
+from periodic_table import ELEMENTS_FILE, load_elements, get_periodic_table, get_monoisotopic_masses # noqa: F401 (re-exported)
+from periodic_table import get_generation
 
 
-def parse_formula(formula):
+# ====== CONSTANTS ======
+# Character classes used by the formula scanner (set/dict lookups are faster than str methods)
+_UPPERCASE = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+_LOWERCASE = frozenset("abcdefghijklmnopqrstuvwxyz")
+# Digits for counts, as ASCII or Unicode subscripts, e.g. '7' -> 7 and '₇' -> 7
+_DIGITS = {str(digit): digit for digit in range(10)}
+_DIGITS.update({chr(0x2080 + digit): digit for digit in range(10)}) # ₀ to ₉ (U+2080 - U+2089)
+# Superscript digits and signs for ionic charges, e.g. SO₄²⁻ (¹, ² and ³ are Latin-1 characters)
+_SUPERSCRIPT_DIGITS = {char: digit for digit, char in enumerate("⁰¹²³⁴⁵⁶⁷⁸⁹")}
+_CHARGE_SIGNS = {"⁺": 1, "⁻": -1}
+# Separators between the parts of a hydrate/adduct, e.g. the '·' in CuSO₄·5H₂O
+_ADDUCT_SEPARATORS = frozenset("·.*•∙")
+
+# Default number of parsed formulas kept by the shared parse cache (see ParseCache)
+DEFAULT_PARSE_CACHE_SIZE = 8192
+
+# Number of elements in elements.json; the width of a composition matrix (one column per element)
+NUM_ELEMENTS = 118
+
+# Number of formulas put into each composition matrix by calculate_molar_masses();
+# bounds memory use (16384 x 118 counts is roughly 15 MB) for very large batches
+BATCH_CHUNK_SIZE = 16384
+
+# Mass modes: average atomic masses (elements.json), or the mass of each element's most
+# abundant isotope (isotopes.json) for exact-mass work such as mass spectrometry
+MASS_MODES = ("average", "monoisotopic")
+
+# The caches below are keyed by (generation, mode), where generation is that of the shared
+# element data (periodic_table.get_generation) read before the entry was built. An entry that
+# a thread finishes building from the old data after a reload is then stored under the old
+# generation, so it is never served as current (see _check_generation).
+
+# Shared NumPy vectors of masses indexed by atomic_number - 1, one per mode (see build_mass_vector)
+_mass_vectors = {}
+
+# Shared NumPy vectors of squared atomic mass uncertainties (variances), indexed by atomic_number - 1
+# (NaN for elements with no standard atomic weight)
+_variance_vectors = {}
+
+# Decimal places kept by exact mode (exact=True), which sums masses as integers in units of
+# 10^-MASS_DECIMALS (picodaltons). The datasets' masses have at most 11 decimal places, so
+# every one of them is an exact integer at this scale.
+MASS_DECIMALS = 12
+
+# Shared integer-scaled masses indexed by atomic_number - 1, one tuple per mode (see get_scaled_masses)
+_scaled_masses = {}
+
+# Latest generation seen by _check_generation(); when periodic_table.reload() moves it on,
+# entries from older generations are dropped
+_cache_generation = 0
+_cache_lock = threading.Lock()
+
+
+class UncertainMass(namedtuple("UncertainMass", ("mass", "uncertainty"))):
+    """
+    A molar mass with its standard uncertainty; str() gives e.g. '342.146076 ± 0.015'.
+
+    The uncertainties of atoms of the same element are fully correlated (they share one
+    atomic mass), so they add linearly (count * uncertainty); those of different elements
+    are independent, so they add in quadrature. Elements whose standard atomic weight is
+    an interval (e.g., H, C, O, S) contribute the interval's standard uncertainty.
     """
-    Parses formula using RegEx and stack data structure (list of dicts).
+
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.mass} ± {self.uncertainty:.2g}"
+
+
+def get_element_masses():
+    """
+    Returns the shared, read-only {symbol: atomic_mass} lookup mapping.
+
+    elements.json is only read the first time this is called; every later call
+    (and every calculate_molar_mass() call without an explicit table) reuses the
+    same mapping, owned by the shared PeriodicTable.
+
+    Returns:
+        (MappingProxyType): A read-only mapping of element symbols to atomic masses
+    """
+    return get_periodic_table().masses_by_symbol
+
+
+def get_atomic_numbers():
+    """
+    Returns the shared, read-only {symbol: atomic_number} lookup mapping.
+
+    Returns:
+        (MappingProxyType): A read-only mapping of element symbols to atomic numbers
+    """
+    return get_periodic_table().atomic_numbers_by_symbol
+
+
+def _read_count(formula, i, n):
+    """
+    Reads an (optional) run of digits (ASCII or Unicode subscripts) starting at index i.
+
+    Args:
+        formula (str): The formula being scanned.
+        i (int): Index of the first character after an element symbol or ')'.
+        n (int): len(formula), passed in to avoid recomputing it.
+    Returns:
+        (count, i) (tuple): The count (1 if there are no digits) and the index after the digits.
+    """
+    if i < n and formula[i] in _DIGITS:
+        count = 0
+        while i < n and formula[i] in _DIGITS:
+            count = count * 10 + _DIGITS[formula[i]] # Builds the number one digit at a time
+            i += 1
+        return count, i
+    return 1, i
+
+
+def _read_coefficient(formula, i, n):
+    """
+    Reads the (optional) leading coefficient of a formula or adduct part, e.g. '5' in '5H2O',
+    skipping any whitespace before it.
+
+    Returns:
+        (coefficient, i) (tuple): The coefficient (1 if there is none) and the index after it.
+    Raises:
+        ValueError: If the coefficient is a decimal, e.g. the '0.5' in 'CaSO4·0.5H2O'.
+    """
+    while i < n and formula[i] == ' ':
+        i += 1
+    start = i
+    coefficient, i = _read_count(formula, i, n)
+    if i + 1 < n and formula[i] == '.' and formula[i + 1] in _DIGITS:
+        # A decimal point, not an adduct separator: reading it as one would silently turn
+        # CaSO4·0.5H2O into CaSO4·5H2O. (After an atom count, as in CuSO4.5H2O, it is one.)
+        end = i + 1
+        while end < n and formula[end] in _DIGITS:
+            end += 1
+        digits = "".join(str(_DIGITS[c]) for c in formula[start:end] if c != '.')
+        value = Fraction(int(digits), 10 ** (end - i - 1)) # e.g., 0.5 -> 1/2
+        if value.denominator == 1:
+            suggestion = f"write it as {value.numerator}"
+        else:
+            suggestion = (f"multiply every part of the formula by {value.denominator}, "
+                          f"so {formula[start:end]} becomes {value.numerator}")
+        raise ValueError(f"Fractional multipliers are not supported: {formula[start:end]} at index {start} "
+                         f"of {formula} ({suggestion})")
+    return coefficient, i
+
+
+def parse_species(formula):
+    """
+    Parses formula using a single-pass character scanner and stack data structure (list of dicts).
     This is valid for chemical formulas with repeated elements or parenthetical grouping, 
     such as CH₃COOH and Al₂(SO₄)₃.
+
+    Counts may be ASCII digits or Unicode subscripts (H2O or H₂O), and an ionic charge
+    may be given with superscripts (e.g., SO₄²⁻, Fe³⁺, Na⁺); both are read in the same
+    single pass, without first translating the string.
+
+    Hydrates and other adducts are written as parts joined by '·' (or '.', '*', '•', '∙'),
+    each with an optional leading multiplier, e.g. CuSO₄·5H₂O. A leading multiplier
+    applies to everything up to the next separator (or the end of the enclosing group),
+    and is folded into the counts as they are read, so no second pass is needed. Multipliers
+    must be whole numbers: a decimal one such as the 0.5 in CaSO₄·0.5H₂O is rejected rather
+    than having its '.' read as a separator.
+
+    The formula is read one character at a time: no intermediate token list is built
+    and no regular expressions are used. Unrecognised characters are skipped.
     
     Args:
         formula (str): The formula to be parsed.
     Returns:
-        stack[0] (dict): A flat dictionary with element symbols (key) and atom counts (value).
+        (composition, charge) (tuple): A flat dictionary with element symbols (key) and
+        atom counts (value), and the net charge (int, 0 for neutral species).
+    Raises:
+        ValueError: If the formula has unbalanced parentheses or a fractional multiplier.
     """
+    stack = [{}] # Initializes a stack (list of dicts); supports nested parentheses/groups (LIFO)
+    current = stack[0] # The dict at the top of the stack, i.e. the group currently being filled
+    part_multipliers = [] # Saved adduct-part multipliers of the enclosing groups
+    charge = 0
+    charge_digits = 0 # Superscript digits read since the last charge sign, e.g. the 2 in ²⁻
 
-    # RegEx pattern to match:
-    # - Element symbol (e.g., H, He, Li)
-    # - Atom count (e.g., '2' in H₂)
-    # - Parentheses for grouping
-    pattern = r"([A-Z][a-z]?|\d+|\(|\))"
-    matches = re.findall(pattern, formula)
+    n = len(formula)
+    part_multiplier, i = 1, 0
+    if n and formula[0] not in _UPPERCASE: # Only then can there be a leading coefficient, e.g. '2H2O'
+        part_multiplier, i = _read_coefficient(formula, 0, n)
+    while i < n:
+        char = formula[i]
+        i += 1
 
-    stack = [{}] # Initializes a stack (list of dicts); supports nested parentheses/groups (LIFO)
+        if char in _UPPERCASE:
+            # Found an element symbol: one uppercase letter, optionally followed by a lowercase one
+            elem = char
+            if i < n and formula[i] in _LOWERCASE:
+                elem += formula[i]
+                i += 1
 
-    i = 0
-    while i < len(matches):
-        token = matches[i]
+            # If digits follow the symbol, they are the atom count (e.g., '2' in H₂)
+            count, i = _read_count(formula, i, n)
 
-        if token == '(':
-            stack.append({}) # Start a new group: push empty dict to stack
-            i += 1
-        elif token == ')':
+            # Add/update the count in the top dict on the stack
+            current[elem] = current.get(elem, 0) + count * part_multiplier
+
+        elif char == '(':
+            current = {} # Start a new group: push empty dict to stack
+            stack.append(current)
+            part_multipliers.append(part_multiplier)
+            part_multiplier = 1
+
+        elif char == ')':
+            if len(stack) == 1:
+                raise ValueError(f"Unbalanced parentheses in formula: {formula}")
             group = stack.pop() # End of group: pop the last group dict off the stack
-            i += 1
+            current = stack[-1]
+            part_multiplier = part_multipliers.pop()
 
-            multiplier = 1 # Default multiplier after closing parentheses
+            # If a number follows the closing parentheses, it is the group multiplier
+            multiplier, i = _read_count(formula, i, n)
+            multiplier *= part_multiplier
 
-            # If a number follows the closing parentheses, update multiplier
-            if i < len(matches) and matches[i].isdigit():
-                multiplier = int(matches[i])
-                i += 1
-            
             # Merge the group dict into the previous dict on the stack
             for element, count in group.items():
-                stack[-1][element] = stack[-1].get(element, 0) + count * multiplier
+                current[element] = current.get(element, 0) + count * multiplier
 
-        elif re.match('[A-Z][a-z]?', token):
-            # Found an element symbol
-            elem = token
-            count = 1
+        elif char in _ADDUCT_SEPARATORS:
+            # Start of a new adduct part (e.g., '·5H2O'): read its leading multiplier
+            part_multiplier, i = _read_coefficient(formula, i, n)
 
-            # If the next token is a number, set count accordingly
-            if i + 1 < len(matches) and matches[i + 1].isdigit():
-                count = int(matches[i + 1])
-                i += 1
+        elif char in _SUPERSCRIPT_DIGITS:
+            charge_digits = charge_digits * 10 + _SUPERSCRIPT_DIGITS[char]
 
-            # Add/update the count in the top dict on the stack
-            stack[-1][elem] = stack[-1].get(elem, 0) + count
-            i += 1
-        else:
-            # If token is unexpected, skip
-            i += 1
+        elif char in _CHARGE_SIGNS:
+            charge += _CHARGE_SIGNS[char] * (charge_digits or 1) # A sign alone (e.g., Na⁺) means 1
+            charge_digits = 0
+
+        # Any other character is unexpected, so it is skipped
+
+    if len(stack) != 1:
+        raise ValueError(f"Unbalanced parentheses in formula: {formula}")
 
-    # Final flat dict with all elements and counts
-    return stack[0]
+    # Final flat dict with all elements and counts, and the net charge
+    return current, charge
 
 
-def calculate_molar_mass(formula, element_masses):
+def parse_formula(formula):
     """
-    Calculates total molar mass, using parse_formula() and element_masses lookup dict.
+    Parses a chemical formula into its composition (see parse_species() for the syntax).
 
     Args:
-        formula (str): The chemical formula to calculate molar mass from
-        element_masses (dict): A dictionary mapping element symbols to atomic masses
+        formula (str): The formula to be parsed, e.g. 'Al2(SO4)3' or 'Al₂(SO₄)₃'.
     Returns:
-        total_mass (float): The molar mass value of the chemical formula (in g/mol)
+        (dict): A flat dictionary with element symbols (key) and atom counts (value).
+    Raises:
+        ValueError: If the formula has unbalanced parentheses or a fractional multiplier.
     """
-    composition = parse_formula(formula)
+    return parse_species(formula)[0]
+
+
+class ParseCache:
+    """
+    Size-bounded LRU (least recently used) cache of parsed formulas.
+
+    Keys are the normalised formula strings (surrounding whitespace removed) and values
+    are immutable, interned Composition objects, so callers sharing a cached entry can't
+    modify it. Once maxsize entries are stored, the least recently used entry is evicted.
+    Hit, miss and eviction counters are available from info().
+
+    Args:
+        maxsize (int): Maximum number of cached formulas (0 disables caching).
+    """
+
+    def __init__(self, maxsize=DEFAULT_PARSE_CACHE_SIZE):
+        if maxsize < 0:
+            raise ValueError(f"maxsize must be >= 0, got {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict() # Ordered from least to most recently used
+        self._lock = threading.Lock() # The cache is shared between threads
+
+    def get(self, formula):
+        """
+        Returns the composition of formula, parsing it only on a cache miss.
+
+        Args:
+            formula (str): The formula to be parsed.
+        Returns:
+            composition (Composition): Immutable composition (also a read-only {symbol: count} mapping).
+        Raises:
+            ValueError: If the formula is malformed or contains an unrecognised element symbol.
+        """
+        key = formula.strip()
+        with self._lock:
+            composition = self._entries.get(key)
+            if composition is not None:
+                self._entries.move_to_end(key) # Mark as most recently used
+                self.hits += 1
+                return composition
+            self.misses += 1
+
+        # Parse outside the lock; invalid formulas raise here and are never cached
+        composition = Composition(parse_formula(key))
+
+        with self._lock:
+            if self.maxsize > 0:
+                self._entries[key] = composition
+                self._evict()
+        return composition
+
+    def resize(self, maxsize):
+        """Changes maxsize, evicting the least recently used entries if needed."""
+        if maxsize < 0:
+            raise ValueError(f"maxsize must be >= 0, got {maxsize}")
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """Removes every entry and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """
+        Returns the cache counters, e.g. for exporting as metrics.
+
+        Returns:
+            (dict): hits, misses, evictions, size and maxsize.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def _evict(self):
+        # Caller must hold self._lock
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False) # Drop the least recently used entry
+            self.evictions += 1
+
+
+# Shared parse cache used by parse_formula_cached() and calculate_molar_mass()
+_parse_cache = ParseCache()
+
+
+def parse_formula_cached(formula):
+    """
+    Cached version of parse_formula(), backed by the shared ParseCache.
+
+    Args:
+        formula (str): The formula to be parsed.
+    Returns:
+        composition (Composition): Immutable composition, shared between callers.
+    Raises:
+        ValueError: If the formula is malformed or contains an unrecognised element symbol.
+    """
+    return _parse_cache.get(formula)
+
+
+def configure_parse_cache(maxsize):
+    """Sets the maximum number of formulas kept by the shared parse cache (0 disables it)."""
+    _parse_cache.resize(maxsize)
+
+
+def parse_cache_info():
+    """Returns the shared parse cache counters (hits, misses, evictions, size, maxsize)."""
+    return _parse_cache.info()
+
+
+def clear_parse_cache():
+    """Empties the shared parse cache and resets its counters."""
+    _parse_cache.clear()
+
+
+def _check_generation():
+    """
+    Returns the current generation of the shared data, first dropping the cached mass
+    vectors and scaled masses of older generations if it has been reloaded since.
+    """
+    global _cache_generation
+    generation = get_generation()
+    if generation != _cache_generation:
+        with _cache_lock:
+            for cache in (_mass_vectors, _variance_vectors, _scaled_masses):
+                for key in list(cache):
+                    if key[0] != generation:
+                        cache.pop(key, None)
+            _cache_generation = generation
+    return generation
+
+
+def _mass_column(mode):
+    """Returns the shared masses (indexed by atomic_number - 1) for a mass mode."""
+    if mode == "average":
+        return get_periodic_table().atomic_masses
+    if mode == "monoisotopic":
+        return get_monoisotopic_masses()
+    raise ValueError(f"Unknown mass mode: {mode!r} (expected one of {MASS_MODES})")
+
+
+def mass_column_hash(mode="average", digest_size=16):
+    """
+    Returns a hash of the shared masses for a mass mode, so stored results (caches, indexes)
+    can tell whether the masses they were calculated from have changed since.
+
+    Args:
+        mode (str): "average" or "monoisotopic" (see MASS_MODES).
+        digest_size (int): Length of the hash, in bytes.
+    Returns:
+        (bytes): BLAKE2b digest of the masses, as little-endian float64s.
+    """
+    masses = array('d', _mass_column(mode))
+    if sys.byteorder == "big":
+        masses.byteswap() # Hash the same (little-endian) bytes on every machine
+    return blake2b(masses.tobytes(), digest_size=digest_size).digest()
+
+
+def _scale_mass(mass):
+    """Converts a mass (float, Decimal or int) to an integer number of 10^-MASS_DECIMALS units."""
+    # str() of a float is its shortest round-trip form, i.e. the digits given in the dataset
+    return int(Decimal(str(mass)).scaleb(MASS_DECIMALS).to_integral_value())
+
+
+def _unscale_mass(scaled):
+    """Converts an integer-scaled mass back to a Decimal, without trailing zeros (e.g., 342.146077)."""
+    decimals = MASS_DECIMALS
+    while decimals and scaled % 10 == 0:
+        scaled //= 10
+        decimals -= 1
+    return Decimal(scaled).scaleb(-decimals)
+
+
+def get_scaled_masses(mode="average"):
+    """
+    Returns the shared integer-scaled masses for a mass mode, built on first use.
+
+    Args:
+        mode (str): "average" or "monoisotopic" (see MASS_MODES).
+    Returns:
+        (tuple): Masses in units of 10^-MASS_DECIMALS, indexed by atomic number - 1
+            (None for elements with no mass in this mode).
+    """
+    key = (_check_generation(), mode) # Read before the masses, see _mass_vectors
+    scaled = _scaled_masses.get(key)
+    if scaled is None:
+        scaled = _scaled_masses[key] = tuple(
+            None if mass != mass else _scale_mass(mass) for mass in _mass_column(mode) # mass != mass: NaN
+        )
+    return scaled
+
+
+def _exact_molar_mass(composition, element_masses, mode):
+    total = 0 # Integer sum, so the result doesn't depend on rounding or summation order
+    if element_masses is None:
+        scaled = get_scaled_masses(mode)
+        for atomic_number, count in composition.pairs:
+            mass = scaled[atomic_number - 1]
+            if mass is None:
+                raise ValueError(f"No {mode} mass for element: {get_periodic_table().symbols[atomic_number - 1]}")
+            total += mass * count
+    else:
+        for element, count in composition.items():
+            if element not in element_masses:
+                raise ValueError(f"Unknown element: {element}")
+            total += _scale_mass(element_masses[element]) * count
+    return _unscale_mass(total)
+
+
+def _check_uncertainty(element_masses, mode):
+    if element_masses is not None or mode != "average":
+        raise ValueError("Uncertainties are only available for the shared average atomic masses")
+
+
+def _molar_mass_with_uncertainty(composition, mode, exact):
+    _check_uncertainty(None, mode)
+    table = get_periodic_table()
+    uncertainties = table.atomic_mass_uncertainties
+    variance = 0.0
+    for atomic_number, count in composition.pairs:
+        uncertainty = uncertainties[atomic_number - 1] * count
+        if uncertainty != uncertainty: # NaN: no standard atomic weight
+            raise ValueError(f"No standard atomic weight (so no uncertainty) for element: {table.symbols[atomic_number - 1]}")
+        variance += uncertainty * uncertainty
+    mass = _exact_molar_mass(composition, None, mode) if exact else composition.mass()
+    return UncertainMass(mass, math.sqrt(variance))
+
+
+def calculate_molar_mass(formula, element_masses=None, mode="average", exact=False, uncertainty=False):
+    """
+    Calculates total molar mass, using parse_formula_cached() and element_masses lookup dict.
+
+    Args:
+        formula (str or Composition): The chemical formula to calculate molar mass from
+        element_masses (dict, optional): A dictionary mapping element symbols to atomic masses.
+            Defaults to the shared table from get_element_masses(). Overrides mode. May
+            include symbols outside the periodic table (e.g., {"D": 2.014} for deuterium).
+        mode (str): "average" (atomic masses) or "monoisotopic" (most abundant isotope masses).
+        exact (bool): Return an exact Decimal (e.g., Decimal('342.146077')), summed with
+            integer-scaled masses, instead of a float.
+        uncertainty (bool): Return an UncertainMass (mass, standard uncertainty), propagated
+            from the atomic mass uncertainties. Only for the shared average atomic masses.
+    Returns:
+        total_mass (float, Decimal or UncertainMass): The molar mass value of the chemical formula (in g/mol)
+    Raises:
+        ValueError: If the formula is invalid, (monoisotopic mode) an element has no stable isotopes,
+            or (uncertainty) an element has no standard atomic weight (e.g., Tc).
+    """
+    if uncertainty and element_masses is not None:
+        _check_uncertainty(element_masses, mode)
+    if isinstance(formula, Composition):
+        composition = formula
+    elif element_masses is not None:
+        # A custom table may have symbols outside the periodic table (e.g., D for deuterium),
+        # which a Composition can't hold, so look the parsed symbols up in the table itself
+        composition = parse_formula(formula)
+    else:
+        composition = parse_formula_cached(formula)
+    if uncertainty:
+        return _molar_mass_with_uncertainty(composition, mode, exact)
+    if exact:
+        return _exact_molar_mass(composition, element_masses, mode)
+    if element_masses is None:
+        # Fast path: indexes the shared mass column for the mode
+        masses = _mass_column(mode)
+        total_mass = composition.mass(masses)
+        if total_mass != total_mass: # NaN: an element has no mass in this mode (no stable isotopes)
+            symbols = get_periodic_table().symbols
+            element = next(symbols[n - 1] for n, _ in composition.pairs if masses[n - 1] != masses[n - 1])
+            raise ValueError(f"No {mode} mass for element: {element}")
+        return total_mass
+
     total_mass = 0
     for element, count in composition.items(): # Dictonary unpacking
         if element not in element_masses:
@@ -122,15 +606,241 @@ def calculate_molar_mass(formula, element_masses):
     return total_mass
 
 
-elements = load_elements()
+@lru_cache(maxsize=None)
+def _numpy():
+    """
+    Returns the NumPy module, imported on first use rather than with this module, so
+    single-formula callers never pay for it (None if NumPy isn't installed).
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
 
-# Create a lookup dictionary {symbol: atomic_mass}
-element_masses = {el['symbol']: el['atomic_mass'] for el in elements}
 
+def _require_numpy():
+    np = _numpy()
+    if np is None:
+        raise ImportError("NumPy is required for composition matrices (pip install numpy)")
+    return np
 
-# ====== TESTS ======
-if __name__ == "__main__":
-    print(f"elements[18]['name'] = {elements[18]['name']}") # Potassium
+
+def build_mass_vector(element_masses=None, mode="average"):
+    """
+    Builds a NumPy vector of atomic masses indexed by atomic number - 1, matching
+    the columns of build_composition_matrix(). Elements missing from element_masses are NaN.
+
+    Args:
+        element_masses (dict, optional): A dictionary mapping element symbols to atomic masses.
+            Defaults to the shared masses for `mode` (the vector is then cached). Overrides mode.
+        mode (str): "average" or "monoisotopic" (see MASS_MODES).
+    Returns:
+        mass_vector (numpy.ndarray): float64 vector of length NUM_ELEMENTS.
+    """
+    np = _require_numpy()
+    if element_masses is None:
+        key = (_check_generation(), mode)
+        mass_vector = _mass_vectors.get(key)
+        if mass_vector is None:
+            # Zero-copy, read-only view of the shared array('d') mass column for the mode
+            mass_vector = _mass_vectors[key] = np.frombuffer(_mass_column(mode), dtype=np.float64)
+        return mass_vector
+
+    atomic_numbers = get_atomic_numbers()
+    mass_vector = np.full(NUM_ELEMENTS, np.nan)
+    for symbol, mass in element_masses.items():
+        if symbol in atomic_numbers:
+            mass_vector[atomic_numbers[symbol] - 1] = mass
+    return mass_vector
+
+
+def build_variance_vector():
+    """
+    Builds (once) the NumPy vector of squared atomic mass uncertainties, indexed by
+    atomic number - 1, for propagating uncertainties with a composition matrix. Elements
+    with no standard atomic weight are NaN.
+
+    Returns:
+        variance_vector (numpy.ndarray): float64 vector of length NUM_ELEMENTS.
+    """
+    np = _require_numpy()
+    key = (_check_generation(), "average")
+    variance_vector = _variance_vectors.get(key)
+    if variance_vector is None:
+        uncertainties = get_periodic_table().atomic_mass_uncertainties
+        variance_vector = _variance_vectors[key] = np.square(np.frombuffer(uncertainties, dtype=np.float64))
+    return variance_vector
+
+
+def build_composition_matrix(formulas):
+    """
+    Parses a batch of formulas into a dense (len(formulas) x 118) matrix of atom counts.
+    Row i is formulas[i]; column j holds the count of the element with atomic number j + 1.
+
+    Args:
+        formulas (iterable of str or Composition): The chemical formulas to parse
+            (compositions are used as they are).
+    Returns:
+        matrix (numpy.ndarray): int64 count matrix.
+    Raises:
+        ValueError: If a formula is malformed or contains an unrecognised element symbol.
+    """
+    np = _require_numpy()
+
+    # Collect the non-zero entries first, then fill the matrix in one step. Entries are
+    # addressed by their index into the flattened matrix: row * NUM_ELEMENTS + column
+    flat_indices, counts = [], []
+    row_count = 0
+    for row, formula in enumerate(formulas):
+        row_start = row * NUM_ELEMENTS - 1 # - 1 as column = atomic_number - 1
+        composition = formula if isinstance(formula, Composition) else parse_formula_cached(formula)
+        for atomic_number, count in composition.pairs:
+            flat_indices.append(row_start + atomic_number)
+            counts.append(count)
+        row_count = row + 1
+
+    matrix = np.zeros((row_count, NUM_ELEMENTS), dtype=np.int64)
+    matrix.ravel()[flat_indices] = counts # Each index is unique, as compositions are merged
+    return matrix
+
+
+def calculate_molar_masses(formulas, element_masses=None, chunk_size=BATCH_CHUNK_SIZE, mode="average", exact=False,
+                           uncertainty=False):
+    """
+    Calculates the molar masses of a batch of formulas.
+
+    With NumPy installed, each chunk of formulas is parsed into a composition matrix
+    (see build_composition_matrix()) and all of its masses are computed with a single
+    matrix-vector product against the atomic mass vector. Without NumPy, this falls back
+    to calling calculate_molar_mass() for each formula and returns a list.
+
+    Args:
+        formulas (iterable of str): The chemical formulas to calculate molar masses from
+        element_masses (dict, optional): A dictionary mapping element symbols to atomic masses.
+            Defaults to the shared table from get_element_masses(). Overrides mode.
+        chunk_size (int): Number of formulas per composition matrix (bounds memory use).
+        mode (str): "average" or "monoisotopic" (see MASS_MODES); each mode has its own
+            precomputed mass vector, so switching modes costs nothing per formula.
+        exact (bool): Return exact Decimals (see calculate_molar_mass). Exact masses are
+            summed as Python ints rather than with NumPy, so a list is returned.
+        uncertainty (bool): Also propagate the atomic mass uncertainties (see UncertainMass),
+            with a second matrix-vector product: squared counts times squared uncertainties.
+    Returns:
+        masses (numpy.ndarray or list): The molar masses (in g/mol), in the same order as formulas.
+            With uncertainty, a (masses, uncertainties) pair of arrays (or lists).
+    Raises:
+        ValueError: If a formula is malformed or contains an unrecognised element symbol, or
+            (uncertainty) an element has no standard atomic weight.
+    """
+    if uncertainty:
+        _check_uncertainty(element_masses, mode)
+    np = _numpy()
+    if np is None or exact or (element_masses is not None and not get_atomic_numbers().keys() >= element_masses.keys()):
+        # Symbols outside the periodic table (e.g., D) have no column in the composition matrix
+        masses = [calculate_molar_mass(formula, element_masses, mode, exact, uncertainty) for formula in formulas]
+        if uncertainty:
+            return [mass for mass, _ in masses], [u for _, u in masses]
+        return masses
+
+    mass_vector = build_mass_vector(element_masses, mode)
+    missing = np.isnan(mass_vector) # Elements absent from a custom element_masses table (or with no isotopes)
+    if missing.any():
+        mass_vector = np.where(missing, 0.0, mass_vector)
+
+    variance_vector = build_variance_vector() if uncertainty else None
+    if uncertainty:
+        # NaN * 0 is NaN, so zero the elements with no uncertainty and check their counts instead
+        no_uncertainty = np.isnan(variance_vector)
+        variance_vector = np.where(no_uncertainty, 0.0, variance_vector)
+
+    iterator = iter(formulas)
+    results, uncertainties = [], []
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+
+        # Repeated formulas are only parsed into the matrix once; `rows` maps each
+        # formula in the chunk back to its row of the matrix
+        row_of = {}
+        rows = [row_of.setdefault(formula, len(row_of)) for formula in chunk]
+        matrix = build_composition_matrix(list(row_of))
+
+        if missing.any():
+            uses_missing = matrix[:, missing].any(axis=1)
+            if uses_missing.any():
+                # Re-run the first offending formula so it raises the usual "Unknown element" error
+                calculate_molar_mass(list(row_of)[int(np.argmax(uses_missing))], element_masses, mode)
+
+        results.append((matrix @ mass_vector)[rows])
+        if uncertainty:
+            uses_no_uncertainty = matrix[:, no_uncertainty].any(axis=1)
+            if uses_no_uncertainty.any():
+                # Re-run the first offending formula so it raises the usual "No standard atomic weight" error
+                calculate_molar_mass(list(row_of)[int(np.argmax(uses_no_uncertainty))], uncertainty=True)
+            uncertainties.append(np.sqrt(np.square(matrix) @ variance_vector)[rows])
+
+    masses = np.concatenate(results) if results else np.zeros(0)
+    if uncertainty:
+        return masses, np.concatenate(uncertainties) if uncertainties else np.zeros(0)
+    return masses
+
+
+def calculate_molar_mass_rows(formulas, element_masses=None, mode="average", exact=False):
+    """
+    Calculates the molar mass of each formula in a batch, capturing errors per formula
+    instead of stopping at the first invalid one.
+
+    The whole batch is first calculated with calculate_molar_masses(); only if that fails
+    (some formula in it is invalid) is each formula calculated on its own.
+
+    Args:
+        formulas (list of str): The chemical formulas to calculate molar masses from
+        element_masses (dict, optional): A dictionary mapping element symbols to atomic masses.
+            Defaults to the shared table from get_element_masses(). Overrides mode.
+        mode (str): "average" or "monoisotopic" (see MASS_MODES).
+        exact (bool): Calculate exact Decimal masses (see calculate_molar_mass).
+    Returns:
+        rows (list of tuple): (formula, molar_mass, error) for each formula, in order;
+        molar_mass is None when error is set, and vice versa.
+    """
+    try:
+        masses = calculate_molar_masses(formulas, element_masses, mode=mode, exact=exact)
+        if exact:
+            return [(formula, mass, None) for formula, mass in zip(formulas, masses)]
+        return [(formula, float(mass), None) for formula, mass in zip(formulas, masses)]
+    except ValueError:
+        pass
+
+    rows = []
+    for formula in formulas:
+        try:
+            rows.append((formula, calculate_molar_mass(formula, element_masses, mode, exact), None))
+        except ValueError as e:
+            rows.append((formula, None, str(e)))
+    return rows
+
+
+def __getattr__(name):
+    """
+    Lazily provides the legacy module-level `elements` and `element_masses` attributes,
+    so `from molar_mass import element_masses` keeps working without reading
+    elements.json at import time.
+    """
+    if name == "element_masses":
+        return get_element_masses()
+    if name == "elements":
+        return load_elements()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def run_tests():
+    """Prints the example test cases (previously run at module level)."""
+    table = get_periodic_table()
+    element_masses = get_element_masses()
+
+    print(f"table.names[18] = {table.names[18]}") # Potassium
     print(f"Lead (Pb) atomic mass = {element_masses['Pb']}") # 207.2
 
     # Al₂(SO₄)₃ test case (Aluminium Sulfate); formatted using Unicode subscript numbers
@@ -141,6 +851,7 @@ if __name__ == "__main__":
     al_sulf_sb = f"Al{sb_2}(SO{sb_4}){sb_3}" # Al₂(SO₄)₃
     al_sulf_mass = calculate_molar_mass(al_sulf, element_masses) # 342.146076 g/mol
     print(f"{al_sulf_sb} = {parse_formula(al_sulf)} | Molar mass = {al_sulf_mass} g/mol") # {'Al': 2, 'S': 3, 'O': 12}
+    assert parse_formula(al_sulf_sb) == parse_formula(al_sulf) # Subscripts parse the same as ASCII digits
 
     # C₆H₁₂O₆ test case (Glucose)
     glucose = "C6H12O6"
@@ -151,11 +862,20 @@ if __name__ == "__main__":
     print(f"{glucose_sb} = {parse_formula(glucose)} | Molar mass = {glucose_mass} g/mol") # {'C': 6, 'H': 12, 'O': 6}
 
 
-# ====== USER INPUT ======
-formula = input("Enter a Chemical Formula (e.g., CO2): ").strip()
+def main():
+    """Interactive entry point: runs the test cases, then prompts for a formula."""
+    # ====== TESTS ======
+    run_tests()
+
+    # ====== USER INPUT ======
+    formula = input("Enter a Chemical Formula (e.g., CO2): ").strip()
+
+    try:
+        mass = calculate_molar_mass(formula)
+        print(f"The molar mass of {formula} is {mass:.3f} g/mol")
+    except ValueError as ve:
+        print(f"ValueError: {ve}")
+
 
-try:
-    mass = calculate_molar_mass(formula, element_masses)
-    print(f"The molar mass of {formula} is {mass:.3f} g/mol")
-except ValueError as ve:
-    print(f"ValueError: {ve}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
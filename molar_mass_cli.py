@@ -0,0 +1,267 @@
+"""
+Command-line tool for calculating molar masses in bulk.
+
+Reads chemical formulas line-by-line from stdin, text files (one formula per line) or a
+column of CSV files, and streams the results out as CSV or JSON Lines. Input is processed
+in fixed-size chunks with buffered I/O, so memory use stays flat no matter how large the
+input is, and the tool can sit in the middle of a Unix pipeline.
+
+A formula that can't be calculated (unknown element, unbalanced parentheses) doesn't stop
+the run: its row is written with an empty mass and the error message instead.
+
+Usage:
+    python molar_mass_cli.py formulas.txt > masses.csv
+    cat formulas.txt | python molar_mass_cli.py --format jsonl
+    python molar_mass_cli.py catalogue.csv --csv-column formula --output masses.jsonl --format jsonl
+    python molar_mass_cli.py huge.txt --jobs 0 > masses.csv    # one worker process per CPU
+    python molar_mass_cli.py peptides.txt --mode monoisotopic  # exact masses for mass spectrometry
+    python molar_mass_cli.py formulas.txt --exact              # reproducible decimal output
+    python molar_mass_cli.py nightly.txt --cache masses.sqlite # reuse results from earlier runs
+    python molar_mass_cli.py decompose 180.0634 --mode monoisotopic --ppm 5  # formulas for a mass
+
+Subcommands:
+    - decompose - Find the formulas matching a measured mass (see mass_decomposition.py,
+      which also runs on its own; `decompose --help` lists its options)
+
+Output columns (CSV) / keys (JSONL):
+    - formula - The formula as read from the input
+    - molar_mass - The molar mass in g/mol, average or monoisotopic (empty/null if there was an error;
+      with --exact, JSON Lines gives it as a decimal string so no digits are lost)
+    - error - The error message (empty/null if the mass was calculated)
+
+Author: Jordan Rodger
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal
+from itertools import islice
+
+import mass_decomposition
+from mass_cache import MassCache
+from molar_mass import MASS_MODES, calculate_molar_mass_rows
+from parallel_batch import iter_molar_mass_rows_parallel
+
+
+# ====== CONSTANTS ======
+# Size of the read/write buffers for files and stdin/stdout (1 MiB)
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+# Number of formulas calculated (and held in memory) at a time
+DEFAULT_CHUNK_SIZE = 4096
+
+OUTPUT_FIELDS = ("formula", "molar_mass", "error")
+
+# Subcommands, {name: main(argv, prog) of the module implementing it}
+SUBCOMMANDS = {"decompose": mass_decomposition.main}
+
+
+def read_formulas(stream, csv_column=None):
+    """
+    Yields formulas from an open text stream, one at a time.
+
+    Args:
+        stream (file obj): Input text stream.
+        csv_column (str, optional): Read formulas from this CSV column instead of whole lines.
+            A number is a 0-based column index (every row is data); anything else is a
+            column name looked up in the CSV header row.
+    Yields:
+        formula (str): The next non-blank formula.
+    """
+    if csv_column is None:
+        for line in stream:
+            formula = line.strip()
+            if formula: # Skip blank lines
+                yield formula
+        return
+
+    reader = csv.reader(stream)
+    if csv_column.isdigit():
+        index = int(csv_column)
+    else:
+        header = next(reader, None)
+        if header is None:
+            return # Empty file
+        if csv_column not in header:
+            raise ValueError(f"CSV column {csv_column!r} not found in header: {header}")
+        index = header.index(csv_column)
+
+    for row in reader:
+        formula = row[index].strip() if index < len(row) else ""
+        if formula:
+            yield formula
+
+
+class CsvWriter:
+    """Writes result rows as CSV, with a header row."""
+
+    def __init__(self, stream, precision=None):
+        self._writer = csv.writer(stream, lineterminator="\n")
+        self._writer.writerow(OUTPUT_FIELDS)
+        self._precision = precision
+
+    def write(self, rows):
+        self._writer.writerows(
+            (formula, "" if mass is None else _format_mass(mass, self._precision), error or "")
+            for formula, mass, error in rows
+        )
+
+
+class JsonLinesWriter:
+    """Writes result rows as JSON Lines (one JSON object per line)."""
+
+    def __init__(self, stream, precision=None):
+        self._stream = stream
+        self._precision = precision
+
+    def write(self, rows):
+        precision = self._precision
+        self._stream.writelines(
+            json.dumps({
+                "formula": formula,
+                "molar_mass": _json_mass(mass, precision),
+                "error": error,
+            }) + "\n"
+            for formula, mass, error in rows
+        )
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonLinesWriter}
+
+
+def _format_mass(mass, precision):
+    if precision is not None:
+        return f"{mass:.{precision}f}"
+    return str(mass) if isinstance(mass, Decimal) else repr(mass)
+
+
+def _json_mass(mass, precision):
+    if mass is None:
+        return None
+    if isinstance(mass, Decimal):
+        return _format_mass(mass, precision) # JSON numbers are floats, so exact masses are strings
+    return mass if precision is None else round(mass, precision)
+
+
+def _open_input(path, buffer_size):
+    if path == "-":
+        return open(sys.stdin.fileno(), "r", encoding="utf-8", buffering=buffer_size, closefd=False, newline="")
+    return open(path, "r", encoding="utf-8", buffering=buffer_size, newline="")
+
+
+def _open_output(path, buffer_size):
+    if path == "-":
+        return open(sys.stdout.fileno(), "w", encoding="utf-8", buffering=buffer_size, closefd=False, newline="")
+    return open(path, "w", encoding="utf-8", buffering=buffer_size, newline="")
+
+
+def iter_formulas(paths, csv_column=None, buffer_size=DEFAULT_BUFFER_SIZE):
+    """Yields formulas from each input path in turn ('-' is stdin), opening one file at a time."""
+    for path in paths:
+        with _open_input(path, buffer_size) as stream:
+            yield from read_formulas(stream, csv_column)
+
+
+def iter_result_chunks(formulas, chunk_size=DEFAULT_CHUNK_SIZE, mode="average", exact=False, cache=None):
+    """
+    Calculates formulas chunk by chunk.
+
+    Args:
+        formulas (iterable of str): The formulas, e.g. from iter_formulas().
+        chunk_size (int): Number of formulas calculated at a time.
+        mode (str): "average" or "monoisotopic" masses (see molar_mass.MASS_MODES).
+        exact (bool): Calculate exact Decimal masses (see molar_mass.calculate_molar_mass).
+        cache (MassCache, optional): Persistent cache to look results up in and add them to.
+    Yields:
+        rows (list of tuple): (formula, molar_mass, error) rows for each chunk, in input order.
+    """
+    formulas = iter(formulas)
+    while True:
+        chunk = list(islice(formulas, chunk_size))
+        if not chunk:
+            return
+        if cache is not None:
+            yield cache.molar_mass_rows(chunk, mode, exact)
+        else:
+            yield calculate_molar_mass_rows(chunk, mode=mode, exact=exact)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Calculate molar masses for formulas read from files or stdin.",
+        epilog="Subcommands: decompose MASS (find the formulas matching a mass; see 'decompose --help').",
+    )
+    parser.add_argument("inputs", nargs="*", default=["-"],
+                        help="Input files, one formula per line ('-' or none for stdin)")
+    parser.add_argument("--csv-column", metavar="COLUMN",
+                        help="Read formulas from this CSV column (header name, or 0-based index)")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv", help="Output format (default: csv)")
+    parser.add_argument("--output", "-o", default="-", help="Output file (default: stdout)")
+    parser.add_argument("--mode", choices=MASS_MODES, default="average",
+                        help="Average atomic masses, or monoisotopic (exact) masses (default: average)")
+    parser.add_argument("--exact", action="store_true",
+                        help="Exact decimal masses (summed as integers, no floating-point rounding)")
+    parser.add_argument("--precision", type=int, help="Round masses to this many decimal places")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Formulas calculated at a time (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes to calculate with (0 = one per CPU; default: 1)")
+    parser.add_argument("--cache", metavar="FILE",
+                        help="SQLite cache of results, reused across runs and worker processes")
+    parser.add_argument("--buffer-size", type=int, default=DEFAULT_BUFFER_SIZE,
+                        help=f"I/O buffer size in bytes (default: {DEFAULT_BUFFER_SIZE})")
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in SUBCOMMANDS:
+        # Dispatched before parsing, as the default command takes any input paths
+        # (an input file with a subcommand's name can still be given as ./decompose)
+        prog = f"{os.path.basename(sys.argv[0])} {argv[0]}"
+        return SUBCOMMANDS[argv[0]](argv[1:], prog)
+
+    args = build_parser().parse_args(argv)
+    if args.chunk_size < 1:
+        raise SystemExit("--chunk-size must be at least 1")
+    if args.jobs < 0:
+        raise SystemExit("--jobs must be 0 or more")
+
+    formulas = iter_formulas(args.inputs, args.csv_column, args.buffer_size)
+    try:
+        with _open_output(args.output, args.buffer_size) as out:
+            writer = WRITERS[args.format](out, args.precision)
+            if args.jobs == 1:
+                cache = MassCache(args.cache) if args.cache else None
+                try:
+                    for rows in iter_result_chunks(formulas, args.chunk_size, args.mode, args.exact, cache):
+                        writer.write(rows)
+                finally:
+                    if cache is not None:
+                        cache.close()
+            else:
+                for rows in iter_molar_mass_rows_parallel(formulas, args.jobs or None, args.chunk_size,
+                                                          args.mode, args.exact, args.cache):
+                    writer.write(rows)
+    except BrokenPipeError:
+        # The reader went away (e.g., piped into `head`): stop quietly, as Unix tools do
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except BrokenProcessPool as e:
+        # A worker failed to start (e.g., it loaded a different element dataset; its own error
+        # is logged above) or was killed
+        print(f"Error: worker process failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,466 @@
+"""
+Local HTTP service for molar masses and formula compositions, built on asyncio.
+
+Runs standalone (Python standard library only, no web framework or external services):
+    - Single lookups are answered directly on the event loop: a cached parse and a mass sum
+      take microseconds, far less than handing them to another process would.
+    - Batches are split into chunks and calculated in a pool of worker processes (see
+      parallel_batch), a few chunks per worker at a time, so the event loop stays free to
+      serve other connections. Small batches (up to INLINE_BATCH_SIZE) skip the pool.
+    - Batch results are streamed back as JSON Lines (chunked transfer encoding), chunk by
+      chunk and in order, so neither side has to hold a large batch's results in memory.
+      Workers return each chunk already encoded, so the event loop only copies bytes.
+    - Connections are HTTP/1.1 keep-alive and may be pipelined: several requests can be
+      sent without waiting, and responses come back in request order.
+    - With --watch, the element table is reloaded when the dataset changes (see
+      periodic_table.DatasetWatcher), and a new worker pool is started for later batches.
+      Batches already streaming finish on the old pool, which is shut down once they have.
+
+Endpoints (every response is JSON, or JSON Lines for batches):
+    GET  /health                          - Status, dataset content hash and reload generation
+    GET  /mass?formula=H2SO4              - {"formula", "molar_mass", "error"}
+    GET  /composition?formula=CH3COOH     - {"formula", "hill_formula", "composition", "error"}
+    POST /batch/mass                      - One JSON line per formula, as /mass
+    POST /batch/composition               - One JSON line per formula, as /composition
+Options: mode=average|monoisotopic and exact=1 (mass endpoints). Batch bodies are either
+JSON ({"formulas": [...], "mode": ..., "exact": ...}) or plain text, one formula per line
+(options then go in the query string). If the workers fail partway through a batch, its
+stream ends with a {"error": ...} line.
+
+Usage:
+    python molar_mass_service.py --port 8080 --jobs 0
+    curl 'http://127.0.0.1:8080/mass?formula=CuSO4.5H2O'
+    curl --data-binary @formulas.txt 'http://127.0.0.1:8080/batch/mass?mode=monoisotopic'
+    python load_test.py --url http://127.0.0.1:8080 --connections 32 --pipeline 8
+
+Author: Jordan Rodger
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import aclosing
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from molar_mass import MASS_MODES, calculate_molar_mass, calculate_molar_mass_rows, parse_formula_cached
+from molar_mass_cli import _json_mass
+from parallel_batch import CHUNKS_IN_FLIGHT_PER_WORKER, DEFAULT_CHUNK_SIZE, _init_worker
+from periodic_table import DatasetWatcher, get_generation, get_periodic_table
+
+
+# ====== CONSTANTS ======
+DEFAULT_HOST = "127.0.0.1" # Local only; pass --host 0.0.0.0 to listen on every interface
+DEFAULT_PORT = 8080
+
+# Largest request head (request line + headers) and body accepted, in bytes
+MAX_HEADER_SIZE = 64 * 1024
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+# Batches up to this size are calculated on the event loop (a few hundred microseconds)
+# instead of being sent to the worker pool
+INLINE_BATCH_SIZE = 256
+
+_TRUE = frozenset(("1", "true", "yes", "on"))
+
+Request = namedtuple("Request", ("method", "path", "query", "headers", "body", "keep_alive"))
+
+
+class HttpError(Exception):
+    """An error response: HTTP status code and message (sent as {"error": message})."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def composition_rows(formulas):
+    """
+    Parses a batch of formulas, capturing errors per formula instead of stopping.
+
+    Args:
+        formulas (list of str): The chemical formulas.
+    Returns:
+        rows (list of tuple): (formula, Hill formula, {symbol: count}, error) for each formula,
+        in order; the Hill formula and counts are None when error is set, and vice versa.
+    """
+    rows = []
+    for formula in formulas:
+        try:
+            composition = parse_formula_cached(formula)
+        except ValueError as e:
+            rows.append((formula, None, None, str(e)))
+            continue
+        rows.append((formula, composition.hill_formula(), composition.to_dict(), None))
+    return rows
+
+
+def _mass_json(row):
+    formula, mass, error = row
+    return {"formula": formula, "molar_mass": _json_mass(mass, None), "error": error}
+
+
+def _composition_json(row):
+    formula, hill_formula, counts, error = row
+    return {"formula": formula, "hill_formula": hill_formula, "composition": counts, "error": error}
+
+
+def mass_json_lines(formulas, mode="average", exact=False):
+    """Calculates a chunk of a /batch/mass request, returning its JSON Lines as bytes."""
+    rows = calculate_molar_mass_rows(formulas, mode=mode, exact=exact)
+    return "".join(json.dumps(_mass_json(row)) + "\n" for row in rows).encode("utf-8")
+
+
+def composition_json_lines(formulas):
+    """Parses a chunk of a /batch/composition request, returning its JSON Lines as bytes."""
+    return "".join(json.dumps(_composition_json(row)) + "\n" for row in composition_rows(formulas)).encode("utf-8")
+
+
+async def _read_request(reader):
+    """
+    Reads the next request from a connection.
+
+    Returns:
+        (Request): The request, or None if the client closed the connection between requests.
+    Raises:
+        HttpError: If the request is malformed or too large.
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise HttpError(400, "Incomplete request") from None
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, f"Request head is larger than {MAX_HEADER_SIZE} bytes") from None
+
+    request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+    try:
+        method, target, version = request_line.split(" ")
+    except ValueError:
+        raise HttpError(400, f"Malformed request line: {request_line!r}") from None
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if "transfer-encoding" in headers:
+        raise HttpError(501, "Chunked request bodies are not supported; send a Content-Length")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length") from None
+    if length < 0:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > MAX_BODY_SIZE:
+        raise HttpError(413, f"Request body is larger than {MAX_BODY_SIZE} bytes")
+    try:
+        body = await reader.readexactly(length) if length else b""
+    except asyncio.IncompleteReadError:
+        raise HttpError(400, "Incomplete request body") from None
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    url = urlsplit(target)
+    return Request(method, url.path, parse_qs(url.query), headers, body, keep_alive)
+
+
+def _head(status, content_type, keep_alive, length=None):
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", f"Content-Type: {content_type}"]
+    lines.append(f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked")
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def _send_json(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(_head(status, "application/json", keep_alive, len(body)) + body)
+    await writer.drain()
+
+
+def _option(request, options, name, default=None):
+    """Returns a request option from the JSON body options, else the query string."""
+    if name in options:
+        return options[name]
+    values = request.query.get(name)
+    return values[-1] if values else default
+
+
+def _mass_options(request, options=None):
+    options = options or {}
+    mode = _option(request, options, "mode", "average")
+    if mode not in MASS_MODES:
+        raise HttpError(400, f"Unknown mass mode: {mode!r} (expected one of {MASS_MODES})")
+    exact = _option(request, options, "exact", False)
+    if isinstance(exact, str):
+        exact = exact.lower() in _TRUE
+    return mode, bool(exact)
+
+
+def _single_formula(request):
+    formula = _option(request, {}, "formula", "").strip()
+    if not formula:
+        raise HttpError(400, "Missing 'formula' query parameter")
+    return formula
+
+
+def _batch_formulas(request):
+    """Returns (formulas, options) from a batch request body (JSON or plain text)."""
+    if request.headers.get("content-type", "").split(";")[0].strip() == "application/json":
+        try:
+            data = json.loads(request.body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise HttpError(400, f"Invalid JSON body: {e}") from None
+        if not isinstance(data, dict) or not isinstance(data.get("formulas"), list) \
+                or not all(isinstance(formula, str) for formula in data["formulas"]):
+            raise HttpError(400, 'JSON body must be {"formulas": [strings], ...}')
+        return [formula.strip() for formula in data["formulas"]], data
+    try:
+        text = request.body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise HttpError(400, "Request body is not UTF-8") from None
+    return [line.strip() for line in text.splitlines() if line.strip()], {}
+
+
+class MolarMassService:
+    """
+    The HTTP service: one asyncio task per connection, and a shared worker process pool.
+
+    Args:
+        workers (int, optional): Worker processes for batches. Defaults to os.cpu_count().
+        chunk_size (int): Formulas per batch task (and per streamed JSON Lines chunk).
+    """
+
+    def __init__(self, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._pool_generation = None
+        self._pool_users = {} # {pool: batches using it}, for the current pool and retired ones still in use
+        self._routes = {
+            ("GET", "/health"): self._health,
+            ("GET", "/mass"): self._mass,
+            ("GET", "/composition"): self._composition,
+            ("POST", "/batch/mass"): self._batch_mass,
+            ("POST", "/batch/composition"): self._batch_composition,
+        }
+
+    def _acquire_executor(self):
+        """
+        Returns the worker pool for a batch, starting a new one if the element table was
+        reloaded since. Every call must be matched by a _release_executor() call.
+        """
+        generation = get_generation()
+        if self._pool is None or self._pool_generation != generation:
+            retired = self._pool
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(get_periodic_table().content_hash,))
+            self._pool_generation = generation
+            self._pool_users[self._pool] = 0
+            if retired is not None:
+                self._shutdown_if_unused(retired)
+        self._pool_users[self._pool] += 1
+        return self._pool
+
+    def _release_executor(self, pool):
+        """Releases a pool from _acquire_executor(), shutting it down if it has been retired and is now unused."""
+        self._pool_users[pool] -= 1
+        if pool is not self._pool:
+            self._shutdown_if_unused(pool)
+
+    def _shutdown_if_unused(self, pool):
+        # Batches still streaming from a retired pool keep it running until they finish,
+        # on the old table; the last one to finish shuts it down
+        if not self._pool_users[pool]:
+            del self._pool_users[pool]
+            pool.shutdown(wait=False)
+
+    def close(self):
+        """Shuts down the worker pools."""
+        for pool in self._pool_users:
+            pool.shutdown(cancel_futures=True)
+        self._pool_users.clear()
+        self._pool = None
+
+    async def handle_connection(self, reader, writer):
+        """Serves the requests on one connection, in order, until it is closed."""
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HttpError as e:
+                    # The rest of a malformed request can't be skipped reliably, so close after replying
+                    await _send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                try:
+                    handler = self._routes.get((request.method, request.path))
+                    if handler is None:
+                        known_path = any(path == request.path for _, path in self._routes)
+                        raise HttpError(405 if known_path else 404, f"No route for {request.method} {request.path}")
+                    await handler(request, writer)
+                except HttpError as e:
+                    await _send_json(writer, e.status, {"error": str(e)}, request.keep_alive)
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # Client went away
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _health(self, request, writer):
+        table = get_periodic_table()
+        await _send_json(writer, 200, {
+            "status": "ok",
+            "schema_version": table.schema_version,
+            "content_hash": table.content_hash,
+            "generation": get_generation(),
+            "workers": self.workers,
+        }, request.keep_alive)
+
+    async def _mass(self, request, writer):
+        formula = _single_formula(request)
+        mode, exact = _mass_options(request)
+        try:
+            row = (formula, calculate_molar_mass(formula, mode=mode, exact=exact), None)
+        except ValueError as e:
+            row = (formula, None, str(e))
+        await _send_json(writer, 200 if row[2] is None else 400, _mass_json(row), request.keep_alive)
+
+    async def _composition(self, request, writer):
+        row = composition_rows([_single_formula(request)])[0]
+        await _send_json(writer, 200 if row[3] is None else 400, _composition_json(row), request.keep_alive)
+
+    async def _batch_mass(self, request, writer):
+        formulas, options = _batch_formulas(request)
+        mode, exact = _mass_options(request, options)
+        await self._stream(writer, partial(mass_json_lines, mode=mode, exact=exact), formulas, request.keep_alive)
+
+    async def _batch_composition(self, request, writer):
+        formulas, _ = _batch_formulas(request)
+        await self._stream(writer, composition_json_lines, formulas, request.keep_alive)
+
+    async def _iter_chunks(self, func, formulas):
+        """Yields func(chunk) for each chunk of formulas, in order, calculated in the worker pool."""
+        if len(formulas) <= INLINE_BATCH_SIZE:
+            yield func(formulas)
+            return
+
+        loop = asyncio.get_running_loop()
+        executor = self._acquire_executor() # Every chunk of a batch is calculated by the same pool
+        max_in_flight = self.workers * CHUNKS_IN_FLIGHT_PER_WORKER
+        pending = deque() # Futures in submission (= input) order
+        try:
+            for start in range(0, len(formulas), self.chunk_size):
+                pending.append(loop.run_in_executor(executor, func, formulas[start:start + self.chunk_size]))
+                if len(pending) >= max_in_flight:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        except BrokenProcessPool:
+            if executor is self._pool:
+                self._pool_generation = None # Start a new pool for the next batch
+            raise
+        finally:
+            for future in pending: # The client went away: drop work not yet started
+                future.cancel()
+            self._release_executor(executor)
+
+    async def _stream(self, writer, func, formulas, keep_alive):
+        """Streams a batch as JSON Lines (func returns a chunk's lines), one HTTP chunk per chunk of formulas."""
+        writer.write(_head(200, "application/x-ndjson", keep_alive))
+        try:
+            # aclosing: if the client goes away mid-stream, the pool is released now, not when the
+            # abandoned generator is garbage collected
+            async with aclosing(self._iter_chunks(func, formulas)) as chunks:
+                async for data in chunks:
+                    writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    await writer.drain() # Back-pressure: wait while the client is slower than the workers
+        except ConnectionError:
+            raise # Client went away
+        except Exception as e:
+            # A worker failed (e.g., BrokenProcessPool from a worker whose table didn't match).
+            # The 200 head is already sent, so end the body with an error line instead
+            print(f"Error: batch of {len(formulas)} formulas failed: {e!r}", file=sys.stderr)
+            data = json.dumps({"error": f"Batch failed: {e!r}"}).encode("utf-8") + b"\n"
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """
+        Serves until cancelled.
+
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port to listen on (0 picks a free one).
+            ready (callable, optional): Called with the listening server once it has started.
+        """
+        get_periodic_table() # Load the table before the first request, not during it
+        try:
+            # Stop cleanly on SIGTERM (e.g., from a service manager), as on Ctrl+C
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass # No signal handlers in Windows event loops
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_SIZE)
+        if ready is not None:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve molar masses and compositions over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Interface to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--jobs", "-j", type=int, default=0,
+                        help="Worker processes for batches (0 = one per CPU; default: 0)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Formulas per batch task (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--watch", action="store_true", help="Reload the element table when the dataset changes")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        raise SystemExit("--chunk-size must be at least 1")
+    if args.jobs < 0:
+        raise SystemExit("--jobs must be 0 or more")
+
+    service = MolarMassService(args.jobs or None, args.chunk_size)
+    watcher = None
+    if args.watch:
+        watcher = DatasetWatcher(on_reload=lambda table: print(f"Reloaded element table {table.content_hash}",
+                                                               file=sys.stderr))
+        watcher.start()
+
+    def ready(server):
+        addresses = ", ".join(f"{socket.getsockname()[0]}:{socket.getsockname()[1]}" for socket in server.sockets)
+        print(f"Serving on {addresses} with {service.workers} worker processes", file=sys.stderr)
+
+    try:
+        asyncio.run(service.serve(args.host, args.port, ready))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Parallel batch molar-mass calculation using a pool of worker processes.
+
+Parsing and mass calculation are CPU-bound pure Python, so a single process only uses one
+core. These functions split the input into chunks and calculate them in a
+ProcessPoolExecutor:
+    - Chunks are large (thousands of formulas) so the cost of sending formulas to a worker
+      and results back is spread over many formulas.
+    - Each worker loads the element table once, when it starts (see _init_worker), and keeps
+      its own parse cache for the whole run. Workers check that their table has the same
+      content hash as the parent's, so a pool never mixes results from two datasets.
+    - Only a few chunks per worker are in flight at a time, so input is read lazily and
+      memory stays bounded even for very large inputs.
+    - Results are returned in input order.
+
+Author: Jordan Rodger
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from mass_cache import cached_molar_mass_rows
+from molar_mass import _numpy, calculate_molar_mass_rows, calculate_molar_masses, get_periodic_table
+
+
+# ====== CONSTANTS ======
+# Formulas sent to a worker per task; large enough that IPC is a small part of each task
+DEFAULT_CHUNK_SIZE = 4096
+
+# Chunks queued per worker, so workers never wait for the next task
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+
+def _init_worker(content_hash=None):
+    """
+    Runs once in each worker process: loads the shared element table up front, and checks
+    it is the same dataset as the parent process's (elements.json may have changed since).
+    """
+    table = get_periodic_table()
+    if content_hash is not None and table.content_hash != content_hash:
+        raise RuntimeError(f"Worker loaded a different element dataset ({table.content_hash}) "
+                           f"to the parent process ({content_hash})")
+
+
+def _iter_chunks(formulas, chunk_size):
+    formulas = iter(formulas)
+    while True:
+        chunk = list(islice(formulas, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def imap_chunks(func, formulas, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Applies func to chunks of formulas in worker processes, yielding results in input order.
+
+    Args:
+        func (callable): Module-level function (or partial of one) taking a list of formulas (must be picklable).
+        formulas (iterable of str): The formulas; read lazily, a few chunks ahead of the output.
+        workers (int, optional): Number of worker processes. Defaults to os.cpu_count().
+        chunk_size (int): Number of formulas per task.
+    Yields:
+        The result of func for each chunk, in order.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * CHUNKS_IN_FLIGHT_PER_WORKER
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(get_periodic_table().content_hash,)) as executor:
+        pending = deque() # Futures in submission (= input) order
+        for chunk in _iter_chunks(formulas, chunk_size):
+            pending.append(executor.submit(func, chunk))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_molar_mass_rows_parallel(formulas, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, mode="average",
+                                  exact=False, cache=None):
+    """
+    Parallel version of calculate_molar_mass_rows(), for streams of formulas.
+
+    Args:
+        formulas (iterable of str): The chemical formulas to calculate molar masses from
+        workers (int, optional): Number of worker processes. Defaults to os.cpu_count().
+        chunk_size (int): Number of formulas per task.
+        mode (str): "average" or "monoisotopic" masses (see molar_mass.MASS_MODES).
+        exact (bool): Calculate exact Decimal masses (see molar_mass.calculate_molar_mass).
+        cache (str, optional): Path to a persistent SQLite cache of results (see mass_cache.py),
+            shared by the workers, each with its own connection.
+    Yields:
+        rows (list of tuple): (formula, molar_mass, error) rows for each chunk, in input order.
+    """
+    if cache is not None:
+        func = partial(cached_molar_mass_rows, filename=cache, mode=mode, exact=exact)
+    else:
+        func = partial(calculate_molar_mass_rows, mode=mode, exact=exact)
+    yield from imap_chunks(func, formulas, workers, chunk_size)
+
+
+def calculate_molar_masses_parallel(formulas, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, mode="average",
+                                    exact=False):
+    """
+    Parallel version of calculate_molar_masses().
+
+    Args:
+        formulas (iterable of str): The chemical formulas to calculate molar masses from
+        workers (int, optional): Number of worker processes. Defaults to os.cpu_count().
+        chunk_size (int): Number of formulas per task.
+        mode (str): "average" or "monoisotopic" masses (see molar_mass.MASS_MODES).
+        exact (bool): Calculate exact Decimal masses (see molar_mass.calculate_molar_mass).
+    Returns:
+        masses (numpy.ndarray or list): The molar masses (in g/mol), in the same order as formulas
+            (a list of Decimals if exact)
+    Raises:
+        ValueError: If a formula is malformed or contains an unrecognised element symbol.
+    """
+    chunks = list(imap_chunks(partial(calculate_molar_masses, mode=mode, exact=exact), formulas, workers, chunk_size))
+    np = _numpy()
+    if np is None or exact:
+        return [mass for chunk in chunks for mass in chunk]
+    return np.concatenate(chunks) if chunks else np.zeros(0)
@@ -0,0 +1,459 @@
+"""
+Mass percent composition of formulas, and empirical formulas from elemental analysis.
+
+Both directions use the same atomic masses as calculate_molar_mass():
+    - percent_composition() gives the % by mass of each element in a formula, e.g.
+      glucose (C6H12O6) is 40.00% C, 6.71% H and 53.29% O.
+    - empirical_formula() goes the other way: from measured mass percentages (e.g., a
+      combustion analysis) to the simplest whole-number formula. Each element's mole
+      ratio to the scarcest element is approximated with its continued-fraction
+      convergents, so the smallest denominator within tolerance of a whole number is
+      found directly (1.333 -> 4/3) instead of trying multipliers 1, 2, 3... in turn.
+
+The batch versions (percent_compositions, empirical_formulas) work on whole arrays at a
+time with NumPy: percentages come from the composition matrix (see
+build_composition_matrix) times the mass vector, and the continued fractions are
+expanded for every row and element at once. Without NumPy they fall back to pure Python.
+
+Usage:
+    python percent_composition.py percent catalogue.txt > percentages.csv
+    python percent_composition.py empirical analysis.csv --by-difference O > formulas.csv
+
+Example:
+    >>> percent_composition("C6H12O6")
+    {'C': 40.00..., 'H': 6.71..., 'O': 53.28...}
+    >>> empirical_formula({"C": 40.0, "H": 6.71, "O": 53.29}).formula
+    'CH2O'
+
+Author: Jordan Rodger
+"""
+
+import argparse
+import csv
+import math
+import os
+import sys
+from collections import namedtuple
+from itertools import islice
+
+from composition import Composition
+from molar_mass import (BATCH_CHUNK_SIZE, MASS_MODES, _mass_column, _numpy, build_composition_matrix, build_mass_vector,
+                        get_atomic_numbers, get_element_masses, parse_formula_cached)
+from molar_mass_cli import DEFAULT_BUFFER_SIZE, _open_input, _open_output, iter_formulas
+from periodic_table import get_periodic_table
+
+
+# ====== CONSTANTS ======
+# Largest distance from a whole number accepted for a mole ratio (times its multiplier).
+# Analyses are usually good to about ±0.3 % by mass, which moves ratios by a few hundredths.
+DEFAULT_TOLERANCE = 0.1
+
+# Largest multiplier tried to turn the mole ratios into whole numbers
+DEFAULT_MAX_MULTIPLIER = 12
+
+EmpiricalFormula = namedtuple("EmpiricalFormula", ("formula", "composition", "max_error"))
+
+
+def _element_mass(element_masses, mode):
+    """Returns a function giving the atomic mass of an atomic number (ValueError if it has none)."""
+    symbols = get_periodic_table().symbols
+    if element_masses is None:
+        masses = _mass_column(mode)
+
+        def mass_of(atomic_number):
+            mass = masses[atomic_number - 1]
+            if mass != mass: # NaN: no mass in this mode (no stable isotopes)
+                raise ValueError(f"No {mode} mass for element: {symbols[atomic_number - 1]}")
+            return mass
+    else:
+        def mass_of(atomic_number):
+            symbol = symbols[atomic_number - 1]
+            if symbol not in element_masses:
+                raise ValueError(f"Unknown element: {symbol}")
+            return element_masses[symbol]
+    return mass_of
+
+
+def percent_composition(formula, element_masses=None, mode="average"):
+    """
+    Calculates the mass percent of each element in a formula.
+
+    Args:
+        formula (str or Composition): The chemical formula, e.g. 'C6H12O6'.
+        element_masses (dict, optional): A dictionary mapping element symbols to atomic masses.
+            Defaults to the shared masses for `mode`. Overrides mode.
+        mode (str): "average" or "monoisotopic" (see molar_mass.MASS_MODES).
+    Returns:
+        percentages (dict): {symbol: % by mass}, in atomic number order (summing to 100).
+    Raises:
+        ValueError: If the formula is invalid or has an element with no mass.
+    """
+    composition = formula if isinstance(formula, Composition) else parse_formula_cached(formula)
+    mass_of = _element_mass(element_masses, mode)
+    symbols = get_periodic_table().symbols
+    element_totals = [(symbols[atomic_number - 1], mass_of(atomic_number) * count)
+                      for atomic_number, count in composition.pairs]
+    total = sum(mass for _, mass in element_totals)
+    if not total:
+        return {}
+    return {symbol: mass / total * 100 for symbol, mass in element_totals}
+
+
+def percent_compositions(formulas, element_masses=None, chunk_size=BATCH_CHUNK_SIZE, mode="average"):
+    """
+    Calculates the mass percent composition of a batch of formulas.
+
+    With NumPy installed, each chunk of formulas is parsed into a composition matrix and
+    scaled by the mass vector, so every element's mass in every formula comes from one
+    vectorised multiply; each row is then divided by its total (the molar mass).
+
+    Args:
+        formulas (iterable of str or Composition): The chemical formulas.
+        element_masses (dict, optional): A dictionary mapping element symbols to atomic masses.
+            Defaults to the shared masses for `mode`. Overrides mode.
+        chunk_size (int): Number of formulas per composition matrix (bounds memory use).
+        mode (str): "average" or "monoisotopic" (see molar_mass.MASS_MODES).
+    Returns:
+        (symbols, percentages) (tuple): symbols is a tuple of the elements found in any of
+        the formulas, in atomic number order; percentages has one row per formula (in order)
+        and one column per symbol: a float64 numpy.ndarray, or a list of lists without NumPy.
+    Raises:
+        ValueError: If a formula is invalid or has an element with no mass.
+    """
+    symbols = get_periodic_table().symbols
+    np = _numpy()
+    if np is None:
+        rows = [percent_composition(formula, element_masses, mode) for formula in formulas]
+        columns = tuple(symbol for symbol in symbols if any(symbol in row for row in rows))
+        return columns, [[row.get(symbol, 0.0) for symbol in columns] for row in rows]
+
+    mass_vector = build_mass_vector(element_masses, mode)
+    missing = np.isnan(mass_vector)
+
+    iterator = iter(formulas)
+    chunks = [] # (row count, column indices used, percentages of those columns) per chunk
+    used = np.zeros(mass_vector.shape, dtype=bool)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        matrix = build_composition_matrix(chunk)
+        columns = np.flatnonzero(matrix.any(axis=0))
+        if missing[columns].any():
+            # Re-run the first offending formula so it raises the usual error
+            uses_missing = matrix[:, missing].any(axis=1)
+            percent_composition(chunk[int(np.argmax(uses_missing))], element_masses, mode)
+
+        element_totals = matrix[:, columns] * mass_vector[columns]
+        totals = element_totals.sum(axis=1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            percentages = np.where(totals > 0, element_totals / totals * 100, 0.0)
+        chunks.append((len(chunk), columns, percentages))
+        used[columns] = True
+
+    # Lay the chunks out over the union of their columns
+    columns = np.flatnonzero(used)
+    position_of = np.zeros(mass_vector.shape, dtype=np.intp)
+    position_of[columns] = np.arange(len(columns))
+    result = np.zeros((sum(rows for rows, _, _ in chunks), len(columns)))
+    start = 0
+    for rows, chunk_columns, percentages in chunks:
+        result[start:start + rows, position_of[chunk_columns]] = percentages
+        start += rows
+    return tuple(symbols[i] for i in columns.tolist()), result
+
+
+def _smallest_denominator(ratio, tolerance, max_multiplier):
+    """
+    Returns the denominator q of the first continued-fraction convergent p/q of `ratio`
+    with |q * ratio - p| <= tolerance, or None if there is none with q <= max_multiplier.
+
+    Convergents are the best rational approximations for their size, and their errors
+    |q * ratio - p| shrink monotonically, so the first one within tolerance has the
+    smallest denominator that any approximation within tolerance can have.
+    """
+    p_previous, p = 1, math.floor(ratio)
+    q_previous, q = 0, 1
+    x = ratio
+    while q <= max_multiplier:
+        if abs(q * ratio - p) <= tolerance:
+            return q
+        x = 1 / (x - math.floor(x)) # Can't divide by 0: x whole would have passed the check
+        term = math.floor(x)
+        p_previous, p = p, term * p + p_previous
+        q_previous, q = q, term * q + q_previous
+    return None
+
+
+def _check_percentages(percentages, by_difference):
+    """Validates {symbol: %} analysis results, returning them with `by_difference` filled in."""
+    percentages = {symbol: float(percent) for symbol, percent in percentages.items()}
+    if any(percent < 0 or percent != percent for percent in percentages.values()):
+        raise ValueError(f"Percentages must be 0 or more: {percentages}")
+    if by_difference is not None:
+        if by_difference in percentages:
+            raise ValueError(f"{by_difference} is calculated by difference, so can't also be given")
+        remainder = 100 - sum(percentages.values())
+        if remainder < 0:
+            raise ValueError(f"Percentages add up to more than 100, leaving nothing for {by_difference}")
+        percentages[by_difference] = remainder
+    return percentages
+
+
+def empirical_formula(percentages, tolerance=DEFAULT_TOLERANCE, max_multiplier=DEFAULT_MAX_MULTIPLIER,
+                      element_masses=None, by_difference=None):
+    """
+    Finds the empirical (simplest whole-number) formula matching an elemental analysis.
+
+    Each element's moles (percent / atomic mass) are divided by those of the scarcest
+    element; the multiplier is the lowest common multiple of the smallest denominators
+    that bring each ratio within tolerance of a whole number (see _smallest_denominator).
+
+    Args:
+        percentages (dict): {symbol: % by mass}, e.g. {"C": 40.0, "H": 6.71, "O": 53.29}.
+            The percentages needn't add up to 100; only their ratios matter.
+        tolerance (float): Largest distance from a whole number accepted for a mole ratio.
+        max_multiplier (int): Largest multiplier tried to make the ratios whole numbers.
+        element_masses (dict, optional): A dictionary mapping element symbols to atomic masses.
+            Defaults to the shared average atomic masses.
+        by_difference (str, optional): An element not analysed directly (usually O), whose
+            percentage is 100 minus the sum of the others.
+    Returns:
+        (EmpiricalFormula): (formula, composition, max_error), where formula is in Hill
+        notation and max_error is the largest distance of a scaled ratio from its count.
+    Raises:
+        ValueError: If an element is unknown, the percentages are invalid, or no multiplier
+            up to max_multiplier gives whole numbers within tolerance.
+    """
+    percentages = _check_percentages(percentages, by_difference)
+    if element_masses is None:
+        element_masses = get_element_masses()
+    atomic_numbers = get_atomic_numbers()
+
+    moles = {}
+    for symbol, percent in percentages.items():
+        if symbol not in atomic_numbers or symbol not in element_masses:
+            raise ValueError(f"Unknown element: {symbol}")
+        if percent:
+            moles[symbol] = percent / element_masses[symbol]
+    if not moles:
+        raise ValueError("No element has a percentage above 0")
+
+    smallest = min(moles.values())
+    ratios = {symbol: amount / smallest for symbol, amount in moles.items()}
+    multiplier = 1
+    for symbol, ratio in ratios.items():
+        denominator = _smallest_denominator(ratio, tolerance, max_multiplier)
+        if denominator is None:
+            raise ValueError(f"No whole-number ratio for {symbol} ({ratio:.3f}) with a multiplier "
+                             f"up to {max_multiplier} (tolerance {tolerance})")
+        multiplier = math.lcm(multiplier, denominator)
+    if multiplier > max_multiplier:
+        raise ValueError(f"Whole-number ratios need a multiplier of {multiplier}, above {max_multiplier}")
+
+    counts = {symbol: round(ratio * multiplier) for symbol, ratio in ratios.items()}
+    max_error = max(abs(ratio * multiplier - counts[symbol]) for symbol, ratio in ratios.items())
+    composition = Composition(counts)
+    return EmpiricalFormula(composition.hill_formula(), composition, max_error)
+
+
+def _smallest_denominators(ratios, tolerance, max_multiplier):
+    """
+    Vectorised _smallest_denominator() over an array of ratios: every element of every
+    row expands its continued fraction in step. Returns int64 denominators, 0 where none
+    is within max_multiplier (and 1 where the ratio is 0, i.e. an absent element).
+    """
+    np = _numpy()
+    p_previous, p = np.ones(ratios.shape), np.floor(ratios)
+    q_previous, q = np.zeros(ratios.shape), np.ones(ratios.shape)
+    x = ratios.copy()
+    denominators = np.zeros(ratios.shape, dtype=np.int64)
+    open_ = np.ones(ratios.shape, dtype=bool) # Still expanding
+    while open_.any():
+        found = open_ & (np.abs(q * ratios - p) <= tolerance)
+        denominators[found] = q[found]
+        open_ &= ~found & (q <= max_multiplier)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = np.where(open_, 1 / (x - np.floor(x)), 1.0)
+        term = np.floor(x)
+        p_previous, p = p, term * p + p_previous
+        q_previous, q = q, term * q + q_previous
+        open_ &= q <= max_multiplier
+    return denominators
+
+
+def empirical_formulas(percentages, symbols, tolerance=DEFAULT_TOLERANCE, max_multiplier=DEFAULT_MAX_MULTIPLIER,
+                       element_masses=None, by_difference=None):
+    """
+    Finds the empirical formulas for a batch of elemental analyses.
+
+    With NumPy installed, the whole batch is worked out with array operations: mole
+    ratios, the continued-fraction expansion of every ratio, the multipliers (np.lcm)
+    and the counts. Identical results share one Composition.
+
+    Args:
+        percentages (2D array-like): One row per analysis, one column per symbol (% by mass).
+        symbols (sequence of str): The element of each column.
+        tolerance (float): Largest distance from a whole number accepted for a mole ratio.
+        max_multiplier (int): Largest multiplier tried to make the ratios whole numbers.
+        element_masses (dict, optional): A dictionary mapping element symbols to atomic masses.
+            Defaults to the shared average atomic masses.
+        by_difference (str, optional): An element not in `symbols` (usually O), whose
+            percentage in each row is 100 minus the sum of the others.
+    Returns:
+        results (list): An EmpiricalFormula for each row, in order, or None for rows with
+        no whole-number formula within tolerance (or with invalid percentages).
+    Raises:
+        ValueError: If a symbol is unknown.
+    """
+    symbols = list(symbols)
+    np = _numpy()
+    if np is None:
+        results = []
+        for row in percentages:
+            try:
+                results.append(empirical_formula(dict(zip(symbols, row)), tolerance, max_multiplier,
+                                                 element_masses, by_difference))
+            except ValueError:
+                results.append(None)
+        return results
+
+    if element_masses is None:
+        element_masses = get_element_masses()
+    atomic_numbers = get_atomic_numbers()
+    if by_difference is not None:
+        if by_difference in symbols:
+            raise ValueError(f"{by_difference} is calculated by difference, so can't also be given")
+        symbols.append(by_difference)
+    for symbol in symbols:
+        if symbol not in atomic_numbers or symbol not in element_masses:
+            raise ValueError(f"Unknown element: {symbol}")
+
+    percentages = np.array(percentages, dtype=np.float64).reshape(-1, len(symbols) - (by_difference is not None))
+    if by_difference is not None:
+        percentages = np.column_stack((percentages, 100 - percentages.sum(axis=1)))
+    valid = ~(np.isnan(percentages) | (percentages < 0)).any(axis=1) & (percentages > 0).any(axis=1)
+    percentages = np.where(valid[:, None], percentages, 0.0)
+
+    moles = percentages / np.array([element_masses[symbol] for symbol in symbols])
+    smallest = np.where(moles > 0, moles, np.inf).min(axis=1, keepdims=True)
+    ratios = np.where(valid[:, None], moles / np.where(np.isfinite(smallest), smallest, 1.0), 0.0)
+
+    denominators = _smallest_denominators(ratios, tolerance, max_multiplier)
+    multipliers = np.lcm.reduce(denominators, axis=1) # 0 if any element had no denominator
+    valid &= (multipliers > 0) & (multipliers <= max_multiplier)
+    scaled = ratios * multipliers[:, None]
+    counts = np.rint(scaled).astype(np.int64)
+    max_errors = np.abs(scaled - counts).max(axis=1)
+
+    # Rows -> compositions, in atomic number order so the pairs can be used as they are
+    order = sorted(range(len(symbols)), key=lambda i: atomic_numbers[symbols[i]])
+    numbers = [atomic_numbers[symbols[i]] for i in order]
+    counts = counts[:, order]
+    formulas = {} # {counts: (formula, composition)}, as analyses often repeat
+    results = []
+    for row, is_valid, max_error in zip(counts.tolist(), valid.tolist(), max_errors.tolist()):
+        if not is_valid:
+            results.append(None)
+            continue
+        key = tuple(row)
+        entry = formulas.get(key)
+        if entry is None:
+            composition = Composition.from_pairs(tuple((n, c) for n, c in zip(numbers, row) if c))
+            entry = formulas[key] = (composition.hill_formula(), composition)
+        results.append(EmpiricalFormula(entry[0], entry[1], max_error))
+    return results
+
+
+def _read_analyses(paths):
+    """Reads CSV analyses (header of element symbols) into (symbols, rows of percentages)."""
+    symbols, rows = None, []
+    for path in paths:
+        with _open_input(path, DEFAULT_BUFFER_SIZE) as stream:
+            reader = csv.reader(stream)
+            header = [symbol.strip() for symbol in next(reader, [])]
+            if symbols is None:
+                symbols = header
+            elif header != symbols:
+                raise ValueError(f"{path} has different columns ({', '.join(header)}) to the first input")
+            for line, row in enumerate(reader, 2):
+                try:
+                    rows.append([float(value) if value.strip() else 0.0 for value in row])
+                except ValueError:
+                    raise ValueError(f"{path}, line {line}: percentages must be numbers") from None
+                if len(row) != len(symbols):
+                    raise ValueError(f"{path}, line {line}: expected {len(symbols)} columns")
+    return symbols or [], rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Percent composition of formulas, and empirical formulas "
+                                                 "from elemental analyses.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    percent = commands.add_parser("percent", help="Mass percent of each element, for formulas from files or stdin")
+    percent.add_argument("inputs", nargs="*", default=["-"],
+                         help="Input files, one formula per line ('-' or none for stdin)")
+    percent.add_argument("--csv-column", metavar="COLUMN",
+                         help="Read formulas from this CSV column (header name, or 0-based index)")
+    percent.add_argument("--mode", choices=MASS_MODES, default="average",
+                         help="Average atomic masses, or monoisotopic (exact) masses (default: average)")
+
+    empirical = commands.add_parser("empirical", help="Empirical formulas from CSV analyses "
+                                                      "(one column of %% by mass per element)")
+    empirical.add_argument("inputs", nargs="*", default=["-"],
+                           help="Input CSV files, with element symbols as the header ('-' or none for stdin)")
+    empirical.add_argument("--by-difference", metavar="SYMBOL", help="Element calculated as 100 %% minus the others")
+    empirical.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                           help=f"Largest distance of a ratio from a whole number (default: {DEFAULT_TOLERANCE})")
+    empirical.add_argument("--max-multiplier", type=int, default=DEFAULT_MAX_MULTIPLIER,
+                           help=f"Largest multiplier tried (default: {DEFAULT_MAX_MULTIPLIER})")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "percent":
+            # Long format (formula, element, percent), so results can be written chunk by chunk
+            with _open_output("-", DEFAULT_BUFFER_SIZE) as out:
+                writer = csv.writer(out, lineterminator="\n")
+                writer.writerow(("formula", "element", "percent"))
+                formulas = iter_formulas(args.inputs, args.csv_column)
+                while True:
+                    chunk = list(islice(formulas, BATCH_CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    try:
+                        columns, percentages = percent_compositions(chunk, mode=args.mode)
+                        rows = percentages if isinstance(percentages, list) else percentages.tolist()
+                        results = [zip(columns, row) for row in rows]
+                    except ValueError:
+                        # Some formula in the chunk is invalid: redo it one formula at a time
+                        results = []
+                        for formula in chunk:
+                            try:
+                                results.append(percent_composition(formula, mode=args.mode).items())
+                            except ValueError as e:
+                                print(f"Skipped {formula!r}: {e}", file=sys.stderr)
+                                results.append(())
+                    for formula, result in zip(chunk, results):
+                        writer.writerows((formula, symbol, f"{value:.4f}") for symbol, value in result if value)
+            return 0
+
+        symbols, rows = _read_analyses(args.inputs)
+        results = empirical_formulas(rows, symbols, args.tolerance, args.max_multiplier,
+                                     by_difference=args.by_difference)
+        with _open_output("-", DEFAULT_BUFFER_SIZE) as out:
+            writer = csv.writer(out, lineterminator="\n")
+            writer.writerow(("formula", "max_error"))
+            writer.writerows(("", "") if result is None else (result.formula, f"{result.max_error:.3f}")
+                             for result in results)
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
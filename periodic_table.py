@@ -0,0 +1,648 @@
+"""
+Compact, read-only Periodic Table built from the element dataset ('elements.json').
+
+Rather than a list of 118 dicts (each repeating its full source URL), the table stores
+one column per field:
+    - Atomic masses, their uncertainties and atomic weight intervals - array('d') of floats
+      (NaN where an element has no standard atomic weight, or no interval)
+    - Atomic numbers - array('H') of small ints
+    - Symbols and names - tuples of interned strings
+    - Groups and sources - array('B') codes into small tuples of distinct values
+      (e.g., there are only two source URLs, so each element stores a 1-byte source id)
+
+The same columns can also be saved to a compact binary file ('elements.bin', written by
+elements_json_creation.py), which is memory-mapped and used in place instead of parsing
+the JSON file on every start-up.
+
+Elements can be looked up by symbol or atomic number in O(1). A single shared table is
+built on first use by get_periodic_table(), and every module should use that table
+(or its read-only lookup dicts) instead of building its own.
+
+The dataset carries a schema version and a content hash (see dataset_hash), written by
+elements_json_creation.py and kept in the binary file too. They are exposed by
+load_elements() and the table, so caches and indexes built from the dataset can tell
+whether it has changed by comparing one hash.
+
+Natural isotopic compositions ('isotopes.json') are loaded the same way, on first use
+(see get_isotopes), along with the monoisotopic mass of each element (get_monoisotopic_masses).
+
+Long-running processes can pick up a changed dataset without restarting: reload() builds
+new shared data off to the side and then swaps it in, and DatasetWatcher does so whenever
+the dataset files change. Code already holding the old table (or its columns) keeps using
+it until it finishes. Every reload increments a generation counter (get_generation), which
+caches built from the shared data compare against to know when to rebuild.
+
+Author: Jordan Rodger
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from hashlib import blake2b
+from types import MappingProxyType
+
+
+# ====== CONSTANTS ======
+# elements.json is resolved next to this module (not the current working directory),
+# so the module can be imported from anywhere, e.g. worker processes and test runners.
+ELEMENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "elements.json")
+
+# Compact binary form of the same dataset, written by elements_json_creation.py (see write_binary)
+BINARY_FILE = os.path.splitext(ELEMENTS_FILE)[0] + ".bin"
+
+# Version of the elements.json layout written by elements_json_creation.py:
+#   1 - a bare list of element records (no version or hash; still read)
+#   2 - {"schema_version": 2, "content_hash": ..., "elements": [element records]}
+#   3 - as 2, with IUPAC/CIAAW atomic_mass_uncertainty (null for elements with no standard
+#       atomic weight) and atomic_mass_interval ([lower, upper] or null) in each record
+DATASET_SCHEMA_VERSION = 3
+
+# Binary file layout (all little-endian). The header is followed by one column per field,
+# so numeric columns can be memory-mapped and used in place without any parsing:
+#   header  - magic, format version, element count, distinct group count, distinct source count,
+#             the byte offset of each column, the length of the string block, then the
+#             dataset schema version and content hash (16 raw bytes)
+#   masses  - element count x float64 (8-byte aligned)
+#   uncertainties - element count x float64 (atomic mass uncertainties, NaN if none)
+#   intervals - element count x 2 float64 (lower, upper atomic weight bounds, NaN if none)
+#   numbers - element count x uint16 (atomic numbers)
+#   groups  - element count x uint8 (index into the group names)
+#   sources - element count x uint8 (index into the source URLs)
+#   strings - NUL-separated UTF-8: symbols, names, group names, then source URLs
+BINARY_MAGIC = b"PTBL"
+BINARY_FORMAT_VERSION = 4
+_HEADER = struct.Struct("<4sHHHHIIIIIIIIH16s")
+# The "content_hash" field of a JSON dataset, found without parsing the file
+_JSON_HASH_PATTERN = re.compile(rb'"content_hash"\s*:\s*"([0-9a-f]{32})"')
+
+# Natural isotopic compositions (isotope masses and abundances), also written by elements_json_creation.py
+ISOTOPES_FILE = os.path.join(os.path.dirname(ELEMENTS_FILE), "isotopes.json")
+
+# Shared PeriodicTable, built lazily on first use (see get_periodic_table)
+_periodic_table = None
+
+# Shared isotope data, also built lazily (see get_isotopes and get_monoisotopic_masses)
+_isotopes = None
+_monoisotopic_masses = None
+
+# Incremented by every reload(), so caches of data derived from the shared table can tell
+# in O(1) whether they are out of date (see get_generation)
+_generation = 0
+_reload_lock = threading.Lock()
+
+# Seconds between checks for changed dataset files (see DatasetWatcher)
+DEFAULT_WATCH_INTERVAL = 2.0
+
+
+class ElementList(list):
+    """
+    The element records of a dataset (a plain list of dicts), plus the dataset's
+    schema_version and content_hash (both None if the dataset couldn't be loaded).
+    """
+
+    def __init__(self, elements=(), schema_version=None, content_hash=None):
+        super().__init__(elements)
+        self.schema_version = schema_version
+        self.content_hash = content_hash
+
+
+def dataset_hash(elements):
+    """
+    Calculates the content hash of a list of element records.
+
+    The records are serialised as canonical JSON (sorted by atomic number, sorted keys, no
+    whitespace) and hashed with BLAKE2b, so the hash only changes when the data does,
+    not with formatting or key order.
+
+    Args:
+        elements (list of dict): Element records in the elements.json format.
+    Returns:
+        (str): 32 hex digits (128-bit hash).
+    """
+    records = sorted(elements, key=lambda el: el['atomic_number'])
+    canonical = json.dumps(records, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# Loads element data from local JSON file
+def load_elements(filename=ELEMENTS_FILE):
+    """
+    Loads the element dataset as a list of dicts (one per element).
+
+    Uses the binary form of the dataset when present (see load_periodic_table),
+    otherwise parses the JSON file.
+
+    Args:
+        filename (str): Path to the JSON dataset.
+    Returns:
+        (ElementList): Element records, with the dataset's schema_version and content_hash,
+            or an empty list if the file can't be loaded.
+    """
+    binary = _binary_path(filename)
+    if binary is not None:
+        try:
+            table = PeriodicTable.from_binary(binary)
+            return ElementList((table.element(atomic_number) for atomic_number in range(1, len(table) + 1)),
+                               table.schema_version, table.content_hash)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Error loading {binary}, falling back to JSON: {e}")
+    return _load_json(filename)
+
+
+def _load_json(filename):
+    try:
+        with open(filename, "r", encoding="utf-8") as f: # Opens file in read-only mode, f = file obj
+            data = json.load(f) # Parses JSON into a dict (or, schema version 1, a list of dicts)
+    except (FileNotFoundError, json.JSONDecodeError) as e: # Handles json load errors and decoding errors
+        print(f"Error loading elements.json: {e}")
+        return ElementList()
+    if isinstance(data, list): # Schema version 1: no embedded hash, so calculate it
+        return ElementList(data, 1, dataset_hash(data))
+    return ElementList(data["elements"], data["schema_version"], data["content_hash"])
+
+
+def _encode(values):
+    """
+    Dictionary-encodes a column of repeated strings.
+
+    Args:
+        values (list of str): The column values, e.g. every element's group.
+    Returns:
+        (distinct, codes) (tuple): The distinct values (tuple, in first-seen order)
+        and an array('B') of indices into it, one per row.
+    """
+    distinct = {}
+    codes = array('B', (distinct.setdefault(value, len(distinct)) for value in values))
+    return tuple(sys.intern(value) for value in distinct), codes
+
+
+class PeriodicTable:
+    """
+    Column-oriented, read-only table of chemical elements.
+
+    Rows are ordered by atomic number, so row i holds the element with atomic number i + 1.
+    Columns are exposed as read-only memoryviews (numeric columns) or tuples (strings).
+
+    Args:
+        elements (list of dict): Element records in the elements.json format. The schema
+            version and content hash are taken from an ElementList (see load_elements),
+            otherwise the hash is calculated (see dataset_hash).
+    Raises:
+        ValueError: If the atomic numbers are not exactly 1, 2, ..., len(elements).
+    """
+
+    __slots__ = (
+        "names", "symbols", "atomic_numbers", "atomic_masses", "atomic_mass_uncertainties", "atomic_mass_intervals",
+        "group_names", "group_codes", "source_urls", "source_ids", "schema_version", "content_hash",
+        "_rows", "_masses_by_symbol", "_atomic_numbers_by_symbol",
+    )
+
+    def __init__(self, elements):
+        self.schema_version = getattr(elements, "schema_version", None) or DATASET_SCHEMA_VERSION
+        self.content_hash = getattr(elements, "content_hash", None) or dataset_hash(elements)
+        elements = sorted(elements, key=lambda el: el['atomic_number'])
+        if [el['atomic_number'] for el in elements] != list(range(1, len(elements) + 1)):
+            raise ValueError("Atomic numbers must run from 1 to the number of elements without gaps")
+
+        self.names = tuple(sys.intern(el['name']) for el in elements)
+        self.symbols = tuple(sys.intern(el['symbol']) for el in elements)
+        self.atomic_numbers = memoryview(array('H', (el['atomic_number'] for el in elements))).toreadonly()
+        self.atomic_masses = memoryview(array('d', (el['atomic_mass'] for el in elements))).toreadonly()
+        # Records from before schema version 3 have no (or no real) uncertainties: NaN, as for
+        # elements with no standard atomic weight
+        nan = float("nan")
+        uncertainties, intervals = array('d'), array('d')
+        for el in elements:
+            uncertainty = el.get('atomic_mass_uncertainty') if self.schema_version >= 3 else None
+            uncertainties.append(nan if uncertainty is None else uncertainty)
+            intervals.extend(el.get('atomic_mass_interval') or (nan, nan))
+        self.atomic_mass_uncertainties = memoryview(uncertainties).toreadonly()
+        self.atomic_mass_intervals = memoryview(intervals).toreadonly()
+
+        group_names, group_codes = _encode([el['group'] for el in elements])
+        self.group_names = group_names
+        self.group_codes = memoryview(group_codes).toreadonly()
+
+        source_urls, source_ids = _encode([el['source'] for el in elements])
+        self.source_urls = source_urls
+        self.source_ids = memoryview(source_ids).toreadonly()
+
+        self._build_lookups()
+
+    @classmethod
+    def from_binary(cls, filename=BINARY_FILE):
+        """
+        Memory-maps a binary table written by write_binary(). The numeric columns are
+        read-only views straight into the mapped file, so nothing is parsed or copied.
+
+        Args:
+            filename (str): Path to the binary file.
+        Returns:
+            (PeriodicTable): The table.
+        Raises:
+            ValueError: If the file is not a binary table in a supported format.
+        """
+        with open(filename, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) # Stays mapped after close
+        data = memoryview(mapped)
+
+        (magic, version, count, group_count, source_count, masses_at, uncertainties_at, intervals_at, numbers_at,
+         groups_at, sources_at, strings_at, strings_length, schema_version, content_hash) = _HEADER.unpack_from(data)
+        if magic != BINARY_MAGIC or version != BINARY_FORMAT_VERSION:
+            raise ValueError(f"{filename} is not a version {BINARY_FORMAT_VERSION} periodic table file")
+
+        strings = str(data[strings_at:strings_at + strings_length], "utf-8").split("\0")
+        symbols_end = count
+        names_end = symbols_end + count
+        groups_end = names_end + group_count
+
+        table = cls.__new__(cls)
+        table.schema_version = schema_version
+        table.content_hash = content_hash.hex()
+        table.symbols = tuple(sys.intern(symbol) for symbol in strings[:symbols_end])
+        table.names = tuple(sys.intern(name) for name in strings[symbols_end:names_end])
+        table.group_names = tuple(sys.intern(group) for group in strings[names_end:groups_end])
+        table.source_urls = tuple(strings[groups_end:groups_end + source_count])
+        table.atomic_masses = data[masses_at:masses_at + 8 * count].cast('d')
+        table.atomic_mass_uncertainties = data[uncertainties_at:uncertainties_at + 8 * count].cast('d')
+        table.atomic_mass_intervals = data[intervals_at:intervals_at + 16 * count].cast('d')
+        table.atomic_numbers = data[numbers_at:numbers_at + 2 * count].cast('H')
+        table.group_codes = data[groups_at:groups_at + count]
+        table.source_ids = data[sources_at:sources_at + count]
+        table._build_lookups()
+        return table
+
+    def write_binary(self, filename=BINARY_FILE):
+        """
+        Writes the table in the compact binary format read by from_binary().
+
+        Args:
+            filename (str): Path of the file to write (replaced atomically if it exists, so a
+                process that has the old file memory-mapped keeps a valid mapping).
+        """
+        count = len(self.symbols)
+        strings = "\0".join(self.symbols + self.names + self.group_names + self.source_urls).encode("utf-8")
+
+        # Column offsets: the float64 masses directly follow the header, on an 8-byte boundary
+        masses_at = (_HEADER.size + 7) // 8 * 8
+        uncertainties_at = masses_at + 8 * count
+        intervals_at = uncertainties_at + 8 * count
+        numbers_at = intervals_at + 16 * count
+        groups_at = numbers_at + 2 * count
+        sources_at = groups_at + count
+        strings_at = sources_at + count
+
+        header = _HEADER.pack(
+            BINARY_MAGIC, BINARY_FORMAT_VERSION, count, len(self.group_names), len(self.source_urls),
+            masses_at, uncertainties_at, intervals_at, numbers_at, groups_at, sources_at, strings_at, len(strings),
+            self.schema_version, bytes.fromhex(self.content_hash),
+        )
+        temporary = f"{filename}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(header.ljust(masses_at, b"\0"))
+            f.write(struct.pack(f"<{count}d", *self.atomic_masses))
+            f.write(struct.pack(f"<{count}d", *self.atomic_mass_uncertainties))
+            f.write(struct.pack(f"<{2 * count}d", *self.atomic_mass_intervals))
+            f.write(struct.pack(f"<{count}H", *self.atomic_numbers))
+            f.write(bytes(self.group_codes))
+            f.write(bytes(self.source_ids))
+            f.write(strings)
+        os.replace(temporary, filename)
+
+    def _build_lookups(self):
+        # Lookup dicts: {symbol: row}, plus read-only views that consumers share
+        self._rows = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self._masses_by_symbol = MappingProxyType(dict(zip(self.symbols, self.atomic_masses)))
+        self._atomic_numbers_by_symbol = MappingProxyType(dict(zip(self.symbols, self.atomic_numbers)))
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._rows
+
+    def row(self, key):
+        """
+        Returns the row index of an element, looked up by symbol or atomic number.
+
+        Args:
+            key (str or int): Element symbol (e.g., 'Fe') or atomic number (e.g., 26).
+        Returns:
+            (int): Row index (atomic number - 1).
+        Raises:
+            KeyError: If there is no such element.
+        """
+        if isinstance(key, str):
+            return self._rows[key]
+        if 1 <= key <= len(self.symbols):
+            return key - 1
+        raise KeyError(key)
+
+    def symbol(self, atomic_number):
+        """Returns the symbol of the element with the given atomic number."""
+        return self.symbols[self.row(atomic_number)]
+
+    def atomic_number(self, symbol):
+        """Returns the atomic number of the element with the given symbol."""
+        return self._rows[symbol] + 1
+
+    def atomic_mass(self, key):
+        """Returns the atomic mass of an element, looked up by symbol or atomic number."""
+        return self.atomic_masses[self.row(key)]
+
+    def atomic_mass_uncertainty(self, key):
+        """
+        Returns the standard uncertainty of an element's atomic mass, looked up by symbol or
+        atomic number (None if the element has no standard atomic weight).
+        """
+        uncertainty = self.atomic_mass_uncertainties[self.row(key)]
+        return None if uncertainty != uncertainty else uncertainty # uncertainty != uncertainty: NaN
+
+    def atomic_mass_interval(self, key):
+        """
+        Returns the (lower, upper) bounds of an element's standard atomic weight, looked up by
+        symbol or atomic number (None unless the standard atomic weight is an interval).
+        """
+        row = self.row(key)
+        lower, upper = self.atomic_mass_intervals[2 * row], self.atomic_mass_intervals[2 * row + 1]
+        return None if lower != lower else (lower, upper)
+
+    def group(self, key):
+        """Returns the group classification of an element (e.g., 'Halogen')."""
+        return self.group_names[self.group_codes[self.row(key)]]
+
+    def source(self, key):
+        """Returns the atomic mass data source URL of an element."""
+        return self.source_urls[self.source_ids[self.row(key)]]
+
+    def element(self, key):
+        """
+        Returns one element as a dict in the elements.json format.
+
+        Args:
+            key (str or int): Element symbol or atomic number.
+        Returns:
+            (dict): name, symbol, atomic_number, atomic_mass, atomic_mass_uncertainty,
+                atomic_mass_interval, group and source.
+        """
+        row = self.row(key)
+        interval = self.atomic_mass_interval(key)
+        return {
+            "name": self.names[row],
+            "symbol": self.symbols[row],
+            "atomic_number": self.atomic_numbers[row],
+            "atomic_mass": self.atomic_masses[row],
+            "atomic_mass_uncertainty": self.atomic_mass_uncertainty(key),
+            "atomic_mass_interval": None if interval is None else list(interval),
+            "group": self.group_names[self.group_codes[row]],
+            "source": self.source_urls[self.source_ids[row]],
+        }
+
+    @property
+    def masses_by_symbol(self):
+        """Read-only {symbol: atomic_mass} mapping, shared by every consumer of this table."""
+        return self._masses_by_symbol
+
+    @property
+    def atomic_numbers_by_symbol(self):
+        """Read-only {symbol: atomic_number} mapping, shared by every consumer of this table."""
+        return self._atomic_numbers_by_symbol
+
+
+def _json_content_hash(filename):
+    """
+    Returns the content hash of a JSON dataset file. It is read from the start of the file
+    (where elements_json_creation.py writes it, before the elements), so the records aren't
+    parsed; files without one near the start (e.g., schema version 1) are loaded in full.
+    """
+    with open(filename, "rb") as f:
+        match = _JSON_HASH_PATTERN.search(f.read(4096))
+    if match:
+        return match.group(1).decode("ascii")
+    return _load_json(filename).content_hash
+
+
+def _binary_path(filename):
+    """
+    Returns the binary table matching a JSON dataset file, or None if it should not be used:
+    it must exist, be at least as new as the JSON file, record the same content hash, and
+    match this machine's byte order.
+    """
+    binary = os.path.splitext(filename)[0] + ".bin"
+    if sys.byteorder != "little": # Columns are mapped in place, so must be little-endian
+        return None
+    try:
+        if os.stat(binary).st_mtime < os.stat(filename).st_mtime:
+            return None # Stale: the JSON dataset was regenerated after the binary one
+        with open(binary, "rb") as f:
+            content_hash = _HEADER.unpack(f.read(_HEADER.size))[-1].hex()
+        if content_hash != _json_content_hash(filename):
+            return None # A different dataset, e.g. an older JSON file copied back with a new mtime
+    except (OSError, struct.error):
+        return None
+    return binary
+
+
+def load_periodic_table(filename=ELEMENTS_FILE):
+    """
+    Builds a new PeriodicTable (see get_periodic_table for the shared one).
+
+    Prefers the memory-mapped binary form of the dataset (e.g., 'elements.bin' next to
+    'elements.json') when present, and falls back to parsing the JSON file otherwise.
+
+    Args:
+        filename (str): Path to the JSON dataset.
+    Returns:
+        (PeriodicTable): The table.
+    """
+    binary = _binary_path(filename)
+    if binary is not None:
+        try:
+            return PeriodicTable.from_binary(binary)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Error loading {binary}, falling back to JSON: {e}")
+    return PeriodicTable(_load_json(filename))
+
+
+def get_periodic_table():
+    """
+    Returns the shared PeriodicTable, reading elements.json the first time it is called.
+
+    Returns:
+        _periodic_table (PeriodicTable): The shared, read-only table.
+    """
+    global _periodic_table
+    if _periodic_table is None:
+        _periodic_table = load_periodic_table()
+    return _periodic_table
+
+
+def load_isotopes(filename=ISOTOPES_FILE):
+    """
+    Loads natural isotopic compositions from an isotopes.json file.
+
+    Args:
+        filename (str): Path to the isotope dataset.
+    Returns:
+        (dict): {symbol: ((isotopic mass, abundance), ...)}, most abundant isotope first.
+            Elements with no stable isotopes (e.g., Tc) are not included.
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        el["symbol"]: tuple(sorted(
+            ((isotope["mass"], isotope["abundance"]) for isotope in el["isotopes"]),
+            key=lambda isotope: -isotope[1],
+        ))
+        for el in data
+    }
+
+
+def get_isotopes():
+    """Returns the shared isotope lookup dict (see load_isotopes), reading isotopes.json on first use."""
+    global _isotopes
+    if _isotopes is None:
+        _isotopes = load_isotopes()
+    return _isotopes
+
+
+def get_monoisotopic_masses():
+    """
+    Returns the shared monoisotopic (most abundant isotope) masses, built on first use.
+
+    Returns:
+        _monoisotopic_masses (memoryview): Read-only float64 masses indexed by atomic number - 1,
+            like PeriodicTable.atomic_masses; NaN for elements with no stable isotopes.
+    """
+    global _monoisotopic_masses
+    if _monoisotopic_masses is None:
+        _monoisotopic_masses = _build_monoisotopic_masses(get_periodic_table(), get_isotopes())
+    return _monoisotopic_masses
+
+
+def _build_monoisotopic_masses(table, isotopes):
+    masses = array('d', [float("nan")]) * len(table)
+    for symbol, element_isotopes in isotopes.items():
+        if symbol in table:
+            masses[table.atomic_number(symbol) - 1] = element_isotopes[0][0]
+    return memoryview(masses).toreadonly()
+
+
+def get_generation():
+    """
+    Returns the number of times the shared data has been reloaded (see reload).
+
+    Caches of data derived from the shared table (e.g., NumPy mass vectors) record the
+    generation they were built for, and rebuild once it has changed.
+    """
+    return _generation
+
+
+def reload(filename=ELEMENTS_FILE, isotopes_filename=ISOTOPES_FILE):
+    """
+    Reloads the shared PeriodicTable and isotope data, without restarting the process.
+
+    The new data is built completely before anything is replaced, then swapped in and the
+    generation incremented. Calculations already running keep the old table (or columns)
+    they hold, and finish with the old masses; new calls get the new table. If the new
+    data can't be loaded, the current data is left in place.
+
+    Args:
+        filename (str): Path to the JSON dataset (its binary form is used when up to date).
+        isotopes_filename (str): Path to the isotope dataset.
+    Returns:
+        (PeriodicTable): The new shared table.
+    Raises:
+        ValueError: If the dataset has no elements (e.g., it is missing or being rewritten).
+        OSError: If the isotope dataset can't be read.
+    """
+    global _periodic_table, _isotopes, _monoisotopic_masses, _generation
+    with _reload_lock: # One reload at a time; readers never wait
+        table = load_periodic_table(filename)
+        if not len(table):
+            raise ValueError(f"No elements loaded from {filename}; keeping the current table")
+        try:
+            isotopes = load_isotopes(isotopes_filename)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Error loading {isotopes_filename}: {e}") from None
+        monoisotopic_masses = _build_monoisotopic_masses(table, isotopes)
+
+        _periodic_table, _isotopes, _monoisotopic_masses = table, isotopes, monoisotopic_masses
+        _generation += 1
+    return table
+
+
+class DatasetWatcher(threading.Thread):
+    """
+    Background (daemon) thread that calls reload() whenever the dataset files change.
+
+    The files' modification times and sizes are polled every `interval` seconds. A dataset
+    that fails to load (e.g., caught half-written) is retried at the next check.
+
+    Args:
+        interval (float): Seconds between checks.
+        filename (str): Path to the JSON dataset (its binary form is watched too).
+        isotopes_filename (str): Path to the isotope dataset.
+        on_reload (callable, optional): Called with the new PeriodicTable after each reload.
+        on_error (callable, optional): Called with the exception when a reload fails
+            (by default the error is printed).
+
+    Example:
+        >>> watcher = DatasetWatcher(on_reload=lambda table: print("Reloaded", table.content_hash))
+        >>> watcher.start()
+        ...
+        >>> watcher.stop()
+    """
+
+    def __init__(self, interval=DEFAULT_WATCH_INTERVAL, filename=ELEMENTS_FILE, isotopes_filename=ISOTOPES_FILE,
+                 on_reload=None, on_error=None):
+        super().__init__(name="DatasetWatcher", daemon=True)
+        self.interval = interval
+        self.filename = filename
+        self.isotopes_filename = isotopes_filename
+        self.on_reload = on_reload
+        self.on_error = on_error
+        self._paths = (filename, os.path.splitext(filename)[0] + ".bin", isotopes_filename)
+        self._stopped = threading.Event()
+        # Taken now rather than when the thread starts running, so a change made just after
+        # start() isn't mistaken for the files as they were loaded
+        self._loaded = self._signature()
+
+    def _signature(self):
+        signature = []
+        for path in self._paths:
+            try:
+                status = os.stat(path)
+                signature.append((status.st_mtime_ns, status.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def run(self):
+        loaded = self._loaded
+        while not self._stopped.wait(self.interval):
+            signature = self._signature()
+            if signature == loaded:
+                continue
+            try:
+                table = reload(self.filename, self.isotopes_filename)
+            except (OSError, ValueError) as e:
+                if self.on_error is not None:
+                    self.on_error(e)
+                else:
+                    print(f"Error reloading {self.filename}: {e}")
+                continue # Retried at the next check
+            loaded = signature
+            if self.on_reload is not None:
+                self.on_reload(table)
+
+    def stop(self):
+        """Stops watching, waiting for the thread to finish."""
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
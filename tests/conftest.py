@@ -0,0 +1,9 @@
+"""
+Shared pytest setup: the modules under test live at the top of the repository, next to
+the datasets, so the repository root is put on sys.path (run with `python -m pytest`).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,53 @@
+"""Tests for the batch API (calculate_molar_masses and the composition matrix)."""
+
+from decimal import Decimal
+
+import pytest
+
+import molar_mass
+from molar_mass import (build_composition_matrix, calculate_molar_mass, calculate_molar_mass_rows,
+                        calculate_molar_masses)
+
+FORMULAS = ["H2O", "Al2(SO4)3", "C6H12O6", "H2O", "CuSO4·5H2O", "K4[Fe(CN)6]"]
+
+
+def test_matrix():
+    np = pytest.importorskip("numpy")
+    matrix = build_composition_matrix(["H2O", "NaCl"])
+    assert matrix.shape == (2, molar_mass.NUM_ELEMENTS)
+    assert matrix[0, 0] == 2 and matrix[0, 7] == 1 and matrix[1, 10] == 1 and matrix[1, 16] == 1
+    assert np.count_nonzero(matrix) == 4
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1000])
+def test_batch_matches_single(chunk_size):
+    pytest.importorskip("numpy")
+    masses = calculate_molar_masses(FORMULAS, chunk_size=chunk_size)
+    assert masses.tolist() == pytest.approx([calculate_molar_mass(formula) for formula in FORMULAS])
+
+
+def test_batch_without_numpy(monkeypatch):
+    monkeypatch.setattr(molar_mass, "_numpy", lambda: None)
+    assert calculate_molar_masses(FORMULAS) == [calculate_molar_mass(formula) for formula in FORMULAS]
+
+
+def test_batch_custom_table():
+    pytest.importorskip("numpy")
+    assert calculate_molar_masses(["H2O"], {"H": 1.0, "O": 16.0}).tolist() == [18.0]
+    with pytest.raises(ValueError, match="Unknown element: Na"):
+        calculate_molar_masses(["H2O", "NaCl"], {"H": 1.0, "O": 16.0})
+
+
+def test_custom_table_symbols_outside_periodic_table():
+    deuterium = {"D": 2.014, "O": 15.999}
+    assert calculate_molar_mass("D2O", deuterium) == pytest.approx(20.027)
+    assert calculate_molar_mass("D2O", deuterium, exact=True) == Decimal("20.027")
+    assert list(calculate_molar_masses(["D2O", "OD"], deuterium)) == pytest.approx([20.027, 18.013])
+    assert calculate_molar_mass_rows(["D2O", "H2O"], deuterium)[1][2] == "Unknown element: H"
+
+
+def test_rows_capture_errors():
+    rows = calculate_molar_mass_rows(["H2O", "Xx", "Al2(SO4"])
+    assert rows[0][0] == "H2O" and rows[0][1] == pytest.approx(18.015) and rows[0][2] is None
+    assert rows[1][1] is None and "Xx" in rows[1][2]
+    assert rows[2][1] is None and "Unbalanced" in rows[2][2]
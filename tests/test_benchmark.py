@@ -0,0 +1,20 @@
+"""Tests for the benchmark suite's baseline handling (benchmark.py)."""
+
+from benchmark import find_regressions, main, nested_formula, parse_formula_regex
+from molar_mass import parse_formula
+
+
+def test_find_regressions():
+    baseline = {"parse.short": 1000.0, "parse.long": 100.0, "removed.case": 5.0}
+    results = {"parse.short": 800.0, "parse.long": 70.0, "new.case": 1.0}
+    assert find_regressions(results, baseline, tolerance=0.25) == [("parse.long", 100.0, 70.0)]
+
+
+def test_compare_without_baseline(tmp_path, capsys):
+    assert main(["--compare", str(tmp_path / "missing.json")]) == 1
+    assert "--save-baseline" in capsys.readouterr().err
+
+
+def test_nested_formulas_parse_like_the_regex_parser():
+    for depth in (1, 4, 16):
+        assert parse_formula(nested_formula(depth)) == parse_formula_regex(nested_formula(depth))
@@ -0,0 +1,74 @@
+"""Tests for the interned Composition value type (composition.py)."""
+
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+from composition import Composition
+from molar_mass import parse_formula, parse_formula_cached
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_same_composition_is_same_object():
+    a = Composition(parse_formula("CH3COOH"))
+    b = Composition({"O": 2, "H": 4, "C": 2})
+    assert a is b
+    assert parse_formula_cached("HC2H3O2") is a
+    assert len({a, b, Composition(parse_formula("C2H4O2"))}) == 1
+
+
+def test_value_semantics():
+    water = Composition({"H": 2, "O": 1})
+    assert water.pairs == ((1, 2), (8, 1))
+    assert water == {"H": 2, "O": 1, "N": 0}
+    assert water["H"] == 2 and list(water) == ["H", "O"] and len(water) == 2
+    with pytest.raises(KeyError):
+        water["C"]
+    with pytest.raises(AttributeError):
+        water._pairs = ()
+    assert pickle.loads(pickle.dumps(water)) is water
+
+
+def test_arithmetic():
+    copper_sulfate = Composition({"Cu": 1, "S": 1, "O": 4})
+    water = Composition({"H": 2, "O": 1})
+    assert copper_sulfate + 5 * water is parse_formula_cached("CuSO4·5H2O")
+    assert water * 1 is water and (water * 0).pairs == ()
+    assert water.atom_count() == 3
+
+
+def test_unknown_element():
+    with pytest.raises(ValueError, match="Unknown element: Xx"):
+        Composition({"Xx": 1})
+
+
+@pytest.mark.parametrize("formula, hill", [
+    ("CH3COOH", "C2H4O2"),
+    ("C6H12O6", "C6H12O6"),
+    ("CHCl3", "CHCl3"),
+    ("H2SO4", "H2O4S"),
+    ("NaCl", "ClNa"),
+    ("CCl4", "CCl4"),
+])
+def test_hill_formula(formula, hill):
+    assert parse_formula_cached(formula).hill_formula() == hill
+
+
+def test_canonical_hash_is_stable_across_processes():
+    formulas = ["CH3COOH", "C2H4O2", "HC2H3O2", "H2O", "CuSO4·5H2O"]
+    hashes = [parse_formula_cached(formula).canonical_hash() for formula in formulas]
+    assert hashes[0] == hashes[1] == hashes[2]
+    assert len(set(hashes[2:])) == 3
+    assert all(0 <= value < 2 ** 64 for value in hashes)
+
+    # hash() differs between processes (PYTHONHASHSEED); the canonical hash must not
+    script = (f"from molar_mass import parse_formula_cached; "
+              f"print([parse_formula_cached(f).canonical_hash() for f in {formulas!r}])")
+    for seed in ("1", "2"):
+        output = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, env={**os.environ, "PYTHONHASHSEED": seed},
+                                capture_output=True, text=True, check=True).stdout
+        assert output.strip() == str(hashes)
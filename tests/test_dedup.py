@@ -0,0 +1,33 @@
+"""Tests for streaming, memory-bounded formula deduplication (dedup.py)."""
+
+import pytest
+
+from dedup import dedup_formulas
+
+FORMULAS = ["CH3COOH", "H2O", "C2H4O2", "Xx", "OH2", "HC2H3O2", "NaCl", "H2O"]
+
+
+def summary(groups):
+    return sorted((group.hill_formula, group.count, group.first_formula) for group in groups)
+
+
+def test_groups_by_composition():
+    errors = []
+    groups = list(dedup_formulas(FORMULAS, on_error=lambda formula, error: errors.append(formula)))
+    assert [group.hill_formula for group in groups] == ["C2H4O2", "H2O", "ClNa"] # First-seen order
+    assert summary(groups) == [("C2H4O2", 3, "CH3COOH"), ("ClNa", 1, "NaCl"), ("H2O", 3, "H2O")]
+    assert errors == ["Xx"]
+
+
+@pytest.mark.parametrize("max_groups, partitions", [(1, 1), (1, 3), (2, 64)])
+def test_spilling_gives_the_same_groups(tmp_path, max_groups, partitions):
+    expected = summary(dedup_formulas(FORMULAS))
+    assert summary(dedup_formulas(FORMULAS, max_groups, partitions, tmpdir=str(tmp_path))) == expected
+    assert not list(tmp_path.iterdir()) # Partition files are removed
+
+
+def test_spilled_formulas_round_trip(tmp_path):
+    # Formulas from quoted CSV fields can hold tabs, newlines, commas and quotes
+    formulas = ["H2O", "Na\tCl", "Na\nCl", '"NaCl", ', "C2H4O2", "NaCl"]
+    groups = summary(dedup_formulas(formulas, max_groups=1, partitions=2, tmpdir=str(tmp_path)))
+    assert groups == [("C2H4O2", 1, "C2H4O2"), ("ClNa", 4, "Na\tCl"), ("H2O", 1, "H2O")]
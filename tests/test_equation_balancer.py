@@ -0,0 +1,68 @@
+"""Tests for the equation balancer (equation_balancer.py)."""
+
+import pytest
+
+from equation_balancer import balance, balance_rows, integer_nullspace, parse_equation
+
+
+@pytest.mark.parametrize("equation, expected", [
+    ("Fe + O2 -> Fe2O3", "4Fe + 3O2 -> 2Fe2O3"),
+    ("C3H8 + O2 → CO2 + H2O", "C3H8 + 5O2 -> 3CO2 + 4H2O"),
+    ("2H2 + 7O2 = H2O", "2H2 + O2 -> 2H2O"), # Existing coefficients are recalculated
+    ("CuSO4·5H2O -> CuSO4 + H2O", "CuSO4·5H2O -> CuSO4 + 5H2O"),
+    ("NaCl(aq) + AgNO3(aq) -> AgCl(s) + NaNO3(aq)", "NaCl(aq) + AgNO3(aq) -> AgCl(s) + NaNO3(aq)"),
+])
+def test_balance(equation, expected):
+    assert str(balance(equation)) == expected
+
+
+@pytest.mark.parametrize("equation, expected", [
+    # Permanganate oxidising iron(II) in acid
+    ("MnO4^- + Fe^2+ + H^+ -> Mn^2+ + Fe^3+ + H2O", "MnO4^- + 5Fe^2+ + 8H^+ -> Mn^2+ + 5Fe^3+ + 4H2O"),
+    ("MnO₄⁻ + Fe²⁺ + H⁺ -> Mn²⁺ + Fe³⁺ + H₂O", "MnO₄⁻ + 5Fe²⁺ + 8H⁺ -> Mn²⁺ + 5Fe³⁺ + 4H₂O"),
+    # Dichromate oxidising iodide, and a half-equation with electrons
+    ("Cr2O7^2- + I^- + H^+ -> Cr^3+ + I2 + H2O", "Cr2O7^2- + 6I^- + 14H^+ -> 2Cr^3+ + 3I2 + 7H2O"),
+    ("Fe^3+ + e- -> Fe^2+", "Fe^3+ + e- -> Fe^2+"),
+    ("Cu + Ag⁺ -> Cu²⁺ + Ag", "Cu + 2Ag⁺ -> Cu²⁺ + 2Ag"),
+])
+def test_balance_redox(equation, expected):
+    balanced = balance(equation)
+    assert str(balanced) == expected
+    assert min(balanced.coefficients) >= 1
+
+
+@pytest.mark.parametrize("equation", [
+    "H2 -> O2",                   # No shared elements
+    "Fe^2+ -> Fe^3+",             # Charge can't balance without electrons
+    "NaCl -> Na + Cl2 + O2",      # O only on one side
+])
+def test_no_solution(equation):
+    with pytest.raises(ValueError, match="can't be balanced"):
+        balance(equation)
+
+
+def test_more_than_one_solution():
+    with pytest.raises(ValueError, match="independent ways"):
+        balance("H2 + O2 + C -> H2O + CO2")
+
+
+@pytest.mark.parametrize("equation", ["Fe + O2", "-> H2O", "Xx -> Xx", "Fe^+- -> Fe"])
+def test_invalid_equations(equation):
+    with pytest.raises(ValueError):
+        balance(equation)
+
+
+def test_parse_equation():
+    assert parse_equation("2Fe^3+ + Cu -> 2Fe^2+ + Cu^2+") == (["Fe^3+", "Cu"], ["Fe^2+", "Cu^2+"])
+
+
+def test_integer_nullspace():
+    assert integer_nullspace([[1, -2]], 2) == [[2, 1]]
+    assert integer_nullspace([[1, 0], [0, 1]], 2) == []
+
+
+def test_balance_rows():
+    assert balance_rows(["H2 + O2 -> H2O", "H2 -> O2"]) == [
+        ("H2 + O2 -> H2O", "2H2 + O2 -> 2H2O", None),
+        ("H2 -> O2", None, "Equation can't be balanced: 'H2 -> O2'"),
+    ]
@@ -0,0 +1,51 @@
+"""Tests for exact decimal masses (exact=True)."""
+
+from decimal import Decimal
+
+import pytest
+
+import molar_mass
+from molar_mass import calculate_molar_mass, calculate_molar_mass_rows, calculate_molar_masses
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("H2O", "18.015"),
+    ("NaCl", "58.4397693"),
+    ("Al2(SO4)3", "342.146076"),
+    ("C6H12O6", "180.156"),
+])
+def test_exact_mass(formula, expected):
+    mass = calculate_molar_mass(formula, exact=True)
+    assert isinstance(mass, Decimal)
+    assert mass == Decimal(expected)
+
+
+def test_no_floating_point_noise():
+    # 0.1-style float rounding shows up in long float sums, never in exact ones
+    formula = "H" * 1000
+    assert calculate_molar_mass(formula, exact=True) == Decimal("1008")
+    assert calculate_molar_mass("CH3COOH", exact=True) == calculate_molar_mass("C2H4O2", exact=True)
+
+
+def test_no_trailing_zeros():
+    assert str(calculate_molar_mass("C", exact=True)) == "12.011"
+    assert str(calculate_molar_mass("C100", exact=True)) == "1201.1"
+
+
+def test_custom_element_masses():
+    assert calculate_molar_mass("HO2", {"H": 1.5, "O": Decimal("0.25")}, exact=True) == Decimal("2")
+    with pytest.raises(ValueError, match="Unknown element"):
+        calculate_molar_mass("HC", {"H": 1.5}, exact=True)
+
+
+def test_batch_matches_single():
+    formulas = ["H2O", "CuSO4·5H2O", "C6H12O6"]
+    assert calculate_molar_masses(formulas, exact=True) == [calculate_molar_mass(f, exact=True) for f in formulas]
+    rows = calculate_molar_mass_rows(["H2O", "Xx"], exact=True)
+    assert rows[0] == ("H2O", Decimal("18.015"), None)
+    assert rows[1][1] is None and "Xx" in rows[1][2]
+
+
+def test_exact_without_numpy(monkeypatch):
+    monkeypatch.setattr(molar_mass, "_numpy", lambda: None)
+    assert calculate_molar_masses(["H2O", "NaCl"], exact=True) == [Decimal("18.015"), Decimal("58.4397693")]
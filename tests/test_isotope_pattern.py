@@ -0,0 +1,52 @@
+"""Tests for the isotope data (isotopes.json) and the isotope pattern generator."""
+
+import pytest
+
+import molar_mass
+from isotope_pattern import isotope_pattern
+from periodic_table import get_isotopes, get_periodic_table
+
+# Elements with a natural isotopic composition: every element up to bismuth except
+# technetium and promethium (which have no stable isotopes), plus thorium, protactinium and uranium
+NATURAL_ATOMIC_NUMBERS = [number for number in range(1, 84) if number not in (43, 61)] + [90, 91, 92]
+NATURAL_ELEMENTS = [get_periodic_table().symbol(number) for number in NATURAL_ATOMIC_NUMBERS]
+
+
+def test_every_natural_element_has_isotopes():
+    isotopes = get_isotopes()
+    assert [symbol for symbol in NATURAL_ELEMENTS if symbol not in isotopes] == []
+    assert set(isotopes) == set(NATURAL_ELEMENTS) # And no synthetic element has any
+
+
+@pytest.mark.parametrize("symbol", NATURAL_ELEMENTS)
+def test_isotopic_composition(symbol):
+    peaks = get_isotopes()[symbol]
+    assert sum(abundance for _, abundance in peaks) == pytest.approx(1, abs=1e-4)
+    # The abundance-weighted mean of the isotope masses is the atomic weight (to within the
+    # spread of natural compositions: Li, Se and Mo differ by about 1e-4 from the representative one)
+    mean = sum(mass * abundance for mass, abundance in peaks)
+    assert mean == pytest.approx(get_periodic_table().atomic_mass(symbol), rel=2e-4)
+
+
+def test_glucose_pattern():
+    peaks = isotope_pattern("C6H12O6", resolution=1)
+    base = max(peaks, key=lambda peak: peak.intensity)
+    assert base.mass == pytest.approx(180.0634, abs=1e-3) and base.intensity == 100
+    assert peaks[1].intensity == pytest.approx(6.9, abs=0.2) # M+1, mostly 13C
+    assert sum(peak.abundance for peak in peaks) == pytest.approx(1, abs=1e-3)
+
+
+@pytest.mark.parametrize("formula", ["OsO4", "XeF2", "CeO2", "C60"])
+def test_numpy_and_python_agree(monkeypatch, formula):
+    pytest.importorskip("numpy")
+    expected = isotope_pattern(formula)
+    monkeypatch.setattr("isotope_pattern._numpy", lambda: None)
+    peaks = isotope_pattern(formula)
+    assert [peak.mass for peak in peaks] == pytest.approx([peak.mass for peak in expected])
+    assert [peak.intensity for peak in peaks] == pytest.approx([peak.intensity for peak in expected], abs=1e-6)
+
+
+def test_no_isotopes_for_synthetic_elements():
+    with pytest.raises(ValueError, match="Tc"):
+        isotope_pattern("TcO4")
+    assert molar_mass.calculate_molar_mass("TcO4") > 0 # Average mass is still known
@@ -0,0 +1,94 @@
+"""Tests for the persistent SQLite result cache (mass_cache.py)."""
+
+from array import array
+from decimal import Decimal
+
+import pytest
+
+import mass_cache
+import molar_mass
+from mass_cache import MassCache, cached_molar_mass_rows, dataset_version
+from molar_mass import _mass_column, calculate_molar_mass, calculate_molar_mass_rows
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with MassCache(str(tmp_path / "masses.sqlite")) as cache:
+        yield cache
+
+
+@pytest.fixture
+def calculations(monkeypatch):
+    """Records the formulas actually calculated (cache misses)."""
+    calculated = []
+
+    def counting_rows(formulas, *args, **kwargs):
+        calculated.extend(composition.hill_formula() for composition in formulas)
+        return calculate_molar_mass_rows(formulas, *args, **kwargs)
+
+    monkeypatch.setattr(mass_cache, "calculate_molar_mass_rows", counting_rows)
+    return calculated
+
+
+def test_dataset_version():
+    assert dataset_version() == dataset_version("average")
+    assert dataset_version().startswith("average:")
+    assert dataset_version("average", exact=True).startswith("average-exact:")
+    assert dataset_version("monoisotopic") != dataset_version("average")
+
+
+def test_hits_skip_calculation(cache, calculations):
+    rows = cache.molar_mass_rows(["H2O", "CH3COOH", "Xx", "C2H4O2"])
+    assert rows[0] == ("H2O", calculate_molar_mass("H2O"), None)
+    assert rows[2][0] == "Xx" and rows[2][1] is None and rows[2][2]
+    assert rows[1][1] == rows[3][1] # Same composition, so one entry
+    assert calculations == ["H2O", "C2H4O2"]
+
+    calculations.clear()
+    assert cache.molar_mass_rows(["OH2", "HC2H3O2"]) == [("OH2", rows[0][1], None), ("HC2H3O2", rows[1][1], None)]
+    assert calculations == [] # Both were cache hits
+
+
+def test_modes_are_cached_separately(cache, calculations):
+    cache.molar_mass_rows(["H2O"])
+    cache.molar_mass_rows(["H2O"], mode="monoisotopic")
+    assert cache.molar_mass_rows(["H2O"], exact=True) == [("H2O", Decimal("18.015"), None)]
+    assert calculations == ["H2O", "H2O", "H2O"]
+    assert cache.get_many(["H2O"], exact=True) == {"H2O": Decimal("18.015")}
+    assert len(cache.stats()) == 3
+
+
+def test_changed_dataset_invalidates(cache, calculations, monkeypatch):
+    cache.molar_mass_rows(["H2O"])
+    old_version = dataset_version()
+
+    # A new elements.json with a different hydrogen mass
+    masses = array('d', _mass_column("average"))
+    masses[0] = 1.00794
+    monkeypatch.setattr(molar_mass, "_mass_column", lambda mode: masses if mode == "average" else _mass_column(mode))
+    assert dataset_version() != old_version
+
+    calculations.clear()
+    cache.molar_mass_rows(["H2O"])
+    assert calculations == ["H2O"] # The old result isn't reused
+    assert cache.stats() == {old_version: 1, dataset_version(): 1}
+
+    assert cache.prune() == 1
+    assert cache.stats() == {dataset_version(): 1}
+
+
+def test_results_persist_across_connections(tmp_path, calculations):
+    filename = str(tmp_path / "masses.sqlite")
+    with MassCache(filename) as cache:
+        cache.molar_mass_rows(["NaCl"])
+    mass_cache._caches.pop(filename, None)
+    try:
+        assert cached_molar_mass_rows(["NaCl"], filename) == [("NaCl", calculate_molar_mass("NaCl"), None)]
+    finally:
+        mass_cache._caches.pop(filename).close()
+    assert calculations == ["ClNa"]
+
+
+def test_unknown_mode(cache):
+    with pytest.raises(ValueError):
+        cache.molar_mass_rows(["H2O"], mode="nominal")
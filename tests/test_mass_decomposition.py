@@ -0,0 +1,73 @@
+"""Tests for the inverse mass search (mass_decomposition.py)."""
+
+from itertools import product
+
+import pytest
+
+from mass_decomposition import decompose_mass
+from molar_mass import calculate_molar_mass
+from molar_mass_cli import main as cli_main
+
+VALENCES = {"C": 4, "H": 1, "N": 3, "O": 2, "S": 2}
+
+
+def brute_force(target, tolerance, max_counts, mode, min_rdbe=None, max_rdbe=None):
+    """Every composition within the count limits, checked one by one."""
+    symbols = list(max_counts)
+    found = set()
+    for counts in product(*(range(max_counts[symbol] + 1) for symbol in symbols)):
+        formula = "".join(f"{symbol}{count}" for symbol, count in zip(symbols, counts) if count)
+        if not formula:
+            continue
+        if abs(calculate_molar_mass(formula, mode=mode) - target) > tolerance:
+            continue
+        rdbe = 1 + sum(count * (VALENCES[symbol] - 2) for symbol, count in zip(symbols, counts)) / 2
+        if (min_rdbe is not None and rdbe < min_rdbe) or (max_rdbe is not None and rdbe > max_rdbe):
+            continue
+        found.add(tuple(zip(symbols, counts)))
+    return found
+
+
+def as_counts(candidates, symbols):
+    return {tuple((symbol, candidate.composition.get(symbol, 0)) for symbol in symbols) for candidate in candidates}
+
+
+@pytest.mark.parametrize("target, tolerance, mode", [
+    (180.0634, 0.02, "monoisotopic"),
+    (180.156, 0.05, "average"),
+    (122.0368, 0.01, "monoisotopic"),
+])
+def test_matches_brute_force(target, tolerance, mode):
+    limits = {"C": 15, "H": 30, "N": 6, "O": 8}
+    candidates = decompose_mass(target, tolerance, list(limits), max_counts=limits, min_rdbe=None, max_rdbe=None,
+                                element_ratios=None, mode=mode)
+    assert as_counts(candidates, limits) == brute_force(target, tolerance, limits, mode)
+    errors = [abs(candidate.error) for candidate in candidates]
+    assert errors == sorted(errors) # Closest match first
+
+
+def test_rdbe_filter_matches_brute_force():
+    limits = {"C": 12, "H": 24, "N": 4, "O": 6, "S": 2}
+    candidates = decompose_mass(200.05, 0.02, list(limits), max_counts=limits, min_rdbe=0, max_rdbe=8,
+                                element_ratios=None, mode="monoisotopic")
+    assert as_counts(candidates, limits) == brute_force(200.05, 0.02, limits, "monoisotopic", 0, 8)
+    assert all(0 <= candidate.rdbe <= 8 for candidate in candidates)
+
+
+def test_glucose():
+    candidates = decompose_mass(180.0634, ppm=5, mode="monoisotopic")
+    assert candidates[0].formula == "C6H12O6"
+
+
+def test_custom_masses_outside_periodic_table():
+    element_masses = {"C": 12.0, "D": 2.014, "O": 15.995}
+    candidates = decompose_mass(20.023, tolerance=0.01, elements=["D", "O"], element_masses=element_masses)
+    assert [(c.formula, c.composition) for c in candidates] == [("D2O", {"D": 2, "O": 1})]
+    candidates = decompose_mass(28.028, tolerance=0.001, elements=["C", "D"], element_masses=element_masses)
+    assert candidates[0].formula == "C2D2"
+
+
+def test_cli_subcommand(capsys):
+    assert cli_main(["decompose", "180.0634", "--mode", "monoisotopic", "--ppm", "5", "--limit", "1"]) == 0
+    assert capsys.readouterr().out.splitlines()[1].startswith("C6H12O6,")
+    assert cli_main(["decompose", "180", "--elements", "C", "Xx"]) == 1
@@ -0,0 +1,72 @@
+"""Tests for the memory-mapped mass index (mass_index.py)."""
+
+import json
+
+import pytest
+
+from mass_index import MassIndex, build_mass_index
+from molar_mass import calculate_molar_mass, parse_formula_cached
+from periodic_table import ELEMENTS_FILE, ISOTOPES_FILE, reload
+
+CATALOGUE = ["C6H12O6", "H2O", "CH3COOH", "C2H4O2", "Xx", "NaCl", "C8H10N4O2", "Al2(SO4)3", "OH2", "CuSO4·5H2O"]
+
+
+@pytest.fixture
+def index_file(tmp_path):
+    path = str(tmp_path / "catalogue.midx")
+    errors = []
+    count = build_mass_index(CATALOGUE, path, on_error=lambda formula, error: errors.append(formula), chunk_size=3)
+    assert count == 7 and errors == ["Xx"] # Duplicate compositions are stored once
+    return path
+
+
+def test_round_trip(index_file):
+    with MassIndex(index_file) as index:
+        assert len(index) == 7 and index.mode == "average" and not index.is_stale()
+        masses = list(index.masses)
+        assert masses == sorted(masses)
+        entries = [index.entry(i) for i in range(len(index))]
+    expected = {parse_formula_cached(formula).hill_formula(): calculate_molar_mass(formula)
+                for formula in CATALOGUE if formula != "Xx"}
+    assert {entry.formula: entry.mass for entry in entries} == pytest.approx(expected, abs=1e-9)
+
+
+def test_range_and_nearest(index_file):
+    with MassIndex(index_file) as index:
+        assert [entry.formula for entry in index.range(50, 190)] == ["ClNa", "C2H4O2", "C6H12O6"]
+        assert index.range(1000, 2000) == [] and index.range(200, 50) == []
+        assert [entry.formula for entry in index.nearest(59, k=2)] == ["ClNa", "C2H4O2"]
+        assert len(index.nearest(0, k=100)) == 7
+
+
+def test_monoisotopic_index(tmp_path):
+    path = str(tmp_path / "mono.midx")
+    build_mass_index(["C6H12O6", "OsO4"], path, mode="monoisotopic")
+    with MassIndex(path) as index:
+        assert index.mode == "monoisotopic"
+        assert index.nearest(180.06, k=1)[0].mass == pytest.approx(180.0633881, abs=1e-6)
+
+
+def test_stale_after_isotopes_change(tmp_path, index_file):
+    path = str(tmp_path / "mono.midx")
+    build_mass_index(["C6H12O6"], path, mode="monoisotopic")
+    with open(ISOTOPES_FILE, "r", encoding="utf-8") as f:
+        isotopes = json.load(f)
+    isotopes[0]["isotopes"][0]["mass"] = 1.0 # Only the monoisotopic masses change
+    changed = tmp_path / "isotopes.json"
+    changed.write_text(json.dumps(isotopes), encoding="utf-8")
+    try:
+        reload(ELEMENTS_FILE, str(changed))
+        with MassIndex(path) as index:
+            assert index.is_stale()
+        with MassIndex(index_file) as index:
+            assert not index.is_stale() # Average masses are unchanged
+    finally:
+        reload()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not-an-index"
+    path.write_bytes(b"PTBL" + b"\0" * 200)
+    with pytest.raises(ValueError):
+        MassIndex(str(path))
@@ -0,0 +1,64 @@
+"""Tests for the streaming command-line tool (molar_mass_cli.py)."""
+
+import csv
+import io
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import parallel_batch
+from molar_mass_cli import main, read_formulas
+
+
+@pytest.fixture
+def formulas_file(tmp_path):
+    path = tmp_path / "formulas.txt"
+    path.write_text("H2O\n\nNaCl\nXx\nAl2(SO4)3\n", encoding="utf-8")
+    return str(path)
+
+
+def run_cli(tmp_path, *args):
+    output = tmp_path / "out"
+    assert main([*args, "--output", str(output)]) == 0
+    return output.read_text(encoding="utf-8")
+
+
+def test_csv_output(tmp_path, formulas_file):
+    rows = list(csv.reader(io.StringIO(run_cli(tmp_path, formulas_file, "--chunk-size", "2"))))
+    assert rows[0] == ["formula", "molar_mass", "error"]
+    assert [row[0] for row in rows[1:]] == ["H2O", "NaCl", "Xx", "Al2(SO4)3"] # Blank lines skipped
+    assert float(rows[1][1]) == pytest.approx(18.015)
+    assert rows[3][1] == "" and "Xx" in rows[3][2]
+
+
+def test_jsonl_output(tmp_path, formulas_file):
+    records = [json.loads(line) for line in run_cli(tmp_path, formulas_file, "--format", "jsonl",
+                                                    "--precision", "2").splitlines()]
+    assert records[0] == {"formula": "H2O", "molar_mass": 18.02, "error": None}
+    assert records[2]["molar_mass"] is None and records[2]["error"]
+
+
+def test_read_csv_column():
+    stream = io.StringIO('id,formula\n1,H2O\n2,"CuSO4·5H2O"\n3,\n')
+    assert list(read_formulas(stream, "formula")) == ["H2O", "CuSO4·5H2O"]
+    assert list(read_formulas(io.StringIO("H2O,1\nNaCl,2\n"), "0")) == ["H2O", "NaCl"]
+    with pytest.raises(ValueError, match="not found"):
+        list(read_formulas(io.StringIO("id,smiles\n"), "formula"))
+
+
+def test_parallel_output_matches_serial(tmp_path):
+    path = tmp_path / "many.txt"
+    path.write_text("".join(f"C{i % 40 + 1}H{i % 70 + 2}O{i % 9}\nXx{i}\n" for i in range(500)), encoding="utf-8")
+    serial = run_cli(tmp_path, str(path))
+    assert run_cli(tmp_path, str(path), "--jobs", "2", "--chunk-size", "64") == serial
+
+
+def test_worker_dataset_mismatch(tmp_path, formulas_file, monkeypatch, capsys):
+    # The parent sees a different table hash than the workers load, so they fail on startup
+    parent, get_table = os.getpid(), parallel_batch.get_periodic_table
+    monkeypatch.setattr(parallel_batch, "get_periodic_table",
+                        lambda: SimpleNamespace(content_hash="0" * 32) if os.getpid() == parent else get_table())
+    assert main([formulas_file, "--jobs", "2", "--output", str(tmp_path / "out")]) == 1
+    assert "Error: worker process failed" in capsys.readouterr().err
@@ -0,0 +1,202 @@
+"""Tests for the asyncio HTTP service (molar_mass_service.py)."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import molar_mass_service
+import periodic_table
+from molar_mass import calculate_molar_mass, get_periodic_table
+from molar_mass_service import INLINE_BATCH_SIZE, HttpError, MolarMassService, _read_request, composition_json_lines
+
+BATCH = [f"C{i % 50 + 1}H{i % 30 + 2}O{i % 7 + 1}" for i in range(INLINE_BATCH_SIZE + 44)]
+
+
+def test_reload_during_streaming_batch():
+    async def scenario():
+        service = MolarMassService(workers=1, chunk_size=10)
+        try:
+            first = service._iter_chunks(composition_json_lines, BATCH)
+            received = [await first.__anext__()] # The first batch is now streaming from the pool
+            old_pool = service._pool
+
+            periodic_table.reload() # A new generation: later batches get a new pool
+            second = [data async for data in service._iter_chunks(composition_json_lines, BATCH)]
+            assert service._pool is not old_pool
+
+            # The first batch still finishes on its own pool, which is only shut down afterwards
+            received += [data async for data in first]
+            assert b"".join(received) == b"".join(second) == composition_json_lines(BATCH)
+            assert list(service._pool_users) == [service._pool]
+        finally:
+            service.close()
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_stream_releases_its_pool():
+    async def scenario():
+        service = MolarMassService(workers=1, chunk_size=10)
+        try:
+            chunks = service._iter_chunks(composition_json_lines, BATCH)
+            await chunks.__anext__()
+            old_pool = service._pool
+            periodic_table.reload()
+            assert service._acquire_executor() is not old_pool
+            assert old_pool in service._pool_users # Still streaming
+
+            await chunks.aclose() # The client went away
+            assert old_pool not in service._pool_users
+            service._release_executor(service._pool)
+        finally:
+            service.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("length", ["-1", "12abc", "0x10"])
+def test_invalid_content_length(length):
+    async def scenario():
+        reader = asyncio.StreamReader()
+        reader.feed_data(f"POST /batch/mass HTTP/1.1\r\nContent-Length: {length}\r\n\r\nH2O".encode("latin-1"))
+        reader.feed_eof()
+        with pytest.raises(HttpError) as error:
+            await _read_request(reader)
+        assert error.value.status == 400 and str(error.value) == "Invalid Content-Length"
+
+    asyncio.run(scenario())
+
+
+async def _request(reader, writer, method, target, body=b"", headers=""):
+    """Sends one request and returns (status, headers, body), reading a chunked body to the end."""
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n{headers}\r\n"
+                 .encode("latin-1") + body)
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+    status_line, *lines = head.rstrip("\r\n").split("\r\n")
+    status = int(status_line.split()[1])
+    response_headers = {name.lower(): value.strip() for name, _, value in (line.partition(":") for line in lines)}
+    if "content-length" in response_headers:
+        return status, response_headers, await reader.readexactly(int(response_headers["content-length"]))
+    data = b""
+    while True:
+        size = int(await reader.readuntil(b"\r\n"), 16)
+        data += (await reader.readexactly(size + 2))[:-2]
+        if not size:
+            return status, response_headers, data
+
+
+def run_with_server(client):
+    """Runs client(reader, writer) against a service listening on a free local port."""
+    async def scenario():
+        service = MolarMassService(workers=1, chunk_size=100)
+        started = asyncio.get_running_loop().create_future()
+        server = asyncio.create_task(service.serve("127.0.0.1", 0, started.set_result))
+        try:
+            port = (await started).sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            try:
+                return await client(reader, writer)
+            finally:
+                writer.close()
+        finally:
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+            service.close()
+
+    return asyncio.run(scenario())
+
+
+def test_endpoints():
+    async def client(reader, writer):
+        status, _, body = await _request(reader, writer, "GET", "/health")
+        assert status == 200
+        health = json.loads(body)
+        assert health["status"] == "ok" and health["content_hash"] == get_periodic_table().content_hash
+
+        status, _, body = await _request(reader, writer, "GET", "/mass?formula=CuSO4.5H2O")
+        assert status == 200
+        assert json.loads(body) == {"formula": "CuSO4.5H2O", "molar_mass": calculate_molar_mass("CuSO4.5H2O"),
+                                    "error": None}
+
+        status, _, body = await _request(reader, writer, "GET", "/mass?formula=H2O&exact=1")
+        assert json.loads(body)["molar_mass"] == "18.015"
+
+        status, _, body = await _request(reader, writer, "GET", "/composition?formula=CH3COOH")
+        assert status == 200
+        assert json.loads(body) == {"formula": "CH3COOH", "hill_formula": "C2H4O2",
+                                    "composition": {"C": 2, "H": 4, "O": 2}, "error": None}
+
+        # Plain text batch (one formula per line) through the worker pool, options in the query string
+        text = "\n".join(BATCH + ["Xx"]).encode("utf-8")
+        status, headers, body = await _request(reader, writer, "POST", "/batch/mass?mode=monoisotopic", text)
+        assert status == 200 and headers["transfer-encoding"] == "chunked"
+        lines = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+        assert [line["formula"] for line in lines] == BATCH + ["Xx"]
+        assert lines[0]["molar_mass"] == pytest.approx(calculate_molar_mass(BATCH[0], mode="monoisotopic"))
+        assert lines[-1]["molar_mass"] is None and lines[-1]["error"]
+
+        # JSON batch, inline
+        payload = json.dumps({"formulas": ["H2O", "(CH3"]}).encode("utf-8")
+        status, _, body = await _request(reader, writer, "POST", "/batch/composition", payload,
+                                         "Content-Type: application/json\r\n")
+        first, second = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+        assert first["hill_formula"] == "H2O" and first["composition"] == {"H": 2, "O": 1}
+        assert second["composition"] is None and second["error"]
+
+    run_with_server(client)
+
+
+@pytest.mark.parametrize("method, target, body, expected", [
+    ("GET", "/mass?formula=Xx", b"", 400),
+    ("GET", "/mass", b"", 400),
+    ("GET", "/mass?formula=H2O&mode=nominal", b"", 400),
+    ("GET", "/missing", b"", 404),
+    ("GET", "/batch/mass", b"", 405),
+])
+def test_error_responses(method, target, body, expected):
+    async def client(reader, writer):
+        status, _, body_ = await _request(reader, writer, method, target, body)
+        assert status == expected and json.loads(body_)["error"]
+        # The connection is still usable afterwards
+        status, _, _ = await _request(reader, writer, "GET", "/health")
+        assert status == 200
+
+    run_with_server(client)
+
+
+def test_pipelined_requests():
+    async def client(reader, writer):
+        writer.write(b"".join(f"GET /mass?formula={formula} HTTP/1.1\r\n\r\n".encode("latin-1")
+                              for formula in ("H2O", "NaCl", "CO2")))
+        await writer.drain()
+        formulas = []
+        for _ in range(3):
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+            length = next(int(line.split(":")[1]) for line in head.split("\r\n") if line.startswith("Content-Length"))
+            formulas.append(json.loads(await reader.readexactly(length))["formula"])
+        assert formulas == ["H2O", "NaCl", "CO2"] # Responses in request order
+
+    run_with_server(client)
+
+
+def test_worker_failure_mid_stream(monkeypatch, capsys):
+    # Workers check the parent's table hash on startup (see parallel_batch._init_worker): a
+    # mismatch breaks the pool after the 200 head has been sent
+    monkeypatch.setattr(molar_mass_service, "get_periodic_table", lambda: SimpleNamespace(content_hash="0" * 32))
+
+    async def client(reader, writer):
+        text = "\n".join(BATCH).encode("utf-8")
+        status, _, body = await _request(reader, writer, "POST", "/batch/mass", text)
+        assert status == 200
+        assert "BrokenProcessPool" in json.loads(body.decode("utf-8").splitlines()[-1])["error"]
+
+        # The body was terminated, so the connection is still usable, and the next batch gets a new pool
+        monkeypatch.undo()
+        status, _, body = await _request(reader, writer, "POST", "/batch/mass", text)
+        assert status == 200 and len(body.decode("utf-8").splitlines()) == len(BATCH)
+
+    run_with_server(client)
+    assert "BrokenProcessPool" in capsys.readouterr().err
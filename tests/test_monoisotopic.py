@@ -0,0 +1,45 @@
+"""Tests for the monoisotopic (exact) mass mode."""
+
+import pytest
+
+from molar_mass import calculate_molar_mass, calculate_molar_mass_rows, calculate_molar_masses
+from molar_mass_cli import main
+from periodic_table import get_isotopes, get_periodic_table
+
+# Every element up to bismuth except technetium and promethium, plus thorium, protactinium and uranium
+NATURAL_ATOMIC_NUMBERS = [number for number in range(1, 84) if number not in (43, 61)] + [90, 91, 92]
+NATURAL_ELEMENTS = [get_periodic_table().symbol(number) for number in NATURAL_ATOMIC_NUMBERS]
+
+
+@pytest.mark.parametrize("symbol", NATURAL_ELEMENTS)
+def test_every_natural_element(symbol):
+    most_abundant = max(get_isotopes()[symbol], key=lambda isotope: isotope[1])[0]
+    assert calculate_molar_mass(f"{symbol}2", mode="monoisotopic") == pytest.approx(2 * most_abundant)
+
+
+def test_known_masses():
+    assert calculate_molar_mass("C6H12O6", mode="monoisotopic") == pytest.approx(180.06339, abs=1e-5)
+    assert calculate_molar_mass("OsO4", mode="monoisotopic") == pytest.approx(255.94114, abs=1e-5)
+    assert str(calculate_molar_mass("H2O", mode="monoisotopic", exact=True)) == "18.01056468403"
+
+
+def test_batch():
+    formulas = ["XeF2", "OsO4", "CeO2", "H2O"]
+    masses = calculate_molar_masses(formulas, mode="monoisotopic")
+    assert list(masses) == pytest.approx([calculate_molar_mass(f, mode="monoisotopic") for f in formulas])
+
+
+def test_elements_without_stable_isotopes():
+    with pytest.raises(ValueError, match="No monoisotopic mass for element: Tc"):
+        calculate_molar_mass("TcO4", mode="monoisotopic")
+    rows = calculate_molar_mass_rows(["XeF2", "PmCl3", "Og"], mode="monoisotopic")
+    assert rows[0][2] is None and rows[1][1] is None and rows[2][1] is None
+
+
+def test_cli(tmp_path):
+    source = tmp_path / "formulas.txt"
+    source.write_text("".join(f"{symbol}O\n" for symbol in NATURAL_ELEMENTS), encoding="utf-8")
+    output = tmp_path / "masses.csv"
+    assert main([str(source), "--mode", "monoisotopic", "--output", str(output)]) == 0
+    rows = output.read_text(encoding="utf-8").splitlines()[1:]
+    assert len(rows) == len(NATURAL_ELEMENTS) and all(row.endswith(",") for row in rows) # No errors
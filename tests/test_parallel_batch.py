@@ -0,0 +1,31 @@
+"""Tests for the process pool batch functions (parallel_batch.py)."""
+
+import pytest
+
+from molar_mass import calculate_molar_mass_rows, calculate_molar_masses, get_periodic_table
+from parallel_batch import _init_worker, calculate_molar_masses_parallel, iter_molar_mass_rows_parallel
+
+FORMULAS = ["H2O", "CuSO4·5H2O", "Xx", "C6H12O6", "NaCl", "Al2(SO4)3", "CH3COOH"] * 3
+
+
+def test_init_worker_checks_dataset():
+    _init_worker()
+    _init_worker(get_periodic_table().content_hash)
+    with pytest.raises(RuntimeError, match="different element dataset"):
+        _init_worker("0" * 32)
+
+
+def test_rows_in_input_order():
+    chunks = list(iter_molar_mass_rows_parallel(FORMULAS, workers=2, chunk_size=4))
+    assert [len(rows) for rows in chunks] == [4, 4, 4, 4, 4, 1]
+    rows = [row for rows in chunks for row in rows]
+    expected = calculate_molar_mass_rows(FORMULAS)
+    assert [(formula, error) for formula, _, error in rows] == [(formula, error) for formula, _, error in expected]
+    assert [mass for _, mass, _ in rows] == [pytest.approx(mass) for _, mass, _ in expected]
+
+
+def test_masses_match_serial():
+    formulas = [formula for formula in FORMULAS if formula != "Xx"]
+    masses = calculate_molar_masses_parallel(formulas, workers=2, chunk_size=5)
+    assert list(masses) == pytest.approx(list(calculate_molar_masses(formulas)))
+    assert list(calculate_molar_masses_parallel([], workers=1)) == []
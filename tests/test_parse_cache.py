@@ -0,0 +1,49 @@
+"""Tests for the bounded LRU parse cache (molar_mass.ParseCache)."""
+
+import pytest
+
+from molar_mass import ParseCache
+
+
+def test_hits_and_misses():
+    cache = ParseCache(maxsize=4)
+    first = cache.get("H2O")
+    assert cache.get(" H2O ") is first # Surrounding whitespace is ignored
+    info = cache.info()
+    assert (info["hits"], info["misses"], info["size"]) == (1, 1, 1)
+
+
+def test_evicts_least_recently_used():
+    cache = ParseCache(maxsize=2)
+    cache.get("H2O")
+    cache.get("CO2")
+    cache.get("H2O") # CO2 is now the least recently used
+    cache.get("NaCl")
+    assert cache.info()["evictions"] == 1
+    cache.get("H2O")
+    assert cache.info()["hits"] == 2
+    cache.get("CO2")
+    assert cache.info()["misses"] == 4
+
+
+def test_invalid_formulas_are_not_cached():
+    cache = ParseCache()
+    with pytest.raises(ValueError):
+        cache.get("Al2(SO4")
+    assert cache.info()["size"] == 0
+
+
+def test_disabled_and_resized():
+    cache = ParseCache(maxsize=0)
+    cache.get("H2O")
+    cache.get("H2O")
+    assert cache.info()["hits"] == 0 and cache.info()["size"] == 0
+
+    cache.resize(3)
+    for formula in ("H2O", "CO2", "NaCl"):
+        cache.get(formula)
+    cache.resize(1)
+    assert cache.info()["size"] == 1 and cache.info()["evictions"] == 2
+
+    with pytest.raises(ValueError):
+        cache.resize(-1)
@@ -0,0 +1,99 @@
+"""Tests for the single-pass formula scanner (molar_mass.parse_species / parse_formula)."""
+
+import pytest
+
+from benchmark import parse_formula_regex
+from molar_mass import calculate_molar_mass, parse_formula, parse_species
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("H2O", {"H": 2, "O": 1}),
+    ("CH3COOH", {"C": 2, "H": 4, "O": 2}),
+    ("Al2(SO4)3", {"Al": 2, "S": 3, "O": 12}),
+    ("C12H22O11", {"C": 12, "H": 22, "O": 11}),
+    ("K4[Fe(CN)6]", {"K": 4, "Fe": 1, "C": 6, "N": 6}),
+    ("((CH3)3C)2O", {"C": 8, "H": 18, "O": 1}),
+    ("Ca(OH)2", {"Ca": 1, "O": 2, "H": 2}),
+    ("", {}),
+])
+def test_parse_formula(formula, expected):
+    assert parse_formula(formula) == expected
+
+
+@pytest.mark.parametrize("formula", [
+    "CO2", "Al2(SO4)3", "CH3(CH2)12((C6H4)2(NO2)3)2Fe(C5H5)2(Co(NH3)6)Cl3((CH3)3Si)4O2",
+])
+def test_scanner_matches_regex_parser(formula):
+    assert parse_formula(formula) == parse_formula_regex(formula)
+
+
+@pytest.mark.parametrize("formula", ["Al2(SO4", "H2O)", "((H2O)", "Ca)(OH", ")"])
+def test_unbalanced_parentheses(formula):
+    with pytest.raises(ValueError, match="Unbalanced parentheses"):
+        parse_formula(formula)
+
+
+def test_unknown_element():
+    with pytest.raises(ValueError, match="Xx"):
+        calculate_molar_mass("Xx2O")
+
+
+def test_neutral_species_has_no_charge():
+    assert parse_species("H2SO4") == ({"H": 2, "S": 1, "O": 4}, 0)
+
+
+def test_molar_mass():
+    assert calculate_molar_mass("Al2(SO4)3") == pytest.approx(342.146, abs=1e-3)
+    assert calculate_molar_mass("C6H12O6") == pytest.approx(180.156, abs=1e-3)
+
+
+@pytest.mark.parametrize("formula", ["CuSO4·5H2O", "CuSO4.5H2O", "CuSO4*5H2O", "CuSO4•5H2O", "CuSO4 · 5 H2O"])
+def test_hydrate_separators(formula):
+    assert parse_formula(formula) == {"Cu": 1, "S": 1, "O": 9, "H": 10}
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("2H2O", {"H": 4, "O": 2}),
+    ("Na2CO3·10H2O", {"Na": 2, "C": 1, "O": 13, "H": 20}),
+    ("3CdSO4·8H2O", {"Cd": 3, "S": 3, "O": 20, "H": 16}),
+    ("Na2SO4·(H2O·2NH3)2", {"Na": 2, "S": 1, "O": 6, "H": 16, "N": 4}),
+    ("(NH4)2SO4.5H2O", {"N": 2, "H": 18, "S": 1, "O": 9}),
+])
+def test_hydrate_multipliers(formula, expected):
+    assert parse_formula(formula) == expected
+
+
+@pytest.mark.parametrize("formula", ["CaSO4·0.5H2O", "Na2CO3·1.5H2O", "CaSO4.0.5H2O", "1.5H2O"])
+def test_fractional_multipliers_are_rejected(formula):
+    with pytest.raises(ValueError, match="Fractional multipliers"):
+        parse_formula(formula)
+
+
+def test_fractional_multiplier_message():
+    with pytest.raises(ValueError) as error:
+        parse_formula("Na2CO3·1.5H2O")
+    assert str(error.value) == ("Fractional multipliers are not supported: 1.5 at index 7 of Na2CO3·1.5H2O "
+                                "(multiply every part of the formula by 2, so 1.5 becomes 3)")
+    with pytest.raises(ValueError, match=r"1\.25 at index 6 .* by 4, so 1\.25 becomes 5"):
+        parse_formula("CaSO4·1.25H2O")
+
+
+def test_unicode_subscripts():
+    assert parse_formula("Al₂(SO₄)₃") == parse_formula("Al2(SO4)3")
+    assert parse_formula("C₁₂H₂₂O₁₁") == {"C": 12, "H": 22, "O": 11}
+    assert parse_formula("CuSO₄·5H₂O") == parse_formula("CuSO4·5H2O")
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("SO₄²⁻", ({"S": 1, "O": 4}, -2)),
+    ("Fe³⁺", ({"Fe": 1}, 3)),
+    ("Na⁺", ({"Na": 1}, 1)),
+    ("NH₄⁺", ({"N": 1, "H": 4}, 1)),
+    ("PO₄³⁻", ({"P": 1, "O": 4}, -3)),
+])
+def test_superscript_charges(formula, expected):
+    assert parse_species(formula) == expected
+
+
+def test_charge_does_not_change_mass():
+    assert calculate_molar_mass("SO₄²⁻") == calculate_molar_mass("SO4")
@@ -0,0 +1,90 @@
+"""Tests for percent composition and empirical formulas (percent_composition.py)."""
+
+import pytest
+
+import molar_mass
+import percent_composition as percent_composition_module
+from percent_composition import (_smallest_denominator, empirical_formula, empirical_formulas, percent_composition,
+                                 percent_compositions)
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "pure-python"])
+def use_numpy(request, monkeypatch):
+    if request.param:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(molar_mass, "_numpy", lambda: None)
+        monkeypatch.setattr(percent_composition_module, "_numpy", lambda: None)
+    return request.param
+
+
+def test_percent_composition():
+    percentages = percent_composition("C6H12O6")
+    assert list(percentages) == ["H", "C", "O"] # Atomic number order
+    assert percentages["C"] == pytest.approx(40.00, abs=0.01)
+    assert percentages["H"] == pytest.approx(6.71, abs=0.01)
+    assert percentages["O"] == pytest.approx(53.29, abs=0.01)
+    assert sum(percentages.values()) == pytest.approx(100)
+
+
+def test_percent_composition_custom_masses():
+    assert percent_composition("HO", {"H": 1.0, "O": 3.0}) == {"H": 25.0, "O": 75.0}
+    with pytest.raises(ValueError, match="Unknown element"):
+        percent_composition("HC", {"H": 1.0})
+
+
+def test_percent_compositions_batch(use_numpy):
+    formulas = ["H2O", "NaCl", "C6H12O6"]
+    symbols, rows = percent_compositions(formulas, chunk_size=2)
+    assert symbols == ("H", "C", "O", "Na", "Cl")
+    for formula, row in zip(formulas, rows):
+        expected = percent_composition(formula)
+        assert dict(zip(symbols, list(row))) == pytest.approx({s: expected.get(s, 0.0) for s in symbols})
+    with pytest.raises(ValueError):
+        percent_compositions(["H2O", "Xx"])
+
+
+@pytest.mark.parametrize("ratio, expected", [(1.0, 1), (1.5, 2), (1.333, 3), (2.25, 4), (1.2, 5), (1.41421, None)])
+def test_smallest_denominator(ratio, expected):
+    assert _smallest_denominator(ratio, 0.01, 12) == expected
+
+
+@pytest.mark.parametrize("percentages, expected", [
+    ({"C": 40.0, "H": 6.71, "O": 53.29}, "CH2O"),   # Glucose
+    ({"C": 92.26, "H": 7.74}, "CH"),                # Benzene
+    ({"Fe": 69.94, "O": 30.06}, "Fe2O3"),           # Ratio 1.5
+    ({"C": 85.63, "H": 14.37}, "CH2"),
+    ({"K": 26.58, "Cr": 35.35, "O": 38.07}, "Cr2K2O7"),
+])
+def test_empirical_formula(percentages, expected):
+    result = empirical_formula(percentages)
+    assert result.formula == expected
+    assert result.max_error <= 0.1
+
+
+def test_empirical_formula_by_difference():
+    assert empirical_formula({"C": 40.0, "H": 6.71}, by_difference="O").formula == "CH2O"
+    with pytest.raises(ValueError):
+        empirical_formula({"C": 40.0, "O": 53.29}, by_difference="O")
+    with pytest.raises(ValueError):
+        empirical_formula({"C": 90.0, "H": 20.0}, by_difference="O")
+
+
+@pytest.mark.parametrize("percentages", [{"C": -1.0, "H": 5.0}, {"C": 0.0}, {"Xx": 50.0, "H": 50.0}])
+def test_empirical_formula_invalid(percentages):
+    with pytest.raises(ValueError):
+        empirical_formula(percentages)
+
+
+def test_no_whole_number_ratio():
+    with pytest.raises(ValueError, match="No whole-number ratio|multiplier"):
+        empirical_formula({"C": 50.0, "H": 50.0}, tolerance=0.001, max_multiplier=4)
+
+
+def test_empirical_formulas_batch(use_numpy):
+    rows = [[40.0, 6.71], [92.26, 7.74], [90.0, 20.0], [40.0, 6.71]]
+    results = empirical_formulas(rows, ["C", "H"], by_difference="O")
+    assert [result and result.formula for result in results] == ["CH2O", "CH", None, "CH2O"]
+    single = empirical_formula({"C": 40.0, "H": 6.71}, by_difference="O")
+    assert results[0].composition == single.composition
+    assert results[0].max_error == pytest.approx(single.max_error)
@@ -0,0 +1,115 @@
+"""Tests for the shared PeriodicTable and its binary format (periodic_table.py)."""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from periodic_table import ELEMENTS_FILE, ElementList, PeriodicTable, _load_json, dataset_hash, load_elements, load_periodic_table
+
+
+@pytest.fixture(scope="module")
+def table():
+    return PeriodicTable(_load_json(ELEMENTS_FILE))
+
+
+def test_lookups(table):
+    assert len(table) == 118
+    assert "Fe" in table and "Xx" not in table
+    assert table.symbol(26) == "Fe" and table.atomic_number("Fe") == 26
+    assert table.atomic_mass("Fe") == table.atomic_mass(26) == 55.84
+    assert table.element("O")["name"] == "Oxygen"
+    with pytest.raises(KeyError):
+        table.row(119)
+    with pytest.raises(KeyError):
+        table.row("Xx")
+
+
+def test_shared_mappings_are_read_only(table):
+    with pytest.raises(TypeError):
+        table.masses_by_symbol["H"] = 2.0
+    assert table.atomic_numbers_by_symbol["Og"] == 118
+
+
+def test_atomic_numbers_must_have_no_gaps():
+    with pytest.raises(ValueError):
+        PeriodicTable([{"atomic_number": 2}])
+
+
+def test_binary_round_trip(table, tmp_path):
+    path = str(tmp_path / "elements.bin")
+    table.write_binary(path)
+    mapped = PeriodicTable.from_binary(path)
+    assert mapped.content_hash == table.content_hash
+    assert mapped.schema_version == table.schema_version
+    for atomic_number in range(1, len(table) + 1):
+        assert mapped.element(atomic_number) == table.element(atomic_number)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "elements.bin"
+    path.write_bytes(b"\0" * 256)
+    with pytest.raises(ValueError):
+        PeriodicTable.from_binary(str(path))
+
+
+def test_stale_binary_is_ignored(table, tmp_path):
+    json_path = str(tmp_path / "elements.json")
+    binary_path = str(tmp_path / "elements.bin")
+    shutil.copy(ELEMENTS_FILE, json_path)
+    table.write_binary(binary_path)
+    # A binary file with the wrong (stale) masses, older than the JSON dataset
+    elements = _load_json(json_path)
+    stale = PeriodicTable(ElementList([{**element, "atomic_mass": 1.0} for element in elements],
+                                      elements.schema_version, elements.content_hash))
+    stale.write_binary(binary_path)
+    os.utime(binary_path, (0, 0))
+    assert load_periodic_table(json_path).atomic_mass("Fe") == 55.84
+    os.utime(binary_path) # Now newer than the JSON dataset, with the same content hash: preferred
+    assert load_periodic_table(json_path).atomic_mass("Fe") == 1.0
+
+
+def test_binary_of_another_dataset_is_ignored(tmp_path):
+    json_path = str(tmp_path / "elements.json")
+    binary_path = str(tmp_path / "elements.bin")
+    shutil.copy(ELEMENTS_FILE, json_path)
+    # Newer than the JSON dataset, but built from different data (so with a different content hash)
+    other = PeriodicTable([{**element, "atomic_mass": 1.0} for element in _load_json(json_path)])
+    other.write_binary(binary_path)
+    assert load_periodic_table(json_path).atomic_mass("Fe") == 55.84
+    assert load_elements(json_path)[25]["atomic_mass"] == 55.84
+
+
+def test_dataset_hash_is_stable():
+    elements = _load_json(ELEMENTS_FILE)
+    assert elements.content_hash == dataset_hash(elements) # The stored hash matches the records
+    # Record order and key order don't matter; any change to the data does
+    shuffled = [dict(reversed(list(element.items()))) for element in reversed(elements)]
+    assert dataset_hash(shuffled) == elements.content_hash
+    changed = [{**element, "atomic_mass": 1.0} if element["symbol"] == "H" else element for element in elements]
+    assert dataset_hash(changed) != elements.content_hash
+
+
+def test_binary_and_json_datasets_agree():
+    from_json = _load_json(ELEMENTS_FILE)
+    from_binary = load_elements(ELEMENTS_FILE)
+    assert (from_binary.schema_version, from_binary.content_hash) == (from_json.schema_version, from_json.content_hash)
+    assert dataset_hash(from_binary) == from_json.content_hash
+
+
+def test_legacy_list_format(tmp_path):
+    # Schema version 1: a bare list of records, without a version or hash
+    path = tmp_path / "elements.json"
+    elements = _load_json(ELEMENTS_FILE)
+    path.write_text(json.dumps(list(elements)), encoding="utf-8")
+    legacy = _load_json(str(path))
+    assert legacy.schema_version == 1
+    assert legacy.content_hash == elements.content_hash
+    table = load_periodic_table(str(path))
+    assert table.schema_version == 1 and table.atomic_mass("Fe") == 55.84
+
+
+def test_missing_dataset(tmp_path):
+    elements = _load_json(str(tmp_path / "missing.json"))
+    assert elements == [] and elements.content_hash is None
@@ -0,0 +1,92 @@
+"""Tests for hot reloading the shared element data (periodic_table.reload)."""
+
+import json
+import shutil
+import threading
+from decimal import Decimal
+
+import pytest
+
+import molar_mass
+import periodic_table
+from mass_cache import dataset_version
+from molar_mass import calculate_molar_mass, calculate_molar_masses, get_element_masses, get_periodic_table
+from periodic_table import ELEMENTS_FILE, ISOTOPES_FILE, DatasetWatcher, get_generation, reload
+
+HEAVY_HYDROGEN = 2.0
+
+
+def write_dataset(path, hydrogen_mass):
+    """Writes a copy of elements.json with a different hydrogen mass (and a matching hash)."""
+    with open(ELEMENTS_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data["elements"][0]["atomic_mass"] = hydrogen_mass
+    data["content_hash"] = periodic_table.dataset_hash(data["elements"])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """Paths of a modified copy of the dataset; the real one is reloaded afterwards."""
+    elements = str(tmp_path / "elements.json")
+    isotopes = str(tmp_path / "isotopes.json")
+    write_dataset(elements, HEAVY_HYDROGEN)
+    shutil.copy(ISOTOPES_FILE, isotopes)
+    yield elements, isotopes
+    reload()
+
+
+def test_reload_changes_masses(dataset):
+    before = calculate_molar_mass("H2O")
+    generation = get_generation()
+    old_table = get_periodic_table()
+
+    table = reload(*dataset)
+    assert get_generation() == generation + 1
+    assert get_periodic_table() is table and table.content_hash != old_table.content_hash
+    assert get_element_masses()["H"] == HEAVY_HYDROGEN
+    assert calculate_molar_mass("H2O") == pytest.approx(before + 2 * (HEAVY_HYDROGEN - 1.008))
+    assert old_table.atomic_mass("H") == 1.008 # Holders of the old table keep the old masses
+
+
+def test_caches_follow_the_generation(dataset):
+    version = dataset_version()
+    calculate_molar_mass("H2O", exact=True) # Build the scaled masses for this generation
+    reload(*dataset)
+    assert calculate_molar_mass("H2O", exact=True) == Decimal("19.999")
+    assert dataset_version() != version
+    assert calculate_molar_mass("H2", uncertainty=True).mass == 2 * HEAVY_HYDROGEN
+    assert all(key[0] == get_generation() for key in molar_mass._scaled_masses)
+
+
+def test_batch_caches_follow_the_generation(dataset):
+    np = pytest.importorskip("numpy")
+    calculate_molar_masses(["H2O"], uncertainty=True) # Build the mass and variance vectors
+    reload(*dataset)
+    masses, uncertainties = calculate_molar_masses(["H2O", "CH4"], uncertainty=True)
+    assert list(masses) == pytest.approx([2 * HEAVY_HYDROGEN + 15.999, 12.011 + 4 * HEAVY_HYDROGEN])
+    assert np.all(uncertainties > 0)
+    for cache in (molar_mass._mass_vectors, molar_mass._variance_vectors):
+        assert all(key[0] == get_generation() for key in cache)
+
+
+def test_failed_reload_keeps_the_current_table(tmp_path):
+    table, generation = get_periodic_table(), get_generation()
+    with pytest.raises(ValueError):
+        reload(str(tmp_path / "missing.json"))
+    assert get_periodic_table() is table and get_generation() == generation
+
+
+def test_watcher_reloads_changed_files(dataset):
+    elements, isotopes = dataset
+    reloaded = threading.Event()
+    watcher = DatasetWatcher(interval=0.01, filename=elements, isotopes_filename=isotopes,
+                             on_reload=lambda table: reloaded.set())
+    watcher.start()
+    try:
+        write_dataset(elements, 3.0)
+        assert reloaded.wait(5)
+    finally:
+        watcher.stop()
+    assert get_element_masses()["H"] == 3.0
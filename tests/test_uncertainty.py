@@ -0,0 +1,79 @@
+"""Tests for atomic mass uncertainties and their propagation (uncertainty=True)."""
+
+import math
+
+import pytest
+
+import molar_mass
+from molar_mass import UncertainMass, calculate_molar_mass, calculate_molar_masses, get_periodic_table
+from periodic_table import ELEMENTS_FILE, ElementList, PeriodicTable, _load_json
+
+
+def test_standard_atomic_weight_uncertainties():
+    table = get_periodic_table()
+    assert table.atomic_mass_uncertainty("Fe") == 0.002 # 55.845(2)
+    assert table.atomic_mass_uncertainty("F") == 5e-09
+    assert table.atomic_mass_interval("Fe") is None
+
+
+def test_interval_elements():
+    table = get_periodic_table()
+    assert table.atomic_mass_interval("S") == (32.059, 32.076)
+    # Rectangular distribution over the interval: half-width / √3
+    assert table.atomic_mass_uncertainty("S") == pytest.approx((32.076 - 32.059) / (2 * math.sqrt(3)), rel=0.01)
+    assert table.element("H")["atomic_mass_interval"] == [1.00784, 1.00811]
+
+
+@pytest.mark.parametrize("symbol", ["Tc", "Pm", "Po", "Pu", "Og"])
+def test_no_standard_atomic_weight(symbol):
+    table = get_periodic_table()
+    assert table.atomic_mass_uncertainty(symbol) is None
+    assert table.atomic_mass_interval(symbol) is None
+
+
+def test_propagation():
+    table = get_periodic_table()
+    u = table.atomic_mass_uncertainty
+    result = calculate_molar_mass("Al2(SO4)3", uncertainty=True)
+    assert isinstance(result, UncertainMass)
+    assert result.mass == calculate_molar_mass("Al2(SO4)3")
+    # Same element: linear (count * u); different elements: in quadrature
+    assert result.uncertainty == pytest.approx(math.hypot(2 * u("Al"), 3 * u("S"), 12 * u("O")))
+    assert str(result) == "342.146076 ± 0.015"
+
+
+def test_propagation_raises_without_standard_atomic_weight():
+    with pytest.raises(ValueError, match="No standard atomic weight.*Tc"):
+        calculate_molar_mass("NH4TcO4", uncertainty=True)
+    assert calculate_molar_mass("NH4TcO4") > 0 # The mass itself is still available
+
+
+def test_uncertainty_needs_shared_average_masses():
+    with pytest.raises(ValueError):
+        calculate_molar_mass("H2O", mode="monoisotopic", uncertainty=True)
+    with pytest.raises(ValueError):
+        calculate_molar_mass("H2O", {"H": 1.0, "O": 16.0}, uncertainty=True)
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_batch_matches_single(monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(molar_mass, "_numpy", lambda: None)
+    formulas = ["H2O", "Al2(SO4)3", "C6H12O6", "H2O", "UO2(NO3)2"]
+    masses, uncertainties = calculate_molar_masses(formulas, uncertainty=True)
+    for formula, mass, uncertainty in zip(formulas, masses, uncertainties):
+        expected = calculate_molar_mass(formula, uncertainty=True)
+        assert mass == pytest.approx(expected.mass)
+        assert uncertainty == pytest.approx(expected.uncertainty)
+    with pytest.raises(ValueError, match="No standard atomic weight.*Pu"):
+        calculate_molar_masses(["H2O", "PuO2"], uncertainty=True)
+
+
+def test_older_datasets_have_no_uncertainties():
+    # Schema version 2 uncertainties were only inferred from the printed digits, so aren't used
+    elements = _load_json(ELEMENTS_FILE)
+    table = PeriodicTable(ElementList(elements, 2, elements.content_hash))
+    assert table.atomic_mass_uncertainty("Fe") is None
+    assert table.atomic_mass_interval("S") == (32.059, 32.076)